@@ -0,0 +1,203 @@
+from collections import OrderedDict
+import datetime
+import threading
+import queue
+import time
+import zlib
+
+ARTIFACT_QUEUE_SIZE = 64
+ARTIFACT_WORKERS = 4
+ARTIFACT_MAX_RETRIES = 3
+ARTIFACT_RETRY_DELAY = 0.5
+ARTIFACT_STATUS_HISTORY = 1000
+
+_STOP = object()
+
+class ArtifactWriter:
+    '''
+    Fila de gravação em segundo plano (write-behind) para os artefatos gerados pela API.
+
+    Os endpoints enfileiram a função de gravação (por exemplo, `save_df` ou `save_json`) e respondem
+    assim que o cálculo termina; as gravações são feitas por `workers` threads em paralelo, o que
+    sobrepõe os uploads para o Google Cloud Storage. Como a gravação é feita pelas próprias funções
+    de salvamento, a fila funciona tanto com o diretório local quanto com o bucket.
+
+    Cada thread tem a sua própria fila, e as gravações de um mesmo artefato vão sempre para a mesma fila,
+    na ordem em que foram enfileiradas. Cada nova gravação de um artefato recebe uma geração: as gravações
+    ainda na fila que foram substituídas por uma mais nova são descartadas, e o estado de um artefato só é
+    alterado pela gravação da sua geração atual. Assim, uma gravação antiga nunca sobrescreve uma mais nova
+    nem a marca como terminada.
+
+    As filas são limitadas a `max_queue_size` artefatos no total: quando a fila de um artefato está cheia,
+    `submit` espera até que haja espaço, de forma que a memória ocupada pelos resultados pendentes não
+    cresce sem limite. Cada gravação que falha é repetida até `max_retries` vezes, com espera exponencial
+    a partir de `retry_delay`.
+
+    ### Parâmetros:
+    - `max_queue_size` (int, opcional): O número máximo de artefatos pendentes. O padrão é `ARTIFACT_QUEUE_SIZE`.
+    - `workers` (int, opcional): O número de threads de gravação. O padrão é `ARTIFACT_WORKERS`.
+    - `max_retries` (int, opcional): O número máximo de novas tentativas por artefato. O padrão é `ARTIFACT_MAX_RETRIES`.
+    - `retry_delay` (float, opcional): A espera, em segundos, antes da primeira nova tentativa. O padrão é `ARTIFACT_RETRY_DELAY`.
+    '''
+    def __init__(self,
+                 max_queue_size: int = ARTIFACT_QUEUE_SIZE,
+                 workers: int = ARTIFACT_WORKERS,
+                 max_retries: int = ARTIFACT_MAX_RETRIES,
+                 retry_delay: float = ARTIFACT_RETRY_DELAY):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queues = [queue.Queue(maxsize=max(max_queue_size // workers, 1)) for _ in range(workers)]
+        self._generations = {}
+        self._statuses = OrderedDict()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, artifact_id: str, write_function, *args, **kwargs) -> str:
+        '''
+        Enfileira a gravação de um artefato. Os argumentos são repassados para `write_function`.
+
+        ### Parâmetros:
+        - `artifact_id` (str, obrigatório): O identificador do artefato, por exemplo `{dataset_id}/{file_name}`.
+        - `write_function` (callable, obrigatório): A função que grava o artefato.
+
+        ### Retorna:
+        - `str`: O identificador do artefato.
+        '''
+        self._start_workers()
+        with self._lock:
+            generation = self._generations.get(artifact_id, 0) + 1
+            self._generations[artifact_id] = generation
+            self._statuses.pop(artifact_id, None)
+            self._statuses[artifact_id] = {
+                'artifact_id': artifact_id,
+                'status': 'queued',
+                'generation': generation,
+                'attempts': 0,
+                'queued_time': datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._prune_statuses()
+
+        self._get_queue(artifact_id).put((artifact_id, generation, write_function, args, kwargs))
+        return artifact_id
+
+    def status(self, prefix: str = '') -> list:
+        '''
+        Retorna o estado dos artefatos cujo identificador começa com `prefix`.
+
+        ### Parâmetros:
+        - `prefix` (str, opcional): O prefixo dos identificadores. O padrão é `''` (todos os artefatos).
+
+        ### Retorna:
+        - `list`: Uma lista de dicionários com o identificador, o estado (`queued`, `writing`, `finished` ou `failed`),
+                  a geração, o número de tentativas e, em caso de falha, o erro.
+        '''
+        with self._lock:
+            return [dict(status) for artifact_id, status in self._statuses.items()
+                    if artifact_id.startswith(prefix)]
+
+    def pending(self) -> int:
+        '''
+        Retorna o número de artefatos ainda não gravados.
+        '''
+        return sum(artifact_queue.unfinished_tasks for artifact_queue in self._queues)
+
+    def flush(self, timeout: float = None) -> bool:
+        '''
+        Espera até que todos os artefatos enfileirados sejam gravados (ou falhem definitivamente).
+
+        ### Parâmetros:
+        - `timeout` (float, opcional): O tempo máximo de espera, em segundos. O padrão é `None` (sem limite).
+
+        ### Retorna:
+        - `bool`: `True` se a fila foi esvaziada, `False` se o tempo acabou antes.
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for artifact_queue in self._queues:
+            with artifact_queue.all_tasks_done:
+                while artifact_queue.unfinished_tasks:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    artifact_queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = None) -> bool:
+        '''
+        Grava os artefatos pendentes e encerra as threads de gravação.
+
+        ### Parâmetros:
+        - `timeout` (float, opcional): O tempo máximo de espera pela gravação, em segundos. O padrão é `None` (sem limite).
+
+        ### Retorna:
+        - `bool`: `True` se todos os artefatos foram processados antes do encerramento.
+        '''
+        flushed = self.flush(timeout)
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for artifact_queue in self._queues[:len(threads)]:
+            artifact_queue.put((None, None, _STOP, (), {}))
+        for thread in threads:
+            thread.join(timeout)
+        return flushed
+
+    def _start_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for worker_index, artifact_queue in enumerate(self._queues):
+                thread = threading.Thread(target=self._work, args=(artifact_queue,), name=f'artifact-writer-{worker_index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _get_queue(self, artifact_id: str) -> queue.Queue:
+        return self._queues[zlib.crc32(artifact_id.encode('utf-8')) % len(self._queues)]
+
+    def _work(self, artifact_queue: queue.Queue) -> None:
+        while True:
+            artifact_id, generation, write_function, args, kwargs = artifact_queue.get()
+            try:
+                if write_function is _STOP:
+                    return
+                if self._is_current(artifact_id, generation):
+                    self._write(artifact_id, generation, write_function, args, kwargs)
+            finally:
+                artifact_queue.task_done()
+
+    def _write(self, artifact_id: str, generation: int, write_function, args: tuple, kwargs: dict) -> None:
+        for attempt in range(1, self.max_retries + 2):
+            self._update_status(artifact_id, generation, status='writing', attempts=attempt)
+            try:
+                write_function(*args, **kwargs)
+            except Exception as e:
+                if attempt > self.max_retries:
+                    print(f'Falha ao gravar o artefato "{artifact_id}" após {attempt} tentativas: {e}')
+                    self._update_status(artifact_id, generation, status='failed', error=str(e),
+                                        finish_time=datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+                    return
+                if not self._is_current(artifact_id, generation):
+                    return
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            else:
+                self._update_status(artifact_id, generation, status='finished', error=None,
+                                    finish_time=datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+                return
+
+    def _is_current(self, artifact_id: str, generation: int) -> bool:
+        with self._lock:
+            return self._generations.get(artifact_id) == generation
+
+    def _update_status(self, artifact_id: str, generation: int, **fields) -> None:
+        with self._lock:
+            status = self._statuses.get(artifact_id)
+            if status is not None and status['generation'] == generation:
+                status.update(fields)
+
+    def _prune_statuses(self) -> None:
+        finished = [artifact_id for artifact_id, status in self._statuses.items()
+                    if status['status'] in ['finished', 'failed']]
+        for artifact_id in finished[:max(len(self._statuses) - ARTIFACT_STATUS_HISTORY, 0)]:
+            del self._statuses[artifact_id]
+            del self._generations[artifact_id]
+
+artifact_writer = ArtifactWriter()
@@ -0,0 +1,215 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import multiprocessing
+import threading
+import pandas as pd
+import numpy as np
+import os
+
+SHARD_JOBS = os.cpu_count() or 1
+PROCESS_START_METHOD = 'spawn'
+SHARD_PARALLEL_MIN_CELLS = 4_000_000
+SHARD_MIN_COLUMNS = 4
+
+class SharedArray:
+    '''
+    Array numpy alocado em memória compartilhada (`multiprocessing.shared_memory`), que os processos de trabalho
+    acessam pelo nome sem copiar os dados.
+
+    O processo que cria o array é o dono da memória e a libera (`unlink`) ao fechá-lo; os processos que apenas
+    se conectam a ele (`attach`) só fecham o seu mapeamento.
+
+    ### Parâmetros:
+    - `shape` (tuple, obrigatório): O formato do array.
+    - `dtype` (np.dtype, obrigatório): O tipo dos elementos.
+    - `name` (str, opcional): O nome de uma memória compartilhada existente. O padrão é `None` (cria uma nova).
+    '''
+    def __init__(self, shape: tuple, dtype, name: str = None):
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        self.owner = name is None
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shared_memory.buf)
+
+    @classmethod
+    def attach(cls, description: tuple) -> 'SharedArray':
+        '''
+        Conecta-se a um array criado em outro processo, a partir da descrição retornada por `describe`.
+        '''
+        name, shape, dtype = description
+        return cls(shape, dtype, name)
+
+    def describe(self) -> tuple:
+        '''
+        Retorna a descrição (nome, formato e tipo) usada pelos outros processos para se conectarem ao array.
+        '''
+        return self.shared_memory.name, self.array.shape, self.array.dtype.str
+
+    def close(self) -> None:
+        '''
+        Fecha o mapeamento da memória e, no processo dono, libera a memória compartilhada.
+        '''
+        self.array = None
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class FrameColumns:
+    '''
+    Colunas de um DataFrame usadas como uma entrada `(colunas, linhas)` de `map_column_shards`.
+
+    Cada coluna é copiada diretamente para a sua linha do destino (a memória compartilhada, quando as colunas são
+    divididas entre processos), sem montar antes a matriz transposta do DataFrame.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame.
+    - `columns` (list, obrigatório): As colunas usadas, na ordem da entrada.
+    - `dtype` (np.dtype, opcional): O tipo da entrada. Valores vazios viram `NaN`. O padrão é `np.float64`.
+    '''
+    def __init__(self, df: pd.DataFrame, columns: list, dtype=np.float64):
+        self.df = df
+        self.columns = list(columns)
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def shape(self) -> tuple:
+        return len(self.columns), len(self.df)
+
+    def fill(self, target: np.ndarray) -> np.ndarray:
+        '''
+        Copia as colunas para as linhas de `target`, um array `(colunas, linhas)`, e o retorna.
+        '''
+        for position, column in enumerate(self.columns):
+            target[position] = self.df[column].to_numpy(dtype=self.dtype, na_value=np.nan)
+        return target
+
+    def to_numpy(self) -> np.ndarray:
+        '''
+        Retorna as colunas como um novo array `(colunas, linhas)`, com cada coluna contígua na memória.
+        '''
+        return self.fill(np.empty(self.shape, dtype=self.dtype))
+
+_process_executors = {}
+_process_executors_lock = threading.Lock()
+
+def get_process_executor(workers: int) -> ProcessPoolExecutor:
+    '''
+    Retorna o executor compartilhado com `workers` processos, criado na primeira vez em que é usado e reaproveitado
+    pelas requisições seguintes. Os processos são criados com `spawn`, já que a API tem várias threads (a cópia de
+    um processo com threads por `fork` pode herdar travas presas).
+    '''
+    with _process_executors_lock:
+        executor = _process_executors.get(workers)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+            _process_executors[workers] = executor
+        return executor
+
+def map_in_processes(function, tasks: list, workers: int) -> list:
+    '''
+    Executa `function` em cada tarefa no executor compartilhado com `workers` processos (veja `get_process_executor`)
+    e retorna os resultados na ordem das tarefas. Se um processo for encerrado inesperadamente, o executor é
+    descartado e recriado na próxima chamada.
+
+    ### Gera uma exceção:
+    - `BrokenProcessPool`: Se um processo for encerrado durante a execução.
+    '''
+    executor = get_process_executor(workers)
+    try:
+        return list(executor.map(function, tasks))
+    except BrokenProcessPool:
+        with _process_executors_lock:
+            if _process_executors.get(workers) is executor:
+                del _process_executors[workers]
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+def should_shard_columns(columns: int, rows: int, n_jobs: int = None) -> bool:
+    '''
+    Verifica se vale a pena dividir as colunas entre processos: só quando `n_jobs` é maior que `1` (a divisão
+    é opcional), com pelo menos `SHARD_MIN_COLUMNS` colunas e `SHARD_PARALLEL_MIN_CELLS` células. Em datasets
+    menores, o custo de criar os processos e copiar os dados para a memória compartilhada é maior que o ganho;
+    mesmo no formato do dataset de fraudes, o ganho depende das CPUs livres (veja `benchmarks/benchmark_column_shards.py`).
+    '''
+    return n_jobs is not None and n_jobs > 1 and columns >= SHARD_MIN_COLUMNS and columns * rows >= SHARD_PARALLEL_MIN_CELLS
+
+def get_shard_bounds(columns: int, shards: int) -> list:
+    '''
+    Divide `columns` colunas em até `shards` intervalos contíguos `(início, fim)` de tamanhos parecidos.
+    '''
+    bounds = np.linspace(0, columns, min(shards, columns) + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def run_column_shard(task: tuple) -> None:
+    '''
+    Executa a função de uma fatia de colunas em um processo de trabalho, lendo as entradas e gravando a saída
+    diretamente na memória compartilhada.
+    '''
+    function, input_descriptions, output_description, start, stop, args = task
+    inputs = [SharedArray.attach(description) for description in input_descriptions]
+    output = SharedArray.attach(output_description)
+    try:
+        output.array[..., start:stop, :] = function(*[shared.array[start:stop] for shared in inputs], *args)
+    finally:
+        for shared in inputs + [output]:
+            shared.close()
+
+def map_column_shards(function, inputs: list, output_prefix: tuple = (), output_dtype=np.float64,
+                      n_jobs: int = None, args: tuple = (), output_rows: int = None) -> np.ndarray:
+    '''
+    Executa `function` em fatias de colunas, distribuídas entre `n_jobs` processos.
+
+    As entradas são matrizes `(colunas, linhas)`, com cada coluna contígua na memória, ou colunas de um DataFrame
+    (`FrameColumns`). Elas são copiadas uma única vez para a memória compartilhada (as colunas de um DataFrame,
+    uma a uma), e cada processo lê a sua fatia de colunas e grava o resultado na saída compartilhada sem nenhuma
+    outra cópia. Por isso, `function` deve tratar cada coluna de forma
+    independente, receber as fatias das entradas (seguidas de `args`) e retornar um array com formato
+    `output_prefix + (colunas da fatia, output_rows)`. Quando `should_shard_columns` indica que não vale a pena
+    dividir, `function` é executada diretamente no processo atual. Os processos são reaproveitados entre as
+    chamadas (veja `get_process_executor`).
+
+    ### Parâmetros:
+    - `function` (callable, obrigatório): A função aplicada a cada fatia. Deve ser definida no nível de um módulo.
+    - `inputs` (list, obrigatório): As matrizes `(colunas, linhas)` ou `FrameColumns` de entrada, com o mesmo número
+                                    de colunas.
+    - `output_prefix` (tuple, opcional): As dimensões da saída antes de `(colunas, linhas)`. O padrão é `()`.
+    - `output_dtype` (np.dtype, opcional): O tipo da saída. O padrão é `np.float64`.
+    - `n_jobs` (int, opcional): O número de processos. O padrão é `None` (sem divisão).
+    - `args` (tuple, opcional): Argumentos adicionais de `function`. O padrão é `()`.
+    - `output_rows` (int, opcional): O número de linhas da saída (por exemplo, `1` para uma estatística por coluna).
+                                     O padrão é `None` (o número de linhas das entradas).
+
+    ### Retorna:
+    - `np.ndarray`: A saída, com formato `output_prefix + (colunas, output_rows)`.
+    '''
+    columns, rows = inputs[0].shape
+    if not should_shard_columns(columns, rows, n_jobs):
+        inputs = [values.to_numpy() if isinstance(values, FrameColumns) else values for values in inputs]
+        return np.asarray(function(*inputs, *args), dtype=output_dtype)
+
+    shared_inputs = []
+    try:
+        for values in inputs:
+            shared_inputs.append(SharedArray(values.shape, values.dtype))
+            if isinstance(values, FrameColumns):
+                values.fill(shared_inputs[-1].array)
+            else:
+                np.copyto(shared_inputs[-1].array, values)
+
+        output_shape = output_prefix + (columns, rows if output_rows is None else output_rows)
+        with SharedArray(output_shape, output_dtype) as shared_output:
+            bounds = get_shard_bounds(columns, n_jobs)
+            tasks = [(function, [shared.describe() for shared in shared_inputs], shared_output.describe(), start, stop, args)
+                     for start, stop in bounds]
+            map_in_processes(run_column_shard, tasks, n_jobs)
+            return shared_output.array.copy()
+    finally:
+        for shared in shared_inputs:
+            shared.close()
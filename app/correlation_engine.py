@@ -0,0 +1,230 @@
+from scipy.stats import kendalltau, rankdata
+import pandas as pd
+import numpy as np
+import os
+from app.column_shards import SharedArray, map_in_processes
+
+CORRELATION_JOBS = os.cpu_count() or 1
+KENDALL_PARALLEL_MIN_ROWS = 10_000
+
+class PearsonAccumulator:
+    '''
+    Acumulador combinável das somas usadas pela correlação de Pearson, considerando, para cada par de
+    colunas, apenas as linhas em que as duas colunas têm valor (como `df.corr(method='pearson')`).
+
+    As somas são acumuladas com os dados deslocados pela média do primeiro bloco, o que evita perda
+    de precisão em colunas com valores altos.
+
+    ### Parâmetros:
+    - `size` (int, obrigatório): O número de colunas.
+    '''
+    def __init__(self, size: int):
+        self.shift = None
+        self.count = np.zeros((size, size))
+        self.sum_x = np.zeros((size, size))
+        self.sum_xx = np.zeros((size, size))
+        self.sum_xy = np.zeros((size, size))
+
+    def update(self, values: np.ndarray) -> None:
+        '''
+        Acumula um bloco de linhas.
+
+        ### Parâmetros:
+        - `values` (np.ndarray, obrigatório): Matriz `(linhas, colunas)`.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        if self.shift is None:
+            with np.errstate(invalid='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(values.shape[1])
+
+        values = values - self.shift
+        valid = (~np.isnan(values)).astype(np.float64)
+        values = np.where(valid > 0, values, 0)
+
+        self.count += valid.T @ valid
+        self.sum_x += values.T @ valid
+        self.sum_xx += (values * values).T @ valid
+        self.sum_xy += values.T @ values
+
+    def correlation(self) -> np.ndarray:
+        '''
+        Retorna a matriz de correlação, com `NaN` nos pares sem linhas em comum ou com variância nula.
+        '''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = self.sum_xy - self.sum_x * self.sum_x.T / self.count
+            variance_x = self.sum_xx - self.sum_x ** 2 / self.count
+            correlation = covariance / np.sqrt(variance_x * variance_x.T)
+
+        defined = (self.count > 0) & (variance_x > 0) & (variance_x.T > 0)
+        return np.where(defined, np.clip(correlation, -1, 1), np.nan)
+
+def pearson_matrix(values: np.ndarray) -> np.ndarray:
+    '''
+    Calcula a correlação de Pearson entre as colunas de uma matriz.
+
+    Sem valores vazios, a matriz é centralizada e a correlação sai de um único produto de matrizes (BLAS);
+    com valores vazios, cada par de colunas usa apenas as linhas em que as duas têm valor.
+
+    ### Parâmetros:
+    - `values` (np.ndarray, obrigatório): Matriz `(linhas, colunas)`.
+
+    ### Retorna:
+    - `np.ndarray`: A matriz `(colunas, colunas)` de correlação.
+    '''
+    if np.isnan(values).any():
+        accumulator = PearsonAccumulator(values.shape[1])
+        accumulator.update(values)
+        return accumulator.correlation()
+
+    centered = values - values.mean(axis=0)
+    covariance = centered.T @ centered
+    deviation = np.sqrt(np.diag(covariance))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = covariance / np.outer(deviation, deviation)
+
+    defined = np.outer(deviation > 0, deviation > 0)
+    return np.where(defined, np.clip(correlation, -1, 1), np.nan)
+
+def pearson_pair(x: np.ndarray, y: np.ndarray) -> float:
+    '''
+    Calcula a correlação de Pearson entre dois vetores sem valores vazios (`NaN` se algum for constante).
+    '''
+    x = x - x.mean()
+    y = y - y.mean()
+    divisor = np.sqrt((x @ x) * (y @ y))
+    return float(np.clip((x @ y) / divisor, -1, 1)) if divisor > 0 else np.nan
+
+def spearman_matrix(values: np.ndarray) -> np.ndarray:
+    '''
+    Calcula a correlação de Spearman entre as colunas de uma matriz.
+
+    As colunas são ranqueadas uma única vez e a correlação das colunas sem valores vazios sai de uma
+    única correlação de Pearson dos postos. Como em `df.corr(method='spearman')`, os pares que envolvem
+    colunas com valores vazios são ranqueados novamente usando apenas as linhas em que as duas têm valor.
+
+    ### Parâmetros:
+    - `values` (np.ndarray, obrigatório): Matriz `(linhas, colunas)`.
+
+    ### Retorna:
+    - `np.ndarray`: A matriz `(colunas, colunas)` de correlação.
+    '''
+    size = values.shape[1]
+    valid = ~np.isnan(values)
+    complete = valid.all(axis=0)
+
+    correlation = np.full((size, size), np.nan)
+    correlation[np.ix_(complete, complete)] = pearson_matrix(rank_columns(values[:, complete]))
+
+    for i in np.flatnonzero(~complete):
+        for j in range(size):
+            if not complete[j] and j < i:
+                continue
+            pair_valid = valid[:, i] & valid[:, j]
+            if pair_valid.any():
+                correlation[i, j] = correlation[j, i] = pearson_pair(rankdata(values[pair_valid, i]),
+                                                                     rankdata(values[pair_valid, j]))
+    return correlation
+
+def rank_columns(values: np.ndarray) -> np.ndarray:
+    '''
+    Calcula os postos (média nos empates) de cada coluna de uma matriz, mantendo os valores vazios.
+    '''
+    return pd.DataFrame(values).rank(method='average').to_numpy(dtype=np.float64)
+
+def kendall_pair(values: np.ndarray, pair: tuple) -> float:
+    '''
+    Calcula o tau-b de Kendall entre duas colunas de uma matriz.
+
+    O `scipy.stats.kendalltau` usa o algoritmo de Knight (ordenação e contagem de inversões por
+    merge sort), em O(n log n) por par.
+
+    ### Parâmetros:
+    - `values` (np.ndarray, obrigatório): Matriz `(linhas, colunas)`.
+    - `pair` (tuple, obrigatório): Os índices das duas colunas.
+
+    ### Retorna:
+    - `float`: O tau-b de Kendall, usando apenas as linhas em que as duas colunas têm valor.
+    '''
+    i, j = pair
+    x, y = values[:, i], values[:, j]
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.any():
+        return np.nan
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    return kendalltau(x, y)[0]
+
+def kendall_shared_pairs(task: tuple) -> list:
+    '''
+    Calcula `kendall_pair` para uma lista de pares em um processo de trabalho, lendo a matriz da memória compartilhada.
+    '''
+    description, pairs = task
+    shared = SharedArray.attach(description)
+    try:
+        return [kendall_pair(shared.array, pair) for pair in pairs]
+    finally:
+        shared.close()
+
+def kendall_matrix(values: np.ndarray, n_jobs: int = None) -> np.ndarray:
+    '''
+    Calcula a correlação de Kendall (tau-b) entre as colunas de uma matriz.
+
+    Os pares de colunas são distribuídos entre `n_jobs` processos, que leem a matriz da memória compartilhada
+    (veja `map_in_processes`). Datasets com menos de `KENDALL_PARALLEL_MIN_ROWS` linhas são calculados no
+    próprio processo, onde o custo de distribuir os pares seria maior que o ganho.
+
+    ### Parâmetros:
+    - `values` (np.ndarray, obrigatório): Matriz `(linhas, colunas)`.
+    - `n_jobs` (int, opcional): O número de processos. O padrão é `CORRELATION_JOBS`.
+
+    ### Retorna:
+    - `np.ndarray`: A matriz `(colunas, colunas)` de correlação.
+    '''
+    n_jobs = n_jobs or CORRELATION_JOBS
+    size = values.shape[1]
+    pairs = [(i, j) for i in range(size) for j in range(i + 1, size)]
+
+    if n_jobs == 1 or len(pairs) < 2 or values.shape[0] < KENDALL_PARALLEL_MIN_ROWS:
+        taus = [kendall_pair(values, pair) for pair in pairs]
+    else:
+        with SharedArray(values.shape, values.dtype) as shared:
+            np.copyto(shared.array, values)
+            tasks = [(shared.describe(), pairs[start::n_jobs]) for start in range(min(n_jobs, len(pairs)))]
+            taus = np.empty(len(pairs))
+            for start, task_taus in enumerate(map_in_processes(kendall_shared_pairs, tasks, n_jobs)):
+                taus[start::n_jobs] = task_taus
+
+    correlation = np.diag(np.where((~np.isnan(values)).any(axis=0), 1.0, np.nan))
+    for (i, j), tau in zip(pairs, taus):
+        correlation[i, j] = correlation[j, i] = tau
+    return correlation
+
+def compute_correlations(df: pd.DataFrame, methods: list, n_jobs: int = None) -> dict:
+    '''
+    Calcula as correlações pedidas entre as colunas de um DataFrame, com os mesmos resultados de `df.corr`.
+
+    A conversão do DataFrame em uma matriz é feita uma única vez e compartilhada entre os métodos.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame com os dados.
+    - `methods` (list, obrigatório): Os métodos de correlação (`pearson`, `kendall` e/ou `spearman`).
+    - `n_jobs` (int, opcional): O número de processos usados na correlação de Kendall. O padrão é `CORRELATION_JOBS`.
+
+    ### Retorna:
+    - `dict`: Para cada método, um DataFrame com a matriz de correlação.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se algum método não for reconhecido.
+    '''
+    functions = {
+        'pearson': pearson_matrix,
+        'kendall': lambda values: kendall_matrix(values, n_jobs),
+        'spearman': spearman_matrix,
+    }
+    unknown = [method for method in methods if method not in functions]
+    if unknown:
+        raise ValueError(f'Métodos de correlação não encontrados: {unknown}')
+
+    values = df.to_numpy(dtype=np.float64)
+    return {method: pd.DataFrame(functions[method](values), index=df.columns, columns=df.columns)
+            for method in methods}
@@ -1,11 +1,31 @@
+from io import BytesIO
 import pandas as pd
+import numpy as np
+import hashlib
+import threading
+import os
+from collections import OrderedDict
+from sklearn.neighbors import NearestNeighbors
 from imblearn.under_sampling import RandomUnderSampler
 from imblearn.over_sampling import RandomOverSampler
 from imblearn.over_sampling import SMOTE
 from imblearn.over_sampling import BorderlineSMOTE
 from imblearn.over_sampling import ADASYN
+from app.column_shards import SHARD_JOBS
+from app.storage_manager import get_bucket, track_operation
 
 SEED = 42
+BALANCE_DTYPE = np.float64
+NEIGHBORS_DTYPE = np.float32
+BALANCE_METHODS = ['random_under_sampling', 'random_over_sampling', 'smote', 'bsmote', 'adasyn']
+NEIGHBORS_ALGORITHMS = ['brute', 'kd_tree', 'ball_tree']
+NEIGHBORS_CACHE_SIZE = 4
+VIRTUAL_BALANCE_METHODS = ['random_under_sampling', 'random_over_sampling']
+BALANCE_WEIGHTS_EXTENSION = '.npz'
+BALANCE_WEIGHTS_CONTENT_TYPE = 'application/octet-stream'
+
+neighbors_indexes = OrderedDict()
+neighbors_indexes_lock = threading.Lock()
 
 def apply_resampler(df: pd.DataFrame, resampler) -> pd.DataFrame:
     X = df.drop('Class', axis=1)
@@ -35,4 +55,236 @@ def bsmote(df: pd.DataFrame) -> pd.DataFrame:
 
 def adasyn(df: pd.DataFrame) -> pd.DataFrame:
     adasyn_sampler = ADASYN(random_state=SEED, sampling_strategy='minority')
-    return apply_resampler(df, adasyn_sampler)
\ No newline at end of file
+    return apply_resampler(df, adasyn_sampler)
+
+class NeighborsIndex(NearestNeighbors):
+    '''
+    `NearestNeighbors` cujas árvores (`kd_tree` e `ball_tree`) são construídas uma única vez para cada conjunto de
+    pontos e reaproveitadas pelos próximos ajustes com os mesmos pontos, inclusive com outro número de vizinhos.
+    Assim, `smote`, `bsmote` e `adasyn` aplicados ao mesmo dataset compartilham os índices do dataset inteiro e da
+    classe minoritária. As árvores são exatas: os vizinhos encontrados são os mesmos da busca exaustiva (`brute`).
+
+    Os índices ficam em um cache de até `NEIGHBORS_CACHE_SIZE` entradas, identificadas pelo hash dos pontos.
+    Com `brute`, não há índice a construir e o ajuste não passa pelo cache.
+
+    A busca é feita com os pontos convertidos para `NEIGHBORS_DTYPE` (`float32`), o que reduz pela metade a memória
+    percorrida no cálculo das distâncias. Só a escolha dos vizinhos usa essa precisão: as amostras sintéticas são
+    interpoladas pelo `imblearn` a partir dos pontos originais, e só vizinhos a distâncias iguais na precisão de
+    `float32` podem mudar em relação à busca em `float64`.
+    '''
+    def fit(self, X, y=None) -> 'NeighborsIndex':
+        X = np.asarray(X, dtype=NEIGHBORS_DTYPE)
+        if self.algorithm not in ['kd_tree', 'ball_tree']:
+            return super().fit(X, y)
+
+        params = self.get_params()
+        key = get_neighbors_key(X, params)
+        with neighbors_indexes_lock:
+            fitted = neighbors_indexes.get(key)
+            if fitted is not None:
+                neighbors_indexes.move_to_end(key)
+
+        if fitted is None:
+            fitted = NearestNeighbors(**params).fit(X)
+            with neighbors_indexes_lock:
+                neighbors_indexes[key] = fitted
+                while len(neighbors_indexes) > NEIGHBORS_CACHE_SIZE:
+                    neighbors_indexes.popitem(last=False)
+
+        self.__dict__.update({name: value for name, value in vars(fitted).items() if name not in params})
+        return self
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        X = None if X is None else np.asarray(X, dtype=NEIGHBORS_DTYPE)
+        return super().kneighbors(X, n_neighbors, return_distance)
+
+def get_neighbors_key(X: np.ndarray, params: dict) -> tuple:
+    '''
+    Identifica um índice de vizinhos pelo hash dos pontos e pelos parâmetros que definem a árvore.
+    '''
+    X = np.ascontiguousarray(X)
+    digest = hashlib.blake2b(X.data, digest_size=16).hexdigest()
+    return (digest, X.shape, X.dtype.str, params['algorithm'], params['leaf_size'],
+            params['metric'], params['p'], repr(params['metric_params']))
+
+def get_resampler(method: str, n_jobs: int = None, neighbors_algorithm: str = 'brute'):
+    '''
+    Cria o resampler do `imblearn` de um método de balanceamento, com os mesmos parâmetros das funções
+    `random_under_sampling`, `random_over_sampling`, `smote`, `bsmote` e `adasyn`, mas com a busca de vizinhos feita
+    por `NeighborsIndex` em `n_jobs` threads.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o método de balanceamento ou o algoritmo de busca de vizinhos não forem encontrados.
+    '''
+    if neighbors_algorithm not in NEIGHBORS_ALGORITHMS:
+        raise ValueError(f'Algoritmo de busca de vizinhos "{neighbors_algorithm}" não encontrado')
+    neighbors = lambda n_neighbors: NeighborsIndex(n_neighbors=n_neighbors + 1, algorithm=neighbors_algorithm,
+                                                   n_jobs=n_jobs or SHARD_JOBS)
+
+    if method == 'random_under_sampling':
+        return RandomUnderSampler(random_state=SEED)
+    if method == 'random_over_sampling':
+        return RandomOverSampler(random_state=SEED)
+    if method == 'smote':
+        return SMOTE(random_state=SEED, sampling_strategy='minority', k_neighbors=neighbors(5))
+    if method == 'bsmote':
+        return BorderlineSMOTE(random_state=SEED, sampling_strategy='minority',
+                               k_neighbors=neighbors(5), m_neighbors=neighbors(10))
+    if method == 'adasyn':
+        return ADASYN(random_state=SEED, sampling_strategy='minority', n_neighbors=neighbors(5))
+    raise ValueError(f'Método "{method}" não encontrado')
+
+def balance_arrays(X: np.ndarray, y: np.ndarray, method: str, n_jobs: int = None, neighbors_algorithm: str = 'brute') -> tuple:
+    '''
+    Balanceia os dados a partir dos arrays dos atributos e da classe, sem passar por DataFrames.
+
+    ### Parâmetros:
+    - `X` (np.ndarray, obrigatório): A matriz `(linhas, atributos)` dos atributos (veja `get_balance_arrays`).
+                                     As amostras sintéticas mantêm o tipo de `X`.
+    - `y` (np.ndarray, obrigatório): A classe de cada linha.
+    - `method` (str, obrigatório): O método de balanceamento (veja `BALANCE_METHODS`).
+    - `n_jobs` (int, opcional): O número de threads da busca de vizinhos. O padrão é `SHARD_JOBS`.
+    - `neighbors_algorithm` (str, opcional): O algoritmo da busca de vizinhos (`brute`, `kd_tree` ou `ball_tree`).
+                                             O padrão é `brute`, o mais rápido com dezenas de atributos.
+
+    ### Retorna:
+    - `tuple`: Os arrays `(X, y)` balanceados.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o método de balanceamento ou o algoritmo de busca de vizinhos não forem encontrados.
+    '''
+    return get_resampler(method, n_jobs, neighbors_algorithm).fit_resample(X, y)
+
+def get_balance_arrays(df: pd.DataFrame) -> tuple:
+    '''
+    Retorna a matriz contígua `(linhas, atributos)` em `BALANCE_DTYPE` com as colunas de `df` sem `Class`
+    e o array da classe.
+    '''
+    X = np.ascontiguousarray(df.drop(columns='Class').to_numpy(dtype=BALANCE_DTYPE))
+    return X, df['Class'].to_numpy()
+
+def balance_df(df: pd.DataFrame, method: str, n_jobs: int = None, neighbors_algorithm: str = 'brute') -> pd.DataFrame:
+    '''
+    Balanceia um DataFrame, com o mesmo resultado das funções `random_under_sampling`, `random_over_sampling`,
+    `smote`, `bsmote` e `adasyn`.
+
+    Na subamostragem e na superamostragem aleatórias, as linhas sorteadas (veja `get_balance_indices`) são copiadas
+    do próprio DataFrame, com os tipos de todas as colunas, inclusive as não numéricas. Nos métodos baseados em
+    vizinhos, os atributos são convertidos uma única vez para uma matriz contígua em `BALANCE_DTYPE` (`float64`),
+    que é a entrada do `imblearn`, a busca de vizinhos é feita em `float32` por `NeighborsIndex` e o resultado é
+    montado diretamente a partir dos arrays balanceados; `Class` mantém o seu tipo.
+
+    ### Parâmetros:
+    - `df` (DataFrame, obrigatório): O DataFrame a ser balanceado, com a coluna `Class`.
+    - `method` (str, obrigatório): O método de balanceamento (veja `BALANCE_METHODS`).
+    - `n_jobs` (int, opcional): O número de threads da busca de vizinhos. O padrão é `SHARD_JOBS`.
+    - `neighbors_algorithm` (str, opcional): O algoritmo da busca de vizinhos. O padrão é `brute`.
+
+    ### Retorna:
+    - `DataFrame`: O DataFrame balanceado.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o método de balanceamento ou o algoritmo de busca de vizinhos não forem encontrados, ou se
+                    um método baseado em vizinhos for usado com atributos não numéricos.
+    '''
+    if method in VIRTUAL_BALANCE_METHODS:
+        columns = df.columns.drop('Class').append(pd.Index(['Class']))
+        indices = get_balance_indices(df['Class'].to_numpy(), method)
+        df_resampled = df.iloc[indices, df.columns.get_indexer(columns)]
+        # Como no `imblearn`, a superamostragem, que repete linhas, numera o índice de novo
+        return df_resampled.reset_index(drop=True) if method == 'random_over_sampling' else df_resampled
+
+    X, y = get_balance_arrays(df)
+    X_resampled, y_resampled = balance_arrays(X, y, method, n_jobs, neighbors_algorithm)
+    df_resampled = pd.DataFrame(X_resampled, columns=df.columns.drop('Class'), copy=False)
+    df_resampled['Class'] = pd.Series(y_resampled, dtype=df['Class'].dtype)
+    return df_resampled
+
+def get_balance_indices(y, method: str) -> np.ndarray:
+    '''
+    Retorna as posições das linhas sorteadas por `random_over_sampling` ou `random_under_sampling`, na ordem do
+    resultado dessas funções. O sorteio depende apenas da classe e de `SEED`, então os atributos não são lidos.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o método não for `random_over_sampling` nem `random_under_sampling`.
+    '''
+    if method not in VIRTUAL_BALANCE_METHODS:
+        raise ValueError(f'O método "{method}" não pode ser aplicado virtualmente. Os valores possíveis são {VIRTUAL_BALANCE_METHODS}')
+
+    resampler = get_resampler(method)
+    resampler.fit_resample(np.zeros((len(y), 1), dtype=np.int8), y)
+    return resampler.sample_indices_
+
+def get_balance_weights(y, method: str) -> np.ndarray:
+    '''
+    Balanceia os dados virtualmente: em vez de duplicar ou remover linhas, retorna quantas vezes cada linha aparece
+    no resultado de `random_over_sampling` ou `random_under_sampling` (`0` nas linhas removidas), a partir de
+    `get_balance_indices`.
+
+    Os pesos podem ser usados como `sample_weight` no treinamento (veja `train_and_evaluate_model`), sem uma segunda
+    cópia do dataset.
+
+    ### Parâmetros:
+    - `y` (array, obrigatório): A classe de cada linha.
+    - `method` (str, obrigatório): O método de balanceamento (veja `VIRTUAL_BALANCE_METHODS`).
+
+    ### Retorna:
+    - `np.ndarray`: O peso (`uint32`) de cada linha.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o método não puder ser aplicado virtualmente.
+    '''
+    return np.bincount(get_balance_indices(y, method), minlength=len(y)).astype(np.uint32)
+
+def save_balance_weights(weights: np.ndarray, dataset_id: str, file_name: str, to_gcs: bool = False) -> None:
+    '''
+    Esta função salva os pesos de um balanceamento virtual, localmente ou em um bucket do Google Cloud Storage,
+    sob o caminho `{dataset_id}/{file_name}.npz`.
+
+    ### Parâmetros:
+    - `weights` (np.ndarray, obrigatório): Os pesos retornados por `get_balance_weights`.
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo.
+    - `to_gcs` (bool, opcional): Se o arquivo deve ser salvo no bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Não retorna nada.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.GoogleCloudError`: Se ocorrer um erro ao tentar salvar o arquivo no bucket.
+    '''
+    buffer = BytesIO()
+    np.savez_compressed(buffer, weights=weights)
+    if to_gcs:
+        blob = get_bucket().blob(f'{dataset_id}/{file_name}{BALANCE_WEIGHTS_EXTENSION}')
+        with track_operation('upload'):
+            blob.upload_from_string(buffer.getvalue(), BALANCE_WEIGHTS_CONTENT_TYPE)
+    else:
+        os.makedirs(f'app/datasets/{dataset_id}', exist_ok=True)
+        with open(f'app/datasets/{dataset_id}/{file_name}{BALANCE_WEIGHTS_EXTENSION}', 'wb') as file:
+            file.write(buffer.getvalue())
+
+def load_balance_weights(dataset_id: str, file_name: str, from_gcs: bool = False) -> np.ndarray:
+    '''
+    Esta função carrega os pesos de um balanceamento virtual salvos por `save_balance_weights`.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo, sem a extensão.
+    - `from_gcs` (bool, opcional): Se o arquivo deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `np.ndarray`: O peso de cada linha.
+
+    ### Gera uma exceção:
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    - `google.api_core.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    '''
+    if from_gcs:
+        blob = get_bucket().blob(f'{dataset_id}/{file_name}{BALANCE_WEIGHTS_EXTENSION}')
+        with track_operation('download'):
+            data = blob.download_as_bytes()
+    else:
+        with open(f'app/datasets/{dataset_id}/{file_name}{BALANCE_WEIGHTS_EXTENSION}', 'rb') as file:
+            data = file.read()
+    with np.load(BytesIO(data), allow_pickle=False) as arrays:
+        return arrays['weights']
@@ -1,30 +1,718 @@
-from google.cloud import storage
-import google.auth
+from google.api_core.exceptions import NotFound
 import pandas as pd
-from io import StringIO
-from google.oauth2 import service_account
+import pyarrow as pa
+import pyarrow.parquet as pq
+import numpy as np
+from collections import OrderedDict
+from io import BytesIO
+import threading
+import hashlib
+import zlib
+import zstandard
+import json
 import os
 
-BUCKET_NAME = 'banks-dev-392615.appspot.com'
-CREDENTIALS_PATH = 'banks-dev-392615-7412df8a19f0.json'
+from app.storage_manager import get_credentials, get_bucket, set_bucket, track_operation, get_operation_stats, BUCKET_NAME
+from app.streaming_statistics import StatisticsState
 
-def get_credentials():
+CACHE_DIR_NAME = '.cache'
+CACHE_VERSION_KEY = b'source_version'
+DATAFRAME_CACHE_MAX_BYTES = 1024 ** 3
+GCS_READ_CHUNK_SIZE = 8 * 1024 * 1024
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.05
+CSV_CHUNK_SIZE = 100_000
+INGEST_SAMPLE_BYTES = 1024 * 1024
+INGEST_DECOMPRESS_BYTES = 1024 * 1024
+COLUMNAR_ROW_GROUP_SIZE = 64 * 1024
+STATISTICS_TAIL_BYTES = 64 * 1024
+CSV_COMPRESSION = None
+CSV_EXTENSIONS = {
+    None: '.csv',
+    'gzip': '.csv.gz',
+    'zstd': '.csv.zst',
+    'zip': '.csv.zip',
+}
+CSV_CONTENT_TYPES = {
+    None: 'text/csv',
+    'gzip': 'application/gzip',
+    'zstd': 'application/zstd',
+    'zip': 'application/zip',
+}
+
+class DataFrameCache:
+    '''
+    Cache LRU em memória de DataFrames carregados, limitado por um orçamento de bytes.
+
+    As entradas são indexadas por `(dataset_id, file_name, index, columns, versão da origem)`, de forma que
+    uma alteração no CSV de origem nunca devolve dados antigos. Os arrays dos DataFrames armazenados são
+    marcados como somente leitura e cada leitura devolve uma cópia rasa: substituir colunas na cópia é
+    permitido, mas escritas no lugar (`df.loc[...] = ...`) geram `ValueError` em vez de corromper o cache.
+
+    ### Parâmetros:
+    - `max_bytes` (int, obrigatório): O orçamento de memória do cache, em bytes.
+    '''
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> pd.DataFrame:
+        '''
+        Retorna uma cópia rasa e somente leitura do DataFrame armazenado, ou `None` se a chave não estiver no cache.
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy(deep=False)
+
+    def put(self, key: tuple, df: pd.DataFrame) -> None:
+        '''
+        Armazena um DataFrame no cache, descartando as entradas menos usadas recentemente até respeitar o orçamento.
+        DataFrames maiores que o orçamento não são armazenados.
+        '''
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        for array in df._mgr.arrays:
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (df, size)
+            self.current_bytes += size
+            self._evict()
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        '''
+        Altera o orçamento de memória do cache, descartando entradas se necessário.
+        '''
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        '''
+        Remove todas as entradas do cache e zera os contadores.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        '''
+        Retorna os contadores do cache: acertos, falhas, descartes, entradas e bytes ocupados.
+        '''
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+dataframe_cache = DataFrameCache(DATAFRAME_CACHE_MAX_BYTES)
+
+def get_csv_extension() -> str:
+    '''
+    Retorna a extensão dos arquivos CSV gravados nesta instalação, de acordo com `CSV_COMPRESSION`.
+
+    ### Retorna:
+    - `str`: A extensão, por exemplo `.csv` ou `.csv.gz`.
+    '''
+    return CSV_EXTENSIONS[CSV_COMPRESSION]
+
+def get_csv_candidates() -> list:
+    '''
+    Retorna as combinações de extensão e compressão aceitas na leitura, começando pela compressão configurada.
+
+    ### Retorna:
+    - `list`: Uma lista de tuplas `(extensão, compressão)`.
+    '''
+    candidates = [(CSV_EXTENSIONS[CSV_COMPRESSION], CSV_COMPRESSION)]
+    candidates += [(extension, compression) for compression, extension in CSV_EXTENSIONS.items()
+                   if compression != CSV_COMPRESSION]
+    return candidates
+
+def split_csv_file_name(file_name: str) -> tuple:
+    '''
+    Separa o nome de um arquivo CSV, comprimido ou não, do seu sufixo.
+
+    ### Parâmetros:
+    - `file_name` (str, obrigatório): O nome do arquivo, por exemplo `transactions.csv.gz`.
+
+    ### Retorna:
+    - `tuple`: O nome sem extensão e a compressão (por exemplo, `('transactions', 'gzip')`),
+               ou `(None, None)` se o arquivo não for um CSV.
+    '''
+    for compression, extension in sorted(CSV_EXTENSIONS.items(), key=lambda item: -len(item[1])):
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)], compression
+    return None, None
+
+def find_local_csv_path(dataset_id: str, file_name: str) -> str:
+    '''
+    Encontra o arquivo CSV local de um dataset, comprimido ou não.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV, sem extensão.
+
+    ### Retorna:
+    - `str`: O caminho do arquivo.
+
+    ### Gera uma exceção:
+    - `FileNotFoundError`: Se nenhum arquivo CSV for encontrado.
+    '''
+    for extension, _ in get_csv_candidates():
+        file_path = f'app/datasets/{dataset_id}/{file_name}{extension}'
+        if os.path.exists(file_path):
+            return file_path
+    raise FileNotFoundError(f'Arquivo "app/datasets/{dataset_id}/{file_name}.csv" não encontrado')
+
+def get_gcs_csv_blob(dataset_id: str, file_name: str) -> tuple:
     '''
-    Tenta carregar as credenciais a partir do arquivo JSON. Se não conseguir,
-    cai de volta para as credenciais padrão do Google Cloud.
+    Encontra o blob CSV de um dataset no bucket, comprimido ou não, já com os metadados carregados.
 
-    ### Retorno:
-    - `google.auth.credentials.Credentials`: Objeto de credenciais do Google Cloud.
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV, sem extensão.
+
+    ### Retorna:
+    - `tuple`: O blob e a sua compressão.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.NotFound`: Se nenhum blob CSV for encontrado no bucket.
+    '''
+    for extension, compression in get_csv_candidates():
+        with track_operation('get_metadata'):
+            blob = get_bucket().get_blob(f'{dataset_id}/{file_name}{extension}')
+        if blob is not None:
+            return blob, compression
+    raise NotFound(f'Blob "{dataset_id}/{file_name}.csv" não encontrado no bucket "{BUCKET_NAME}"')
+
+def get_columnar_cache_path(dataset_id: str, file_name: str) -> str:
+    '''
+    Retorna o caminho do cache colunar (Parquet) de um arquivo CSV.
+
+    O cache é sempre mantido localmente, em `app/datasets/{dataset_id}/.cache/{file_name}.parquet`,
+    tanto para arquivos locais quanto para arquivos do Google Cloud Storage.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+
+    ### Retorna:
+    - `str`: O caminho do arquivo Parquet.
+    '''
+    return f'app/datasets/{dataset_id}/{CACHE_DIR_NAME}/{file_name}.parquet'
+
+def get_local_source_version(file_path: str) -> str:
+    '''
+    Retorna a versão de um arquivo local, derivada da data de modificação e do tamanho do arquivo.
+
+    ### Parâmetros:
+    - `file_path` (str, obrigatório): O caminho do arquivo.
+
+    ### Retorna:
+    - `str`: A versão do arquivo.
+
+    ### Gera uma exceção:
+    - `FileNotFoundError`: Se o arquivo não existir.
+    '''
+    file_stat = os.stat(file_path)
+    return f'local-{file_stat.st_mtime_ns}-{file_stat.st_size}'
+
+def write_columnar_cache(df: pd.DataFrame, cache_path: str, source_version: str) -> None:
+    '''
+    Salva um DataFrame no cache colunar, registrando a versão do CSV de origem nos metadados do arquivo Parquet.
+
+    A escrita é feita em um arquivo temporário que substitui o cache de forma atômica, para que
+    requisições concorrentes nunca leiam um cache incompleto. O arquivo é dividido em grupos de
+    `COLUMNAR_ROW_GROUP_SIZE` linhas, o que permite ler apenas as linhas de uma página (veja `read_csv_rows`).
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame lido do CSV, sem índice.
+    - `cache_path` (str, obrigatório): O caminho do arquivo Parquet.
+    - `source_version` (str, obrigatório): A versão do CSV de origem.
+
+    ### Não retorna nada.
+    '''
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_VERSION_KEY] = source_version.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    pq.write_table(table, temp_path, row_group_size=COLUMNAR_ROW_GROUP_SIZE)
+    os.replace(temp_path, cache_path)
+
+def is_columnar_cache_fresh(cache_path: str, source_version: str) -> bool:
+    '''
+    Verifica se o cache colunar existe e corresponde à versão atual do CSV de origem.
+
+    ### Parâmetros:
+    - `cache_path` (str, obrigatório): O caminho do arquivo Parquet.
+    - `source_version` (str, obrigatório): A versão atual do CSV de origem.
+
+    ### Retorna:
+    - `bool`: `True` se o cache puder ser usado.
+    '''
+    if not os.path.exists(cache_path):
+        return False
+
+    schema = pq.read_schema(cache_path)
+    return (schema.metadata or {}).get(CACHE_VERSION_KEY) == source_version.encode()
+
+def read_columnar_cache(cache_path: str, source_version: str, index: bool = False, columns: list = None) -> pd.DataFrame:
+    '''
+    Lê um DataFrame do cache colunar, caso ele exista e corresponda à versão atual do CSV de origem.
+
+    ### Parâmetros:
+    - `cache_path` (str, obrigatório): O caminho do arquivo Parquet.
+    - `source_version` (str, obrigatório): A versão atual do CSV de origem.
+    - `index` (bool, opcional): Se a primeira coluna do CSV deve ser usada como índice. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem carregadas. O padrão é `None` (todas as colunas).
+
+    ### Retorna:
+    - `pd.DataFrame`: O DataFrame carregado, ou `None` se o cache não existir ou estiver desatualizado.
+    '''
+    if not is_columnar_cache_fresh(cache_path, source_version):
+        return None
+
+    schema = pq.read_schema(cache_path)
+    index_column = schema.names[0] if index else None
+    if columns is not None and index_column is not None:
+        columns = [index_column] + [column for column in columns if column != index_column]
+
+    df = pd.read_parquet(cache_path, columns=columns)
+
+    if index_column is not None:
+        df = df.set_index(index_column)
+        if index_column.startswith('Unnamed: '):
+            df.index.name = None
+
+    return df
+
+def read_csv_with_columnar_cache(read_csv_source, cache_path: str, source_version: str, index: bool = False, columns: list = None) -> pd.DataFrame:
+    '''
+    Carrega um CSV através do cache colunar. Se o cache não existir ou estiver desatualizado,
+    o CSV é lido por completo uma única vez e o cache é reconstruído.
+
+    ### Parâmetros:
+    - `read_csv_source` (callable, obrigatório): Função sem argumentos que lê o CSV de origem, sem índice.
+    - `cache_path` (str, obrigatório): O caminho do arquivo Parquet.
+    - `source_version` (str, obrigatório): A versão atual do CSV de origem.
+    - `index` (bool, opcional): Se a primeira coluna do CSV deve ser usada como índice. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem carregadas. O padrão é `None` (todas as colunas).
+
+    ### Retorna:
+    - `pd.DataFrame`: Um DataFrame pandas contendo os dados do arquivo CSV.
     '''
     try:
-        return service_account.Credentials.from_service_account_file(CREDENTIALS_PATH)
-    except Exception as e:
-        credentials, _ = google.auth.default()
-        return credentials
-    
-def load_csv(dataset_id: str, file_name: str, index: bool = False, from_gcs: bool = False) -> pd.DataFrame:
+        df = read_columnar_cache(cache_path, source_version, index, columns)
+        if df is not None:
+            return df
+    except (OSError, pa.ArrowException) as e:
+        print(f'Cache colunar inválido em "{cache_path}", reconstruindo: {e}')
+
+    df = read_csv_source()
+
+    try:
+        write_columnar_cache(df, cache_path, source_version)
+    except (OSError, pa.ArrowException) as e:
+        print(f'Não foi possível criar o cache colunar em "{cache_path}": {e}')
+
+    if index:
+        index_column = df.columns[0]
+        df = df.set_index(index_column)
+        if index_column.startswith('Unnamed: '):
+            df.index.name = None
+    if columns is not None:
+        df = df[columns]
+
+    return df
+
+def get_schema_path(dataset_id: str, file_name: str) -> str:
+    '''
+    Retorna o caminho do esquema de tipos compactos de um arquivo CSV, salvo ao lado do cache colunar.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+
+    ### Retorna:
+    - `str`: O caminho do arquivo JSON com o esquema.
+    '''
+    return f'app/datasets/{dataset_id}/{CACHE_DIR_NAME}/{file_name}.schema.json'
+
+def infer_compact_schema(df: pd.DataFrame) -> dict:
+    '''
+    Infere o tipo mais compacto para cada coluna de um DataFrame.
+
+    ### Regras:
+    - Colunas inteiras usam o menor inteiro com sinal que comporta o intervalo de valores (por exemplo, `int8` para `Class`).
+    - Colunas de ponto flutuante usam `float32`, desde que os valores caibam no intervalo do `float32`.
+    - Colunas de texto com no máximo `CATEGORICAL_MAX_UNIQUE_RATIO` de valores distintos usam `category`.
+    - As demais colunas mantêm o tipo original.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame a ser analisado.
+
+    ### Retorna:
+    - `dict`: Um dicionário com o nome de cada coluna e o tipo inferido.
+    '''
+    schema = {}
+
+    for column in df.columns:
+        column_data = df[column]
+        dtype = str(column_data.dtype)
+
+        if pd.api.types.is_bool_dtype(column_data):
+            pass
+
+        elif pd.api.types.is_integer_dtype(column_data):
+            if len(column_data) > 0:
+                min_value, max_value = column_data.min(), column_data.max()
+                for candidate in ['int8', 'int16', 'int32', 'int64']:
+                    info = np.iinfo(candidate)
+                    if info.min <= min_value and max_value <= info.max:
+                        dtype = candidate
+                        break
+
+        elif pd.api.types.is_float_dtype(column_data):
+            max_abs = np.nanmax(np.abs(column_data.to_numpy(dtype=np.float64, na_value=np.nan)), initial=0)
+            if not np.isfinite(max_abs) or max_abs <= np.finfo(np.float32).max:
+                dtype = 'float32'
+
+        elif pd.api.types.is_object_dtype(column_data) and len(column_data) > 0:
+            if column_data.nunique(dropna=True) <= CATEGORICAL_MAX_UNIQUE_RATIO * len(column_data):
+                dtype = 'category'
+
+        schema[column] = dtype
+
+    return schema
+
+def apply_compact_schema(df: pd.DataFrame, dataset_id: str, file_name: str, source_version: str) -> pd.DataFrame:
+    '''
+    Converte as colunas de um DataFrame para os tipos compactos do esquema salvo com o dataset.
+
+    O esquema é inferido apenas para colunas que ainda não estão no esquema salvo (ou quando o CSV
+    de origem mudou) e é persistido, de forma que as próximas leituras não repetem a inferência.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame carregado com os tipos padrão.
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `source_version` (str, obrigatório): A versão atual do CSV de origem.
+
+    ### Retorna:
+    - `pd.DataFrame`: O DataFrame com os tipos compactos.
+    '''
+    schema_path = get_schema_path(dataset_id, file_name)
+    schema = {}
+
+    try:
+        with open(schema_path) as file:
+            stored_schema = json.load(file)
+        if stored_schema.get('source_version') == source_version:
+            schema = stored_schema['dtypes']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    missing_columns = [column for column in df.columns if column not in schema]
+    if missing_columns:
+        schema.update(infer_compact_schema(df[missing_columns]))
+        try:
+            os.makedirs(os.path.dirname(schema_path), exist_ok=True)
+            temp_path = f'{schema_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as file:
+                json.dump({'source_version': source_version, 'dtypes': schema}, file)
+            os.replace(temp_path, schema_path)
+        except OSError as e:
+            print(f'Não foi possível salvar o esquema em "{schema_path}": {e}')
+
+    dtypes = {column: schema[column] for column in df.columns if str(df[column].dtype) != schema[column]}
+    if not dtypes:
+        return df
+
+    return df.astype(dtypes)
+
+def load_csv_through_caches(read_csv_source,
+                            dataset_id: str,
+                            file_name: str,
+                            source_version: str,
+                            index: bool = False,
+                            columns: list = None,
+                            optimize_dtypes: bool = False) -> pd.DataFrame:
+    '''
+    Carrega um CSV passando pelo cache em memória (`dataframe_cache`) e pelo cache colunar em disco.
+
+    ### Parâmetros:
+    - `read_csv_source` (callable, obrigatório): Função sem argumentos que lê o CSV de origem, sem índice.
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `source_version` (str, obrigatório): A versão atual do CSV de origem.
+    - `index` (bool, opcional): Se a primeira coluna do CSV deve ser usada como índice. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem carregadas. O padrão é `None` (todas as colunas).
+    - `optimize_dtypes` (bool, opcional): Se as colunas devem ser convertidas para tipos compactos. O padrão é `False`.
+
+    ### Retorna:
+    - `pd.DataFrame`: Uma cópia rasa e somente leitura do DataFrame carregado.
+    '''
+    cache_key = (dataset_id,
+                 file_name,
+                 bool(index),
+                 tuple(columns) if columns is not None else None,
+                 bool(optimize_dtypes),
+                 source_version)
+    df = dataframe_cache.get(cache_key)
+    if df is not None:
+        return df
+
+    df = read_csv_with_columnar_cache(read_csv_source,
+                                      get_columnar_cache_path(dataset_id, file_name),
+                                      source_version,
+                                      index,
+                                      columns)
+    if optimize_dtypes:
+        df = apply_compact_schema(df, dataset_id, file_name, source_version)
+    dataframe_cache.put(cache_key, df)
+
+    return df.copy(deep=False)
+
+def open_blob_stream(blob):
+    '''
+    Abre um blob do Google Cloud Storage para leitura binária em blocos de `GCS_READ_CHUNK_SIZE` bytes.
+
+    A leitura é fixada na geração atual do blob, de forma que uma sobrescrita concorrente
+    gera um erro em vez de misturar o conteúdo de duas versões do arquivo.
+
+    ### Parâmetros:
+    - `blob` (google.cloud.storage.Blob, obrigatório): O blob a ser lido, com os metadados já carregados.
+
+    ### Retorna:
+    - `google.cloud.storage.fileio.BlobReader`: Um objeto de arquivo binário.
+    '''
+    return blob.open('rb', chunk_size=GCS_READ_CHUNK_SIZE, if_generation_match=blob.generation)
+
+def get_manifest_path(dataset_id: str, file_name: str) -> str:
+    '''
+    Retorna o caminho do manifesto de ingestão de um arquivo CSV, salvo ao lado do cache colunar.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+
+    ### Retorna:
+    - `str`: O caminho do arquivo JSON com o manifesto.
+    '''
+    return f'app/datasets/{dataset_id}/{CACHE_DIR_NAME}/{file_name}.manifest.json'
+
+def save_manifest(dataset_id: str, file_name: str, manifest: dict) -> None:
+    '''
+    Salva o manifesto de ingestão de um arquivo CSV local, registrando a versão atual do arquivo.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `manifest` (dict, obrigatório): O manifesto, como retornado por `CsvIngest.manifest`.
+
+    ### Não retorna nada.
+    '''
+    manifest_path = get_manifest_path(dataset_id, file_name)
+    source_version = get_local_source_version(find_local_csv_path(dataset_id, file_name))
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+    temp_path = f'{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump({**manifest, 'source_version': source_version}, file)
+    os.replace(temp_path, manifest_path)
+
+def load_manifest(dataset_id: str, file_name: str) -> dict:
+    '''
+    Carrega o manifesto de ingestão de um arquivo CSV local.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+
+    ### Retorna:
+    - `dict`: O manifesto, ou `None` se ele não existir ou se o arquivo tiver sido alterado depois da ingestão.
+    '''
+    try:
+        with open(get_manifest_path(dataset_id, file_name)) as file:
+            manifest = json.load(file)
+        source_version = get_local_source_version(find_local_csv_path(dataset_id, file_name))
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('source_version') != source_version:
+        return None
+    return manifest
+
+def build_columnar_cache(dataset_id: str, file_name: str, manifest: dict) -> None:
+    '''
+    Constrói o cache colunar de um arquivo CSV local recém-recebido e completa o seu manifesto com
+    o número exato de linhas (e com as colunas e os tipos, se a ingestão não os inferiu).
+
+    O DataFrame lido não passa pelo `dataframe_cache`, de forma que o arquivo inteiro não fique em memória
+    depois da gravação; a primeira análise lê o cache colunar.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `manifest` (dict, obrigatório): O manifesto, como retornado por `CsvIngest.manifest`.
+
+    ### Não retorna nada.
+
+    ### Gera uma exceção:
+    - `FileNotFoundError`: Se o arquivo CSV não for encontrado localmente.
+    '''
+    file_path = find_local_csv_path(dataset_id, file_name)
+    df = pd.read_csv(file_path)
+    write_columnar_cache(df, get_columnar_cache_path(dataset_id, file_name), get_local_source_version(file_path))
+
+    manifest = {**manifest, 'rows': len(df)}
+    if not manifest['columns']:
+        manifest['columns'] = list(df.columns)
+        manifest['dtypes'] = {column: str(dtype) for column, dtype in df.dtypes.items()}
+    save_manifest(dataset_id, file_name, manifest)
+
+class CsvIngest:
+    '''
+    Acompanha a ingestão de um arquivo CSV recebido em blocos, calculando em uma única passada
+    o hash SHA-256 do conteúdo, o tamanho, o número de linhas e o esquema inferido a partir
+    dos primeiros `sample_bytes` bytes.
+
+    O número de linhas é obtido contando quebras de linha, então campos entre aspas com quebras de
+    linha são contados a mais; quando o cache colunar é construído, a contagem exata o substitui.
+    Arquivos `gzip` e `zstd` são descomprimidos em streaming para a contagem e para a amostra (o hash
+    é sempre do conteúdo recebido), em pedaços de no máximo `INGEST_DECOMPRESS_BYTES` bytes, de forma que um
+    bloco muito comprimido não ocupe centenas de MB ao ser descomprimido. Em arquivos `zip`, linhas e esquema
+    ficam vazios até a construção do cache.
+
+    ### Parâmetros:
+    - `compression` (str, opcional): A compressão do arquivo recebido (`gzip`, `zstd`, `zip` ou `None`). O padrão é `None`.
+    - `sample_bytes` (int, opcional): O tamanho da amostra usada para inferir o esquema. O padrão é `INGEST_SAMPLE_BYTES`.
+    '''
+    def __init__(self, compression: str = None, sample_bytes: int = INGEST_SAMPLE_BYTES):
+        self.compression = compression
+        self.sample_bytes = sample_bytes
+        self.size = 0
+        self.decompressed_size = 0
+        self.newlines = 0
+        self._last_byte = b''
+        self._sample = bytearray()
+        self._hash = hashlib.sha256()
+
+        if compression == 'gzip':
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif compression == 'zstd':
+            # O `stream_writer` entrega a saída a `write` em pedaços de até `write_size` bytes
+            self._decompressor = zstandard.ZstdDecompressor().stream_writer(self, write_size=INGEST_DECOMPRESS_BYTES)
+        else:
+            self._decompressor = None
+
+    def update(self, chunk: bytes) -> None:
+        '''
+        Processa o próximo bloco do arquivo.
+        '''
+        if not chunk:
+            return
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+        if self.compression == 'zip':
+            return
+        if self.compression == 'gzip':
+            while chunk:
+                self.write(self._decompressor.decompress(chunk, INGEST_DECOMPRESS_BYTES))
+                chunk = self._decompressor.unconsumed_tail
+        elif self.compression == 'zstd':
+            self._decompressor.write(chunk)
+        else:
+            self.write(chunk)
+
+    def write(self, chunk: bytes) -> int:
+        '''
+        Processa um pedaço do conteúdo descomprimido.
+        '''
+        if not chunk:
+            return 0
+        self.decompressed_size += len(chunk)
+        self.newlines += chunk.count(b'\n')
+        self._last_byte = chunk[-1:]
+        if len(self._sample) < self.sample_bytes:
+            self._sample.extend(chunk[:self.sample_bytes - len(self._sample)])
+        return len(chunk)
+
+    def manifest(self) -> dict:
+        '''
+        Retorna o manifesto da ingestão: `sha256`, `size`, `compression`, `rows`, `columns` e `dtypes`.
+        '''
+        if self.compression == 'zip':
+            return {
+                'sha256': self._hash.hexdigest(),
+                'size': self.size,
+                'compression': self.compression,
+                'rows': None,
+                'columns': [],
+                'dtypes': {},
+            }
+
+        lines = self.newlines + (1 if self._last_byte not in [b'', b'\n'] else 0)
+        sample = bytes(self._sample)
+        if self.decompressed_size > len(sample):
+            sample = sample[:sample.rfind(b'\n') + 1]
+
+        try:
+            df_sample = pd.read_csv(BytesIO(sample))
+            columns = df_sample.columns.tolist()
+            dtypes = {column: str(dtype) for column, dtype in df_sample.dtypes.items()}
+        except (ValueError, pd.errors.ParserError):
+            columns, dtypes = [], {}
+
+        return {
+            'sha256': self._hash.hexdigest(),
+            'size': self.size,
+            'compression': self.compression,
+            'rows': max(lines - 1, 0),
+            'columns': columns,
+            'dtypes': dtypes,
+        }
+
+def load_csv(dataset_id: str, file_name: str, index: bool = False, from_gcs: bool = False, columns: list = None, optimize_dtypes: bool = False) -> pd.DataFrame:
     '''
     Esta função carrega um arquivo CSV localmente ou de um bucket do Google Cloud Storage.
+
+    Os dados são servidos a partir de um cache colunar (Parquet), construído na primeira leitura
+    do CSV e reconstruído automaticamente sempre que o CSV de origem é alterado. Os DataFrames
+    carregados também ficam em memória no `dataframe_cache`; por isso o DataFrame retornado é
+    somente leitura e deve ser copiado (`df.copy()`) antes de ser alterado no lugar.
     
     ### Parâmetros:
     - `dataset_id` (str, obrigatório): O ID do dataset. O arquivo CSV correspondente a este dataset_id
@@ -34,25 +722,37 @@ def load_csv(dataset_id: str, file_name: str, index: bool = False, from_gcs: boo
     - `file_name` (str, obrigatório): O nome do arquivo CSV.
     - `index` (bool, opcional): Se o índice do DataFrame deve ser salvo no arquivo CSV. O padrão é `False`.
     - `from_gcs` (bool, opcional): Se o arquivo CSV deve ser carregado do bucket do Google Cloud Storage. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem carregadas. O padrão é `None` (todas as colunas).
+    - `optimize_dtypes` (bool, opcional): Se as colunas devem ser convertidas para tipos compactos (`float32`,
+                                          inteiros pequenos e `category`). O esquema inferido é salvo com o
+                                          dataset e reutilizado nas próximas leituras. O padrão é `False`.
     
     ### Retorna:
     - `pd.DataFrame`: Um DataFrame pandas contendo os dados do arquivo CSV carregado.
     '''
     if from_gcs:
-        return load_csv_from_gcs(dataset_id, file_name, index)
+        return load_csv_from_gcs(dataset_id, file_name, index, columns, optimize_dtypes)
     else:
-        return load_csv_from_local(dataset_id, file_name, index)
+        return load_csv_from_local(dataset_id, file_name, index, columns, optimize_dtypes)
 
-def load_csv_from_gcs(dataset_id: str, file_name: str, index: bool = False) -> pd.DataFrame:
+def load_csv_from_gcs(dataset_id: str, file_name: str, index: bool = False, columns: list = None, optimize_dtypes: bool = False) -> pd.DataFrame:
     '''
     Esta função baixa e carrega um arquivo CSV de um bucket do Google Cloud Storage.
 
+    O arquivo só é baixado quando o cache colunar local não existe ou quando a geração
+    do blob no bucket é diferente da registrada no cache. O download é feito em blocos de
+    `GCS_READ_CHUNK_SIZE` bytes entregues diretamente ao parser de CSV, sem manter o conteúdo
+    inteiro do arquivo em memória como bytes ou texto. Arquivos comprimidos (`.csv.gz`,
+    `.csv.zst` e `.csv.zip`) são descomprimidos durante a leitura.
+
     ### Parâmetros:
     - `dataset_id` (str, obrigatório): O ID do dataset. O arquivo CSV correspondente a este dataset_id
                                         deve estar localizado no bucket do Google Cloud Storage sob o
                                         caminho `{dataset_id}/{file_name}.csv`.
     - `file_name` (str, obrigatório): O nome do arquivo CSV.
     - `index` (bool, opcional): Se o índice do DataFrame deve ser salvo no arquivo CSV. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem carregadas. O padrão é `None` (todas as colunas).
+    - `optimize_dtypes` (bool, opcional): Se as colunas devem ser convertidas para tipos compactos. O padrão é `False`.
 
     ### Retorna:
     - `pd.DataFrame`: Um DataFrame pandas contendo os dados do arquivo CSV baixado.
@@ -60,29 +760,33 @@ def load_csv_from_gcs(dataset_id: str, file_name: str, index: bool = False) -> p
     ### Gera uma exceção:
     - `google.cloud.exceptions.NotFound`: Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket.
     '''
-    credentials = get_credentials()
-    storage_client = storage.Client(credentials=credentials)
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob_name = f'{dataset_id}/{file_name}.csv'
-    blob = bucket.blob(blob_name)
-    
-    blob_content_as_string = blob.download_as_text()
-    if index:
-        data = pd.read_csv(StringIO(blob_content_as_string), index_col=0)
-    else:
-        data = pd.read_csv(StringIO(blob_content_as_string))
+    blob, compression = get_gcs_csv_blob(dataset_id, file_name)
+
+    def read_csv_source():
+        with track_operation('download_stream'):
+            with open_blob_stream(blob) as blob_stream:
+                return pd.read_csv(blob_stream, compression=compression)
 
-    return data
+    return load_csv_through_caches(read_csv_source,
+                                   dataset_id,
+                                   file_name,
+                                   f'gcs-{blob.generation}',
+                                   index,
+                                   columns,
+                                   optimize_dtypes)
 
-def load_csv_from_local(dataset_id: str, file_name: str, index: bool = False) -> pd.DataFrame:
+def load_csv_from_local(dataset_id: str, file_name: str, index: bool = False, columns: list = None, optimize_dtypes: bool = False) -> pd.DataFrame:
     '''
     Esta função carrega um arquivo CSV localmente.
 
     ### Parâmetros:
     - `dataset_id` (str, obrigatório): O ID do dataset. O arquivo CSV correspondente a este dataset_id
-                                        deve estar localizado no diretório `app/datasets/{dataset_id}/{file_name}.csv`.
+                                        deve estar localizado no diretório `app/datasets/{dataset_id}/{file_name}.csv`
+                                        (ou `.csv.gz`, `.csv.zst` e `.csv.zip`, se comprimido).
     - `file_name` (str, obrigatório): O nome do arquivo CSV.
     - `index` (bool, opcional): Se o índice do DataFrame deve ser salvo no arquivo CSV. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem carregadas. O padrão é `None` (todas as colunas).
+    - `optimize_dtypes` (bool, opcional): Se as colunas devem ser convertidas para tipos compactos. O padrão é `False`.
 
     ### Retorna:
     - `pd.DataFrame`: Um DataFrame pandas contendo os dados do arquivo CSV carregado.
@@ -90,14 +794,341 @@ def load_csv_from_local(dataset_id: str, file_name: str, index: bool = False) ->
     ### Gera uma exceção:
     - `FileNotFoundError`: Se o arquivo CSV correspondente ao dataset_id não for encontrado localmente.
     '''
-    file_path = f'app/datasets/{dataset_id}/{file_name}.csv'
+    file_path = find_local_csv_path(dataset_id, file_name)
+
+    return load_csv_through_caches(lambda: pd.read_csv(file_path),
+                                   dataset_id,
+                                   file_name,
+                                   get_local_source_version(file_path),
+                                   index,
+                                   columns,
+                                   optimize_dtypes)
+
+def iter_csv_chunks(dataset_id: str,
+                    file_name: str,
+                    index: bool = False,
+                    from_gcs: bool = False,
+                    chunksize: int = CSV_CHUNK_SIZE):
+    '''
+    Percorre um dataset em blocos de até `chunksize` linhas, sem carregá-lo inteiro em memória.
+
+    Se o cache colunar estiver atualizado, os blocos são lidos dele em lotes; caso contrário, o CSV é lido
+    com `pd.read_csv(chunksize=...)`, localmente ou em streaming a partir do Google Cloud Storage.
+    Sem `index`, os blocos mantêm a numeração contínua das linhas do dataset inteiro.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `index` (bool, opcional): Se a primeira coluna do CSV deve ser usada como índice. O padrão é `False`.
+    - `from_gcs` (bool, opcional): Se o arquivo CSV deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+    - `chunksize` (int, opcional): O número máximo de linhas por bloco. O padrão é `CSV_CHUNK_SIZE`.
+
+    ### Retorna:
+    - `Iterator[pd.DataFrame]`: Os blocos do dataset, em ordem.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    '''
+    source, compression, source_version = resolve_csv_source(dataset_id, file_name, from_gcs)
+    cache_path = get_columnar_cache_path(dataset_id, file_name)
+    index_col = 0 if index else None
+
+    if is_columnar_cache_fresh(cache_path, source_version):
+        offset = 0
+        for batch in pq.ParquetFile(cache_path).iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            if index:
+                index_column = chunk.columns[0]
+                chunk = chunk.set_index(index_column)
+                if index_column.startswith('Unnamed: '):
+                    chunk.index.name = None
+            else:
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+
+    elif from_gcs:
+        with open_blob_stream(source) as blob_stream:
+            with pd.read_csv(blob_stream, index_col=index_col, chunksize=chunksize, compression=compression) as reader:
+                yield from reader
+
+    else:
+        with pd.read_csv(source, index_col=index_col, chunksize=chunksize) as reader:
+            yield from reader
+
+def resolve_csv_source(dataset_id: str, file_name: str, from_gcs: bool = False) -> tuple:
+    '''
+    Encontra o CSV de um dataset, localmente ou no bucket, e a sua versão atual.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `from_gcs` (bool, opcional): Se o arquivo CSV deve ser procurado no bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `tuple`: O blob (ou o caminho local), a compressão e a versão do arquivo.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    '''
+    if from_gcs:
+        blob, compression = get_gcs_csv_blob(dataset_id, file_name)
+        return blob, compression, f'gcs-{blob.generation}'
+
+    file_path = find_local_csv_path(dataset_id, file_name)
+    return file_path, split_csv_file_name(os.path.basename(file_path))[1], get_local_source_version(file_path)
+
+def read_csv_rows(dataset_id: str,
+                  file_name: str,
+                  offset: int = 0,
+                  limit: int = 5,
+                  index: bool = False,
+                  from_gcs: bool = False,
+                  columns: list = None) -> tuple:
+    '''
+    Lê apenas as linhas `[offset, offset + limit)` de um dataset, sem carregá-lo inteiro.
+
+    Com o cache colunar atualizado (construído no upload ou no primeiro carregamento), apenas os
+    grupos de linhas do arquivo Parquet que contêm a página são lidos, e somente das colunas pedidas,
+    então o tempo de resposta não depende do tamanho do dataset. Sem o cache, o CSV é lido até o
+    fim da página (localmente ou em streaming do bucket), e o total de linhas vem do manifesto, se houver.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `offset` (int, opcional): A posição da primeira linha. O padrão é `0`.
+    - `limit` (int, opcional): O número máximo de linhas. O padrão é `5`.
+    - `index` (bool, opcional): Se a primeira coluna do CSV deve ser usada como índice. O padrão é `False`.
+    - `from_gcs` (bool, opcional): Se o arquivo CSV deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+    - `columns` (list, opcional): As colunas a serem lidas. O padrão é `None` (todas as colunas).
+
+    ### Retorna:
+    - `tuple`: O DataFrame com as linhas pedidas (sem `index`, numerado pela posição das linhas no dataset)
+               e o número total de linhas do dataset, ou `None` se ele não for conhecido.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se alguma das colunas pedidas não existir no dataset.
+    - `google.cloud.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    '''
+    def project_columns(names: list) -> list:
+        if columns is None:
+            return None
+        missing = [column for column in columns if column not in names]
+        if missing:
+            raise ValueError(f'Colunas não encontradas no dataset: {missing}')
+        return ([names[0]] if index else []) + [column for column in columns if not (index and column == names[0])]
+
+    source, compression, source_version = resolve_csv_source(dataset_id, file_name, from_gcs)
+    cache_path = get_columnar_cache_path(dataset_id, file_name)
+
+    if is_columnar_cache_fresh(cache_path, source_version):
+        parquet_file = pq.ParquetFile(cache_path)
+        names = parquet_file.schema_arrow.names
+        total_rows = parquet_file.metadata.num_rows
+
+        row_groups = []
+        first_row = group_start = 0
+        for row_group in range(parquet_file.num_row_groups):
+            group_end = group_start + parquet_file.metadata.row_group(row_group).num_rows
+            if group_end > offset and group_start < offset + limit:
+                if not row_groups:
+                    first_row = group_start
+                row_groups.append(row_group)
+            group_start = group_end
+
+        read_columns = project_columns(names)
+
+        if row_groups:
+            df = parquet_file.read_row_groups(row_groups, columns=read_columns).to_pandas()
+            df = df.iloc[offset - first_row:offset - first_row + limit]
+        else:
+            df = parquet_file.schema_arrow.empty_table().to_pandas()
+            df = df[read_columns] if read_columns is not None else df
+    else:
+        manifest = load_manifest(dataset_id, file_name) if not from_gcs else None
+        total_rows = manifest['rows'] if manifest is not None else None
+
+        read_csv_kwargs = {'skiprows': range(1, offset + 1), 'nrows': limit, 'compression': compression}
+        if from_gcs:
+            with open_blob_stream(source) as blob_stream:
+                df = pd.read_csv(blob_stream, **read_csv_kwargs)
+        else:
+            df = pd.read_csv(source, **read_csv_kwargs)
+
+        read_columns = project_columns(df.columns.tolist())
+        if read_columns is not None:
+            df = df[read_columns]
+
     if index:
-        return pd.read_csv(file_path, index_col=0)
-    return pd.read_csv(file_path)
+        index_column = df.columns[0]
+        df = df.set_index(index_column)
+        if index_column.startswith('Unnamed: '):
+            df.index.name = None
+    else:
+        df.index = pd.RangeIndex(offset, offset + len(df))
+
+    return df, total_rows
+
+def get_statistics_state_path(dataset_id: str, file_name: str) -> str:
+    '''
+    Retorna o caminho do estado das estatísticas superficiais de um arquivo CSV.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+
+    ### Retorna:
+    - `str`: O caminho do arquivo `.npz` dentro do diretório de cache do dataset.
+    '''
+    return f'app/datasets/{dataset_id}/{CACHE_DIR_NAME}/{file_name}.statistics.npz'
+
+def get_file_tail_digest(file_path: str, size: int) -> str:
+    '''
+    Retorna o hash SHA-256 dos `STATISTICS_TAIL_BYTES` bytes que terminam na posição `size` de um arquivo.
+
+    ### Parâmetros:
+    - `file_path` (str, obrigatório): O caminho do arquivo.
+    - `size` (int, obrigatório): A posição do fim do trecho.
+
+    ### Retorna:
+    - `str`: O hash do trecho, em hexadecimal.
+    '''
+    start = max(size - STATISTICS_TAIL_BYTES, 0)
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        return hashlib.sha256(file.read(size - start)).hexdigest()
+
+def save_statistics_state(dataset_id: str, file_name: str, state: StatisticsState, metadata: dict) -> None:
+    '''
+    Salva o estado das estatísticas superficiais de um arquivo CSV no diretório de cache do dataset.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `state` (StatisticsState, obrigatório): O estado a ser salvo.
+    - `metadata` (dict, obrigatório): A versão do CSV de origem e as informações usadas para detectar linhas acrescentadas.
+
+    ### Não retorna nada.
+    '''
+    state_path = get_statistics_state_path(dataset_id, file_name)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+
+    temp_path = f'{state_path}.{os.getpid()}.{threading.get_ident()}.tmp.npz'
+    np.savez(temp_path, metadata=np.array(json.dumps(metadata)), **state.to_arrays())
+    os.replace(temp_path, state_path)
+
+def load_statistics_state(dataset_id: str, file_name: str) -> tuple:
+    '''
+    Carrega o estado das estatísticas superficiais de um arquivo CSV.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+
+    ### Retorna:
+    - `tuple`: O estado e os metadados salvos com ele, ou `(None, None)` se o estado não existir.
+    '''
+    try:
+        with np.load(get_statistics_state_path(dataset_id, file_name), allow_pickle=False) as arrays:
+            arrays = dict(arrays)
+    except (OSError, ValueError):
+        return None, None
+
+    metadata = json.loads(str(arrays.pop('metadata')))
+    return StatisticsState.from_arrays(arrays), metadata
+
+def update_statistics_state(dataset_id: str, file_name: str, index: bool = False, from_gcs: bool = False) -> StatisticsState:
+    '''
+    Retorna o estado das estatísticas superficiais de um dataset, atualizando o estado salvo se o CSV mudou.
+
+    Se o CSV local (sem compressão) apenas recebeu novas linhas no fim desde a última atualização, somente
+    as linhas novas são lidas e acumuladas no estado salvo. Em qualquer outra mudança (ou sem estado salvo),
+    o estado é recriado percorrendo o dataset em blocos com `iter_csv_chunks`.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `index` (bool, opcional): Se a primeira coluna do CSV deve ser usada como índice. O padrão é `False`.
+    - `from_gcs` (bool, opcional): Se o arquivo CSV deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `StatisticsState`: O estado atualizado.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    '''
+    source, compression, source_version = resolve_csv_source(dataset_id, file_name, from_gcs)
+    source_name = source.name if from_gcs else source
+    state, metadata = load_statistics_state(dataset_id, file_name)
+
+    if state is not None and (metadata['source'] != source_name or metadata['index'] != index):
+        state = None
+    if state is not None and metadata['source_version'] == source_version:
+        return state
+
+    new_metadata = {'source': source_name, 'source_version': source_version, 'index': index}
+
+    if from_gcs or compression is not None:
+        state = StatisticsState.from_chunks(iter_csv_chunks(dataset_id, file_name, index=index, from_gcs=from_gcs))
+        save_statistics_state(dataset_id, file_name, state, new_metadata)
+        return state
+
+    size = os.path.getsize(source)
+    appended = (state is not None
+                and size > metadata['size']
+                and metadata['ends_with_newline']
+                and get_file_tail_digest(source, metadata['size']) == metadata['tail_sha256'])
+
+    if appended:
+        print(f'Atualizando as estatísticas de "{source}" com as linhas acrescentadas...')
+        with open(source, 'rb') as file:
+            file.seek(metadata['size'])
+            with pd.read_csv(file, header=None, names=metadata['header'], index_col=0 if index else None,
+                             chunksize=CSV_CHUNK_SIZE) as reader:
+                for chunk in reader:
+                    state.update(chunk)
+        header = metadata['header']
+    else:
+        state = StatisticsState.from_chunks(iter_csv_chunks(dataset_id, file_name, index=index))
+        header = pd.read_csv(source, nrows=0).columns.tolist()
+
+    with open(source, 'rb') as file:
+        file.seek(max(size - 1, 0))
+        ends_with_newline = file.read(1) == b'\n'
+
+    new_metadata.update({
+        'header': header,
+        'size': size,
+        'ends_with_newline': ends_with_newline,
+        'tail_sha256': get_file_tail_digest(source, size),
+    })
+    save_statistics_state(dataset_id, file_name, state, new_metadata)
+    return state
+
+def get_csv_compression_options(file_name: str):
+    '''
+    Retorna as opções de compressão de `DataFrame.to_csv` para a compressão configurada em `CSV_COMPRESSION`.
+
+    ### Parâmetros:
+    - `file_name` (str, obrigatório): O nome do arquivo CSV, usado como nome do arquivo dentro de arquivos `zip`.
+
+    ### Retorna:
+    - `dict`: As opções de compressão, ou `None` para arquivos sem compressão.
+    '''
+    if CSV_COMPRESSION is None:
+        return None
+    if CSV_COMPRESSION == 'zip':
+        return {'method': 'zip', 'archive_name': f'{file_name}.csv'}
+    return {'method': CSV_COMPRESSION}
 
 def save_df(df: pd.DataFrame, dataset_id: str, file_name: str, index: bool = False, to_gcs: bool = False) -> None:
     '''
     Esta função salva um DataFrame pandas como um arquivo CSV localmente ou em um bucket do Google Cloud Storage.
+    O arquivo é comprimido de acordo com `CSV_COMPRESSION`, e a extensão muda de acordo (por exemplo, `.csv.gz`).
     
     ### Parâmetros:
     - `df` (pd.DataFrame, obrigatório): O DataFrame a ser salvo.
@@ -132,7 +1163,8 @@ def save_df_to_local(df: pd.DataFrame, dataset_id: str, file_name: str, index: b
     '''
     os.makedirs(f'app/datasets/{dataset_id}', exist_ok=True)
 
-    df.to_csv(f'app/datasets/{dataset_id}/{file_name}.csv', index=index)
+    df.to_csv(f'app/datasets/{dataset_id}/{file_name}{get_csv_extension()}', index=index,
+              compression=get_csv_compression_options(file_name))
 
 def save_df_to_gcs(df: pd.DataFrame, dataset_id: str, file_name: str, index: bool = False) -> None:
     '''
@@ -150,10 +1182,10 @@ def save_df_to_gcs(df: pd.DataFrame, dataset_id: str, file_name: str, index: boo
     ### Gera uma exceção:
     - `google.cloud.exceptions.GoogleCloudError`: Se ocorrer um erro ao tentar salvar o arquivo no bucket.
     '''
-    credentials = get_credentials()
-    storage_client = storage.Client(credentials=credentials)
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob_name = f'{dataset_id}/{file_name}.csv'
-    blob = bucket.blob(blob_name)
+    blob_name = f'{dataset_id}/{file_name}{get_csv_extension()}'
+    blob = get_bucket().blob(blob_name)
 
-    blob.upload_from_string(df.to_csv(index=index), 'text/csv')
\ No newline at end of file
+    buffer = BytesIO()
+    df.to_csv(buffer, index=index, compression=get_csv_compression_options(file_name))
+    with track_operation('upload'):
+        blob.upload_from_string(buffer.getvalue(), CSV_CONTENT_TYPES[CSV_COMPRESSION])
\ No newline at end of file
@@ -0,0 +1,207 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import gzip
+import shutil
+import glob
+import os
+
+from app.dataset_manager import load_manifest, split_csv_file_name, get_local_source_version, CACHE_DIR_NAME
+
+ETAG_CACHE_SIZE = 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+COMPRESSIBLE_EXTENSIONS = ['.csv', '.json', '.txt', '.svg']
+COMPRESSION_MIN_BYTES = 1024
+
+_etag_cache = OrderedDict()
+_etag_lock = threading.Lock()
+
+def get_file_version(file_path: str) -> tuple:
+    '''
+    Retorna a versão de um arquivo, a partir da data de modificação e do tamanho.
+
+    ### Parâmetros:
+    - `file_path` (str, obrigatório): O caminho do arquivo.
+
+    ### Retorna:
+    - `tuple`: A data de modificação em nanossegundos e o tamanho do arquivo em bytes.
+    '''
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+def get_file_etag(file_path: str) -> str:
+    '''
+    Retorna o ETag forte de um arquivo, derivado do hash SHA-256 do seu conteúdo.
+
+    O hash é calculado uma única vez por versão do arquivo (data de modificação e tamanho) e mantido
+    em memória para os últimos `ETAG_CACHE_SIZE` arquivos. Para datasets enviados por upload, o hash
+    já registrado no manifesto de ingestão é reutilizado, sem ler o arquivo.
+
+    ### Parâmetros:
+    - `file_path` (str, obrigatório): O caminho do arquivo.
+
+    ### Retorna:
+    - `str`: O ETag, entre aspas.
+    '''
+    version = get_file_version(file_path)
+    key = (os.path.abspath(file_path), version)
+
+    with _etag_lock:
+        if key in _etag_cache:
+            _etag_cache.move_to_end(key)
+            return _etag_cache[key]
+
+    digest = None
+    stem, _ = split_csv_file_name(os.path.basename(file_path))
+    if stem is not None:
+        manifest = load_manifest(os.path.basename(os.path.dirname(file_path)), stem)
+        if manifest is not None and manifest.get('source_version') == get_local_source_version(file_path):
+            digest = manifest['sha256']
+
+    if digest is None:
+        file_hash = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            while chunk := file.read(HASH_CHUNK_SIZE):
+                file_hash.update(chunk)
+        digest = file_hash.hexdigest()
+
+    etag = f'"{digest}"'
+    with _etag_lock:
+        _etag_cache[key] = etag
+        while len(_etag_cache) > ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+    return etag
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    '''
+    Verifica se o cabeçalho `If-None-Match` corresponde ao ETag atual.
+
+    ### Parâmetros:
+    - `if_none_match` (str, obrigatório): O valor do cabeçalho `If-None-Match`.
+    - `etag` (str, obrigatório): O ETag atual.
+
+    ### Retorna:
+    - `bool`: `True` se o cliente já possui a versão atual.
+    '''
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+def parse_range_header(range_header: str, size: int) -> tuple:
+    '''
+    Interpreta o cabeçalho `Range` de uma requisição, no formato `bytes=início-fim`, `bytes=início-` ou `bytes=-sufixo`.
+
+    Apenas um intervalo é suportado; requisições com vários intervalos ou em outras unidades são
+    respondidas com o arquivo inteiro, como permitido pela RFC 9110.
+
+    ### Parâmetros:
+    - `range_header` (str, obrigatório): O valor do cabeçalho `Range`.
+    - `size` (int, obrigatório): O tamanho do arquivo em bytes.
+
+    ### Retorna:
+    - `tuple`: O primeiro e o último byte do intervalo (inclusive), ou `None` se o arquivo inteiro deve ser enviado.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o intervalo não puder ser atendido (a resposta deve ser 416).
+    '''
+    unit, _, ranges = range_header.partition('=')
+    if unit.strip() != 'bytes' or ',' in ranges:
+        return None
+
+    start, separator, end = ranges.strip().partition('-')
+    if not separator or not (start or end) or not (start or '0').isdigit() or not (end or '0').isdigit():
+        return None
+
+    if not start:
+        suffix = int(end)
+        if suffix == 0 or size == 0:
+            raise ValueError(f'Intervalo "{range_header}" não pode ser atendido')
+        return max(size - suffix, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(f'Intervalo "{range_header}" não pode ser atendido')
+    return start, end
+
+def iter_file_range(file_path: str, start: int, end: int, chunk_size: int = HASH_CHUNK_SIZE):
+    '''
+    Percorre os bytes `[start, end]` de um arquivo em blocos de até `chunk_size` bytes.
+
+    ### Parâmetros:
+    - `file_path` (str, obrigatório): O caminho do arquivo.
+    - `start` (int, obrigatório): O primeiro byte.
+    - `end` (int, obrigatório): O último byte (inclusive).
+    - `chunk_size` (int, opcional): O tamanho máximo de cada bloco. O padrão é `HASH_CHUNK_SIZE`.
+
+    ### Retorna:
+    - `Iterator[bytes]`: Os blocos do intervalo, em ordem.
+    '''
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def get_gzip_variant(file_path: str) -> str:
+    '''
+    Retorna a versão comprimida com gzip de um arquivo de texto, criando-a no diretório de cache se necessário.
+
+    A versão comprimida é gravada em `app/datasets/{dataset_id}/.cache/{file_name}.{sha256}.gz`, identificada pelo
+    hash do conteúdo do arquivo original (o mesmo do ETag), e reutilizada nas requisições seguintes; as versões
+    de conteúdos anteriores são removidas. Arquivos binários (como imagens PNG),
+    arquivos já comprimidos e arquivos com menos de `COMPRESSION_MIN_BYTES` bytes não são comprimidos.
+
+    ### Parâmetros:
+    - `file_path` (str, obrigatório): O caminho do arquivo original.
+
+    ### Retorna:
+    - `str`: O caminho da versão comprimida, ou `None` se o arquivo não deve ser comprimido.
+    '''
+    if os.path.splitext(file_path)[1] not in COMPRESSIBLE_EXTENSIONS or os.path.getsize(file_path) < COMPRESSION_MIN_BYTES:
+        return None
+
+    cache_dir = os.path.join(os.path.dirname(file_path), CACHE_DIR_NAME)
+    digest = get_file_etag(file_path).strip('"')
+    gzip_path = os.path.join(cache_dir, f'{os.path.basename(file_path)}.{digest}.gz')
+    if os.path.exists(gzip_path):
+        return gzip_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f'{gzip_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(file_path, 'rb') as source, gzip.open(temp_path, 'wb', compresslevel=6) as target:
+        shutil.copyfileobj(source, target, HASH_CHUNK_SIZE)
+    os.replace(temp_path, gzip_path)
+
+    for stale_path in glob.glob(os.path.join(glob.escape(cache_dir), f'{glob.escape(os.path.basename(file_path))}.*.gz')):
+        if stale_path != gzip_path:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+    return gzip_path
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    '''
+    Verifica se o cabeçalho `Accept-Encoding` aceita respostas comprimidas com gzip.
+
+    ### Parâmetros:
+    - `accept_encoding` (str, obrigatório): O valor do cabeçalho `Accept-Encoding`.
+
+    ### Retorna:
+    - `bool`: `True` se o cliente aceita gzip.
+    '''
+    if not accept_encoding:
+        return False
+    for encoding in accept_encoding.split(','):
+        name, _, parameters = encoding.strip().partition(';')
+        if name.strip() in ['gzip', '*']:
+            return parameters.replace(' ', '') not in ['q=0', 'q=0.0', 'q=0.00', 'q=0.000']
+    return False
@@ -1,11 +1,8 @@
-from google.cloud import storage
 import numpy as np
 import json
-import sys
 import os
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
-from dataset_manager import get_credentials, BUCKET_NAME
+from app.storage_manager import get_bucket, track_operation
 
 class numpy_encoder(json.JSONEncoder):
     def default(self, obj):
@@ -68,10 +65,31 @@ def save_json_to_gcs(data: dict, dataset_id: str, file_name: str) -> None:
     ### Gera uma exceção:
     - `google.cloud.exceptions.GoogleCloudError`: Se ocorrer um erro ao tentar salvar o arquivo no bucket.
     '''
-    credentials = get_credentials()
-    storage_client = storage.Client(credentials=credentials)
-    bucket = storage_client.bucket(BUCKET_NAME)
     blob_name = f'{dataset_id}/{file_name}.json'
-    blob = bucket.blob(blob_name)
+    blob = get_bucket().blob(blob_name)
 
-    blob.upload_from_string(json.dumps(data, cls=numpy_encoder), 'application/json')
\ No newline at end of file
+    with track_operation('upload'):
+        blob.upload_from_string(json.dumps(data, cls=numpy_encoder), 'application/json')
+
+def load_json(dataset_id: str, file_name: str, from_gcs: bool = False) -> dict:
+    '''
+    Esta função carrega um arquivo JSON salvo por `save_json`, localmente ou de um bucket do Google Cloud Storage.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo JSON, sem a extensão.
+    - `from_gcs` (bool, opcional): Se o arquivo JSON deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `dict`: O conteúdo do arquivo.
+
+    ### Gera uma exceção:
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    - `google.api_core.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    '''
+    if from_gcs:
+        blob = get_bucket().blob(f'{dataset_id}/{file_name}.json')
+        with track_operation('download'):
+            return json.loads(blob.download_as_bytes())
+    with open(f'app/datasets/{dataset_id}/{file_name}.json') as file:
+        return json.load(file)
@@ -8,18 +8,21 @@ from lightgbm import LGBMClassifier
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.inspection import permutation_importance
 from sklearn.preprocessing import StandardScaler
+from sklearn.utils.validation import has_fit_parameter
+from threadpoolctl import threadpool_limits
 import numpy as np
 import pandas as pd
-import sys
-import os
 import datetime
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
-from dataset_manager import load_csv
-from json_manager import save_json
-from image_manager import create_decision_tree_image, save_image_to_gcs, delete_decision_tree_image
+from app.dataset_manager import load_csv, dataframe_cache
+from app.json_manager import save_json
+from app.image_manager import create_decision_tree_image, save_image_to_gcs, delete_decision_tree_image
+from app.training_scheduler import training_scheduler, TRAINING_PRIORITY
+from app.training_processes import SharedDataset, TrainingProcessPool, training_process_pool
 
 SEED = 42
+MODELS = ['logistic_regression', 'decision_tree', 'random_forest', 'xgboost', 'lightgbm', 'mlp']
+MULTITHREADED_MODELS = ['random_forest', 'xgboost', 'lightgbm']
 training_tasks = {}
 
 def calculate_max_iter(df_length: int, base_iter: int = 200, scale_factor: float = 0.05) -> int:
@@ -27,9 +30,20 @@ def calculate_max_iter(df_length: int, base_iter: int = 200, scale_factor: float
         return base_iter
     return int(base_iter + scale_factor * np.log(df_length) * base_iter)
 
+def queue_training_task(dataset_id: str, model_name: str) -> None:
+    print(f'Queued training task for dataset {dataset_id} and model {model_name}')
+    training_tasks[f'{dataset_id}_{model_name}'] = {
+        'dataset_id': dataset_id,
+        'model_name': model_name,
+        'status': 'queued',
+        'queued_time': datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
 def start_training_task(dataset_id: str, model_name: str) -> None:
     print(f'Started training task for dataset {dataset_id} and model {model_name}')
+    task = training_tasks.get(f'{dataset_id}_{model_name}', {})
     training_tasks[f'{dataset_id}_{model_name}'] = {
+        **task,
         'dataset_id': dataset_id,
         'model_name': model_name,
         'status': 'running',
@@ -46,23 +60,20 @@ def failed_training_task(dataset_id: str, model_name: str) -> None:
     training_tasks[f'{dataset_id}_{model_name}']['status'] = 'failed'
     training_tasks[f'{dataset_id}_{model_name}']['finish_time'] = datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
 
-def load_dataset(dataset_id: str, file_name: str, index: bool = False) -> pd.DataFrame:
-    if index:
-        return load_csv(dataset_id, file_name, index_col=0)
-    else:
-        return load_csv(dataset_id, file_name)
+def load_dataset(dataset_id: str, file_name: str, index: bool = False, from_gcs: bool = False) -> pd.DataFrame:
+    return load_csv(dataset_id, file_name, index=index, from_gcs=from_gcs)
 
-def get_selected_model(model:str, max_iter) -> object:
+def get_selected_model(model:str, max_iter, n_jobs: int = None) -> object:
     if model == 'logistic_regression':
         return LogisticRegression(random_state=SEED)
     elif model == 'decision_tree':
         return DecisionTreeClassifier(random_state=SEED)
     elif model == 'random_forest':
-        return RandomForestClassifier(random_state=SEED)
+        return RandomForestClassifier(random_state=SEED, n_jobs=n_jobs)
     elif model == 'xgboost':
-        return XGBClassifier(random_state=SEED)
+        return XGBClassifier(random_state=SEED, n_jobs=n_jobs)
     elif model == 'lightgbm':
-        return LGBMClassifier(random_state=SEED)
+        return LGBMClassifier(random_state=SEED, n_jobs=n_jobs)
     elif model == 'mlp':
         return MLPClassifier(hidden_layer_sizes=(100, 50, 25),
                              alpha=0.01,
@@ -74,56 +85,168 @@ def get_selected_model(model:str, max_iter) -> object:
                              n_iter_no_change=int(0.15*max_iter),
                              verbose=True)
 
+def fit_model(model, X_train: pd.DataFrame, y_train: pd.Series, sample_weight: np.ndarray = None):
+    '''
+    Treina o modelo, com os pesos de um balanceamento virtual (veja `get_balance_weights`), se houver.
+
+    Os modelos que aceitam `sample_weight` recebem os pesos diretamente, sem as linhas de peso `0`. Os demais (como
+    o `MLPClassifier`) são treinados com cada linha repetida tantas vezes quanto o seu peso, selecionadas pelos índices.
+    '''
+    if sample_weight is None:
+        return model.fit(X_train, y_train)
+
+    if has_fit_parameter(model, 'sample_weight'):
+        rows = np.flatnonzero(sample_weight)
+        return model.fit(X_train.iloc[rows], y_train.iloc[rows], sample_weight=sample_weight[rows])
+
+    rows = np.repeat(np.arange(len(sample_weight)), sample_weight)
+    return model.fit(X_train.iloc[rows], y_train.iloc[rows])
+
+def evaluate_model(X: pd.DataFrame, y: pd.Series, model_name: str, sample_weight: np.ndarray = None,
+                   n_jobs: int = None, return_model: bool = True) -> tuple:
+    '''
+    Treina e avalia um modelo, sem efeitos colaterais (estado dos treinamentos ou arquivos), de forma que possa ser
+    executada tanto em uma thread quanto em um processo de treinamento (veja `TrainingProcessPool`).
+
+    ### Parâmetros:
+    - `X` (DataFrame, obrigatório): Os atributos.
+    - `y` (Series, obrigatório): A classe.
+    - `model_name` (str, obrigatório): O modelo a ser treinado (veja `MODELS`).
+    - `sample_weight` (np.ndarray, opcional): Os pesos de um balanceamento virtual. O padrão é `None`.
+    - `n_jobs` (int, opcional): O número de threads dos modelos com várias threads. O padrão é `None`.
+    - `return_model` (bool, opcional): Se o modelo treinado deve ser retornado. O padrão é `True`.
+
+    ### Retorna:
+    - `tuple`: O resultado (métricas de teste, matriz de confusão e importância dos atributos) e o modelo
+               (ou `None`, se `return_model` for `False`).
+    '''
+    if sample_weight is not None and len(sample_weight) != len(X):
+        raise ValueError(f'Os pesos têm {len(sample_weight)} linhas, mas o dataset tem {len(X)}')
+
+    max_iter = calculate_max_iter(df_length=len(X) if sample_weight is None else int(sample_weight.sum()))
+
+    #scaler = StandardScaler()
+    #X = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
+
+    weights = np.ones(len(X), dtype=np.uint32) if sample_weight is None else np.asarray(sample_weight)
+    X_train, X_test, y_train, y_test, weights_train, _ = train_test_split(
+        X, y, weights, test_size=0.2, stratify=y, shuffle=True, random_state=SEED)
+
+    model = get_selected_model(model_name, max_iter=max_iter, n_jobs=n_jobs)
+    fit_model(model, X_train, y_train, None if sample_weight is None else weights_train)
+
+    y_pred = model.predict(X_test)
+
+    metrics = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+    metrics['accuracy'] = accuracy_score(y_test, y_pred, normalize=True)
+
+    cm = confusion_matrix(y_test, y_pred)
+
+    importance = permutation_importance(model, X_test, y_test, n_repeats=10)
+    feature_importance = np.mean(importance.importances, axis=1)
+    feature_importance_ranking = {name: importance for name, importance in sorted(zip(X.columns, feature_importance), key=lambda x: x[1], reverse=True)}
+
+    result = {
+        'performance_metrics': metrics,
+        'confusion_matrix': cm.tolist(),
+        'feature_importance': feature_importance_ranking,
+    }
+    return result, model if return_model else None
+
+def evaluate_shared_dataset(description: dict, model_name: str, n_jobs: int = None, return_model: bool = True) -> tuple:
+    '''
+    Executa `evaluate_model` em um processo de treinamento, com o dataset lido da memória compartilhada
+    (veja `SharedDataset`) e as bibliotecas nativas do processo limitadas a `n_jobs` threads.
+    '''
+    shared, X, y, sample_weight = SharedDataset.attach(description)
+    try:
+        with threadpool_limits(limits=n_jobs):
+            return evaluate_model(X, y, model_name, sample_weight, n_jobs, return_model)
+    finally:
+        del X, y, sample_weight
+        for shared_array in shared:
+            shared_array.close()
+
+def evaluate_stored_dataset(dataset_id: str, file_name: str, model_name: str, index: bool = False, from_gcs: bool = False,
+                            sample_weight: np.ndarray = None, n_jobs: int = None, return_model: bool = True) -> tuple:
+    '''
+    Executa `evaluate_model` em um processo de treinamento, com o dataset carregado pelo próprio processo e as
+    bibliotecas nativas do processo limitadas a `n_jobs` threads.
+
+    O `dataframe_cache` do processo de treinamento fica sem orçamento: o dataset é usado por um único treinamento,
+    e mantê-lo em cache ocuparia a memória do processo até que ele fosse encerrado.
+    '''
+    dataframe_cache.set_max_bytes(0)
+    df = load_dataset(dataset_id, file_name, index=index, from_gcs=from_gcs)
+    with threadpool_limits(limits=n_jobs):
+        return evaluate_model(df.drop(columns=['Class']), df['Class'], model_name, sample_weight, n_jobs, return_model)
+
 def train_and_evaluate_model(dataset_id: str,
                              file_name: str,
                              model_name: str,
                              df: pd.DataFrame = None,
-                             index: bool = False) -> dict:
+                             index: bool = False,
+                             from_gcs: bool = False,
+                             sample_weight: np.ndarray = None,
+                             n_jobs: int = None,
+                             shared_dataset: SharedDataset = None,
+                             process_pool: TrainingProcessPool = None) -> dict:
     
     start_training_task(dataset_id, model_name)
 
     try:
-        if df is None:
-            df = load_dataset(dataset_id, file_name, index=index)
-        
-        max_iter = calculate_max_iter(df_length=len(df))
-        
-        y = df['Class']
-
-        X = df.drop(columns=['Class'])
-
-        #scaler = StandardScaler()
-        #X = pd.DataFrame(scaler.fit_transform(X), columns=X.columns)
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=y, shuffle=True, random_state=SEED)
-        
-        model = get_selected_model(model_name, max_iter=max_iter)
-        model.fit(X_train, y_train)
+        return_model = model_name == 'decision_tree'
+        if process_pool is not None and shared_dataset is not None:
+            result, model = process_pool.run(evaluate_shared_dataset, shared_dataset.describe(), model_name, n_jobs, return_model)
+        elif process_pool is not None:
+            result, model = process_pool.run(evaluate_stored_dataset, dataset_id, file_name, model_name, index, from_gcs,
+                                             sample_weight, n_jobs, return_model)
+        else:
+            if df is None:
+                df = load_dataset(dataset_id, file_name, index=index, from_gcs=from_gcs)
+            result, model = evaluate_model(df.drop(columns=['Class']), df['Class'], model_name, sample_weight, n_jobs, return_model)
 
         if model_name == 'decision_tree':
-            create_decision_tree_image(model, X.columns.tolist(), f'app/datasets/{dataset_id}/{file_name}_decision_tree')
+            create_decision_tree_image(model, model.feature_names_in_.tolist(), f'app/datasets/{dataset_id}/{file_name}_decision_tree')
             # save_image(dataset_id, f'{file_name}_decision_tree.png')
             # delete_decision_tree_image(f'{file_name}_decision_tree.png')
 
-        y_pred = model.predict(X_test)
-        
-        metrics = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
-        metrics['accuracy'] = accuracy_score(y_test, y_pred, normalize=True)
-
-        cm = confusion_matrix(y_test, y_pred)
-
-        importance = permutation_importance(model, X_test, y_test, n_repeats=10)
-        feature_importance = np.mean(importance.importances, axis=1)
-        feature_importance_ranking = {name: importance for name, importance in sorted(zip(X.columns, feature_importance), key=lambda x: x[1], reverse=True)}
-        
-        result = {
-            'performance_metrics': metrics,
-            'confusion_matrix': cm.tolist(),
-            'feature_importance': feature_importance_ranking,
-        }
-
         save_json(result, dataset_id, f'{file_name}_{model_name}')
         finish_training_task(dataset_id, model_name)
     except Exception as e:
         failed_training_task(dataset_id, model_name)
-        raise e
\ No newline at end of file
+        raise e
+    finally:
+        if shared_dataset is not None:
+            shared_dataset.release()
+
+def get_model_cpu_slots(model_name: str, cpu_slots: int = None) -> int:
+    '''
+    Retorna o número de CPUs reservadas para o treinamento de um modelo: metade das CPUs do escalonador para os
+    modelos com várias threads (`MULTITHREADED_MODELS`), de forma que dois deles possam ser treinados ao mesmo tempo,
+    e uma para os demais.
+    '''
+    cpu_slots = cpu_slots or training_scheduler.cpu_slots
+    return max(1, cpu_slots // 2) if model_name in MULTITHREADED_MODELS else 1
+
+def schedule_training(dataset_id: str, file_name: str, model_name: str, priority: int = TRAINING_PRIORITY, **kwargs) -> str:
+    '''
+    Enfileira o treinamento de um modelo no `training_scheduler`, que executa `train_and_evaluate_model` com as CPUs
+    reservadas por `get_model_cpu_slots`. Enquanto espera, o treinamento aparece em `training_tasks` como `queued`.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `model_name` (str, obrigatório): O modelo a ser treinado (veja `MODELS`).
+    - `priority` (int, opcional): A prioridade; valores menores são executados antes. O padrão é `TRAINING_PRIORITY`.
+
+    Os demais argumentos (`df`, `index`, `from_gcs`, `sample_weight`, `shared_dataset` e `process_pool`) são repassados para
+    `train_and_evaluate_model`. Um `shared_dataset` deve ser reservado (`acquire`) para cada treinamento enfileirado.
+
+    ### Retorna:
+    - `str`: O identificador do treinamento.
+    '''
+    queue_training_task(dataset_id, model_name)
+    return training_scheduler.submit(f'{dataset_id}_{model_name}', train_and_evaluate_model,
+                                     priority=priority, cpu_slots=get_model_cpu_slots(model_name),
+                                     dataset_id=dataset_id, file_name=file_name, model_name=model_name, **kwargs)
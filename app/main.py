@@ -1,25 +1,32 @@
-from app.machine_learning import train_and_evaluate_model, training_tasks
+from app.machine_learning import schedule_training, training_tasks, training_scheduler, training_process_pool, SharedDataset, MODELS, TRAINING_PRIORITY
 from app.outliers_treater import transform_outliers
-from app.outliers_detector import detect_outliers
-from app.superficial_analysis import generate_statistics, generate_correlation_matrix
-from app.missing_data_treater import handle_missing_data
-from app.dataset_balancer import random_under_sampling, random_over_sampling, smote, bsmote, adasyn
-from app.json_manager import save_json
-from app.dataset_manager import load_csv, save_df
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from app.outliers_detector import detect_outlier_masks
+from app.outliers_store import OutlierMasks, save_outliers, load_column_outliers
+from app.superficial_analysis import generate_statistics, generate_correlation_matrix, generate_statistics_chunked, generate_pearson_correlation_chunked, generate_statistics_from_state, generate_statistics_sampled, generate_correlation_matrix_sampled
+from app.missing_data_treater import handle_missing_data, MissingDataImputer, IMPUTATION_METHODS
+from app.dataset_balancer import balance_df, get_balance_weights, save_balance_weights, load_balance_weights, BALANCE_WEIGHTS_EXTENSION
+from app.json_manager import save_json, load_json
+from app.artifact_writer import artifact_writer
+from app.result_cache import result_cache, get_dataset_digest, get_result_key, get_artifact_location
+from app.file_server import get_file_etag, etag_matches, parse_range_header, iter_file_range, get_gzip_variant, accepts_gzip
+from app.dataset_manager import load_csv, read_csv_rows, save_df, get_operation_stats, iter_csv_chunks, CsvIngest, save_manifest, build_columnar_cache, split_csv_file_name, update_statistics_state
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
+from starlette.concurrency import run_in_threadpool
 from google.api_core.exceptions import NotFound
-from threading import Thread
+import pandas as pd
 import os
-import sys
 from pathlib import Path
-
-sys.path.insert(0, os.path.abspath(
-    os.path.join(os.path.dirname(__file__), '.')))
+from typing import List
+from mimetypes import guess_type
 
 USE_GCS = False
+OPTIMIZE_DTYPES = False
+USE_TRAINING_PROCESSES = True
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PREVIEW_MAX_LIMIT = 1000
 
 app = FastAPI()
 
@@ -29,9 +36,108 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['X-Total-Count', 'ETag', 'Content-Range'],
 )
 
 
+def check_sampling_parameters(sample_size: int = None, time_budget: float = None) -> bool:
+    '''
+    Valida os parâmetros do modo amostral e retorna se ele foi pedido.
+
+    ### Gera uma exceção:
+    - `HTTPException`: Se `sample_size` ou `time_budget` não forem positivos.
+                       A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
+    '''
+    if (sample_size is not None and sample_size <= 0) or (time_budget is not None and time_budget <= 0):
+        raise HTTPException(status_code=400, detail='sample_size e time_budget devem ser positivos')
+    return sample_size is not None or time_budget is not None
+
+
+def check_n_jobs(n_jobs: int = None) -> None:
+    '''
+    Valida o número de processos usados na divisão das colunas entre processos (veja `map_column_shards`).
+
+    ### Gera uma exceção:
+    - `HTTPException`: Se `n_jobs` não for positivo. A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
+    '''
+    if n_jobs is not None and n_jobs < 1:
+        raise HTTPException(status_code=400, detail='n_jobs deve ser positivo')
+
+
+def find_cached_result(endpoint: str, dataset_id: str, file_name: str, parameters: dict, use_cache: bool = True) -> tuple:
+    '''
+    Procura no `result_cache` o resultado de um endpoint para o conteúdo atual do dataset e os parâmetros dados.
+
+    Em um acerto, os artefatos que não estão mais publicados (apagados ou sobrescritos) são enfileirados
+    novamente a partir do cache, sem carregar o dataset.
+
+    ### Parâmetros:
+    - `endpoint` (str, obrigatório): O nome do endpoint.
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `parameters` (dict, obrigatório): Os parâmetros que afetam o resultado.
+    - `use_cache` (bool, opcional): Se o resultado armazenado pode ser usado. Com `False`, o resultado é recalculado
+                                    e substitui o armazenado. O padrão é `True`.
+
+    ### Retorna:
+    - `tuple`: A chave do resultado (`None` se o dataset não for encontrado) e a resposta armazenada (`None` se não houver).
+    '''
+    try:
+        dataset_digest = get_dataset_digest(dataset_id, file_name, from_gcs=USE_GCS)
+    except (FileNotFoundError, NotFound):
+        return None, None
+
+    key = get_result_key(endpoint, dataset_digest,
+                         {**parameters, 'to_gcs': USE_GCS, 'optimize_dtypes': OPTIMIZE_DTYPES})
+    entry = result_cache.get(key) if use_cache else None
+    if entry is None:
+        return key, None
+
+    artifacts = []
+    for artifact_name, artifact in entry['artifacts'].items():
+        location = get_artifact_location(dataset_id, artifact_name, artifact['kind'], to_gcs=USE_GCS)
+        if not result_cache.is_published(key, location, to_gcs=USE_GCS):
+            artifacts.append(artifact_writer.submit(
+                f'{dataset_id}/{artifact_name}', result_cache.publish, key, dataset_id, artifact_name,
+                None, artifact['kind'], to_gcs=USE_GCS, **artifact['save_kwargs']))
+
+    print(f'Resultado de "{endpoint}" encontrado no cache de resultados')
+    return key, JSONResponse(content={**entry['response'], 'artifacts': artifacts, 'cached': True})
+
+
+def submit_results(key: str, dataset_id: str, response: dict, results: dict) -> list:
+    '''
+    Enfileira a gravação dos artefatos de um endpoint e, se `key` não for `None`, o armazenamento do resultado
+    no `result_cache`.
+
+    ### Parâmetros:
+    - `key` (str, obrigatório): A chave do resultado, como retornada por `find_cached_result`.
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `response` (dict, obrigatório): O conteúdo da resposta do endpoint, sem os artefatos.
+    - `results` (dict, obrigatório): Para cada nome de artefato, uma tupla com o valor (DataFrame, `OutlierMasks` ou dicionário)
+                                     e os argumentos da função de gravação.
+
+    ### Retorna:
+    - `list`: Os identificadores dos artefatos enfileirados.
+    '''
+    artifacts = []
+    cached_results = {}
+    for artifact_name, (value, save_kwargs) in results.items():
+        kind = 'df' if isinstance(value, pd.DataFrame) else 'outliers' if isinstance(value, OutlierMasks) else 'json'
+        cached_results[artifact_name] = (value, kind, save_kwargs)
+        if key is None:
+            save_function = {'df': save_df, 'outliers': save_outliers, 'json': save_json}[kind]
+            artifacts.append(artifact_writer.submit(f'{dataset_id}/{artifact_name}', save_function, value,
+                                                    dataset_id, artifact_name, to_gcs=USE_GCS, **save_kwargs))
+        else:
+            artifacts.append(artifact_writer.submit(f'{dataset_id}/{artifact_name}', result_cache.publish, key, dataset_id,
+                                                    artifact_name, value, kind, to_gcs=USE_GCS, **save_kwargs))
+
+    if key is not None:
+        artifact_writer.submit(f'{dataset_id}/result_cache/{key}', result_cache.put, key, response, cached_results)
+    return artifacts
+
+
 @app.get('/', response_description='Retorna a mensagem de boas vindas',)
 def hello():
     '''
@@ -46,9 +152,13 @@ def hello():
 @app.get('/dataset/{dataset_id}/{file_name}', response_description='Carrega os dados de um dataset',)
 def load_dataset(dataset_id: str,
                  file_name: str,
-                 index: bool = False):
+                 index: bool = False,
+                 offset: int = 0,
+                 limit: int = 5,
+                 columns: List[str] = Query(None)):
     '''
-    Esta função carrega os dados de um dataset a partir do bucket do Google Cloud Storage. 
+    Esta função retorna uma página das linhas de um dataset, lendo apenas as linhas e colunas pedidas
+    a partir do cache colunar (veja `read_csv_rows`). Sem `offset` e `limit`, retorna as 5 primeiras linhas.
 
     Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket, 
     a função retorna um código de status HTTP 404 e uma mensagem de erro personalizada.
@@ -59,32 +169,48 @@ def load_dataset(dataset_id: str,
                                         caminho `{dataset_id}/{file_name}.csv`.
     - `file_name` (str, obrigatório): O nome do arquivo CSV.
     - `index` (bool, opcional): Se o DataFrame possui índice a ser carregado. O padrão é `False`.
+    - `offset` (int, opcional): A posição da primeira linha da página. O padrão é `0`.
+    - `limit` (int, opcional): O número de linhas da página, até `PREVIEW_MAX_LIMIT`. O padrão é `5`.
+    - `columns` (list, opcional): As colunas a serem retornadas (o parâmetro pode ser repetido). O padrão é `None` (todas as colunas).
 
     ### Retorna:
-    - `JSONResponse`: Um JSONResponse onde o conteúdo é uma lista de registros do arquivo CSV baixado.
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é uma lista de registros da página pedida.
                       Cada registro é um dicionário onde a chave é o nome da coluna e o valor é o valor da célula.
+                      O número total de linhas do dataset, quando conhecido, é enviado no cabeçalho `X-Total-Count`.
 
     ### Gera uma exceção:
     - `HTTPException`: Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket.
                        A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
+    - `HTTPException`: Se `offset` ou `limit` forem inválidos, ou se alguma coluna não existir.
+                       A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
     '''
+    if offset < 0 or limit < 0 or limit > PREVIEW_MAX_LIMIT:
+        raise HTTPException(
+            status_code=400, detail=f'Parâmetros inválidos: "offset" deve ser positivo e "limit" deve estar entre 0 e {PREVIEW_MAX_LIMIT}')
+
     try:
-        if index:
-            df = load_csv(dataset_id=dataset_id,
-                          file_name=file_name, index=0, from_gcs=USE_GCS)
-        else:
-            df = load_csv(dataset_id=dataset_id,
-                          file_name=file_name, from_gcs=USE_GCS)
-        return JSONResponse(content=df.head().to_dict(orient='records'))
-    except NotFound:
+        df, total_rows = read_csv_rows(dataset_id=dataset_id, file_name=file_name, offset=offset,
+                                       limit=limit, index=index, from_gcs=USE_GCS, columns=columns)
+    except (NotFound, FileNotFoundError):
         raise HTTPException(
             status_code=404, detail=f'Dataset "{dataset_id}/{file_name}" não encontrado no bucket')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {'X-Total-Count': str(total_rows)} if total_rows is not None else None
+    records = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    return JSONResponse(content=records, headers=headers)
 
 
 @app.get('/superficial_analysis/{dataset_id}/{file_name}/', response_description='Gera estatísticas superficiais sobre os dados de um dataset',)
 def generate_superficial_analysis(dataset_id: str,
                                   file_name: str,
-                                  index: bool = False) -> JSONResponse:
+                                  index: bool = False,
+                                  chunked: bool = False,
+                                  incremental: bool = False,
+                                  sample_size: int = None,
+                                  time_budget: float = None,
+                                  use_cache: bool = True) -> JSONResponse:
     '''
     Esta função carrega os dados de um dataset a partir do bucket do Google Cloud Storage,
     gera estatísticas superficiais sobre os dados e retorna o resultado.
@@ -98,33 +224,82 @@ def generate_superficial_analysis(dataset_id: str,
                                        caminho `{dataset_id}/{file_name}.csv`.
     - `file_name` (str, obrigatório): O nome do arquivo CSV.
     - `index` (bool, opcional): Se o DataFrame possui índice a ser carregado. O padrão é `False`.
+    - `chunked` (bool, opcional): Se o dataset deve ser processado em blocos, sem carregá-lo inteiro em memória.
+                                  Mediana, IQR e moda passam a ser estimados. O padrão é `False`.
+    - `incremental` (bool, opcional): Se as estatísticas devem ser geradas a partir do estado salvo junto ao dataset,
+                                      processando apenas as linhas acrescentadas desde a última análise. Assim como
+                                      em `chunked`, mediana, IQR e moda são estimados. O padrão é `False`.
+    - `sample_size` (int, opcional): Ativa o modo amostral: as estatísticas são estimadas, com intervalos de confiança,
+                                     a partir de uma amostra estratificada por `Class` com no máximo este número de
+                                     linhas. O resultado é salvo em `{file_name}_superficial_analysis_sample`. O padrão é `None`.
+    - `time_budget` (float, opcional): Ativa o modo amostral com o tamanho da amostra escolhido para que o cálculo
+                                       leve cerca de `time_budget` segundos. O resultado não é armazenado no
+                                       cache de resultados. O padrão é `None`.
+    - `use_cache` (bool, opcional): Se o resultado armazenado no cache de resultados pode ser usado. O resultado é
+                                    identificado pelo conteúdo do dataset e pelos parâmetros; em um acerto, o dataset
+                                    não é carregado. Com `False`, o resultado é recalculado. O padrão é `True`.
 
     ### Retorna:
-    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com a mensagem de que o arquivo
-                      foi salvo com sucesso e o caminho do arquivo no Google Cloud Storage.
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com o caminho onde o resultado será salvo
+                      e os identificadores dos artefatos enfileirados (veja `/artifacts/{dataset_id}`). No modo amostral,
+                      inclui também o tamanho da amostra e o nível de confiança (`sample`). Se o resultado veio do cache,
+                      inclui `cached` e apenas os artefatos que precisaram ser gravados novamente.
 
     ### Gera uma exceção:
     - `HTTPException`: Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket.
                        A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
+    - `HTTPException`: Se os parâmetros do modo amostral forem inválidos ou combinados com `chunked` ou `incremental`.
+                       A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
     '''
-    if index:
-        df = load_csv(dataset_id=dataset_id, file_name=file_name,
-                      index=0, from_gcs=USE_GCS)
-    else:
-        df = load_csv(dataset_id=dataset_id,
-                      file_name=file_name, from_gcs=USE_GCS)
+    sampled = check_sampling_parameters(sample_size, time_budget)
+    if sampled and (chunked or incremental):
+        raise HTTPException(
+            status_code=400, detail='O modo amostral não pode ser combinado com os modos em blocos ou incremental')
 
-    df = generate_statistics(df)
+    key, cached_response = None, None
+    if time_budget is None:
+        key, cached_response = find_cached_result('superficial_analysis', dataset_id, file_name, {
+            'index': index, 'chunked': chunked, 'incremental': incremental, 'sample_size': sample_size}, use_cache)
+    if cached_response is not None:
+        return cached_response
 
-    save_df(df, dataset_id,
-            f'{file_name}_superficial_analysis', index=True, to_gcs=USE_GCS)
+    response = {}
+    if sampled:
+        if index:
+            df = load_csv(dataset_id=dataset_id, file_name=file_name,
+                          index=0, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
+        else:
+            df = load_csv(dataset_id=dataset_id,
+                          file_name=file_name, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
+
+        df, response['sample'] = generate_statistics_sampled(df, sample_size=sample_size, time_budget=time_budget)
+        artifact_name = f'{file_name}_superficial_analysis_sample'
+    elif incremental:
+        df = generate_statistics_from_state(update_statistics_state(
+            dataset_id=dataset_id, file_name=file_name, index=index, from_gcs=USE_GCS))
+        artifact_name = f'{file_name}_superficial_analysis'
+    elif chunked:
+        df = generate_statistics_chunked(lambda: iter_csv_chunks(
+            dataset_id=dataset_id, file_name=file_name, index=index, from_gcs=USE_GCS))
+        artifact_name = f'{file_name}_superficial_analysis'
+    else:
+        if index:
+            df = load_csv(dataset_id=dataset_id, file_name=file_name,
+                          index=0, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
+        else:
+            df = load_csv(dataset_id=dataset_id,
+                          file_name=file_name, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
+
+        df = generate_statistics(df)
+        artifact_name = f'{file_name}_superficial_analysis'
 
     if USE_GCS:
-        gcs_path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_superficial_analysis.csv'
-        return JSONResponse(content={'message': f'Resultado salvo com sucesso no seguinte local: {gcs_path}'})
+        response['message'] = f'O resultado será salvo no seguinte local: gs://<BUCKET_NAME>/{dataset_id}/{artifact_name}.csv'
+    else:
+        response['message'] = f'O resultado será salvo no seguinte local: app/datasets/{dataset_id}/{artifact_name}.csv'
 
-    local_path = f'app/datasets/{dataset_id}/{file_name}_superficial_analysis.csv'
-    return JSONResponse(content={'message': f'Resultado salvo com sucesso no seguinte local: {local_path}'})
+    artifacts = submit_results(key, dataset_id, response, {artifact_name: (df, {'index': True})})
+    return JSONResponse(content={**response, 'artifacts': artifacts})
 
 
 @app.get('/correlations/{dataset_id}/{file_name}/', response_description='Calcula a correlação entre os atributos de um dataset',)
@@ -133,7 +308,11 @@ def get_correlations(dataset_id: str,
                      index: bool = False,
                      correlation_pearson: bool = False,
                      correlation_kendall: bool = False,
-                     correlation_spearman: bool = False) -> float:
+                     correlation_spearman: bool = False,
+                     chunked: bool = False,
+                     sample_size: int = None,
+                     time_budget: float = None,
+                     use_cache: bool = True) -> float:
     '''
     Esta função carrega os dados de um dataset a partir do bucket do Google Cloud Storage,
     calcula a correlação entre os atributos do dataset e salva os resultados no Google Cloud Storage.
@@ -147,9 +326,28 @@ def get_correlations(dataset_id: str,
     - `correlation_pearson` (bool, opcional): Se a correlação de Pearson deve ser calculada. O padrão é `False`.
     - `correlation_kendall` (bool, opcional): Se a correlação de Kendall deve ser calculada. O padrão é `False`.
     - `correlation_spearman` (bool, opcional): Se a correlação de Spearman deve ser calculada. O padrão é `False`.
+    - `chunked` (bool, opcional): Se o dataset deve ser processado em blocos, sem carregá-lo inteiro em memória.
+                                  Disponível apenas para a correlação de Pearson. O padrão é `False`.
+    - `sample_size` (int, opcional): Ativa o modo amostral: as correlações são estimadas a partir de uma amostra
+                                     estratificada por `Class` com no máximo este número de linhas. As matrizes são
+                                     salvas em `{file_name}_correlation_<correlation_name>_sample` e os intervalos de
+                                     confiança de cada par em `{file_name}_correlation_<correlation_name>_sample_intervals`.
+                                     O padrão é `None`.
+    - `time_budget` (float, opcional): Ativa o modo amostral com o tamanho da amostra escolhido para que o cálculo
+                                       leve cerca de `time_budget` segundos. O resultado não é armazenado no
+                                       cache de resultados. O padrão é `None`.
+    - `use_cache` (bool, opcional): Se o resultado armazenado no cache de resultados pode ser usado. O padrão é `True`.
 
     ### Retorna:
-    - `JSONResponse`: Um JSONResponse onde o conteúdo é uma lista de dicionários com as correlações calculadas.
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com o caminho onde as correlações serão salvas
+                      e os identificadores dos artefatos enfileirados (veja `/artifacts/{dataset_id}`). No modo amostral,
+                      inclui também o tamanho da amostra e o nível de confiança (`sample`). Se o resultado veio do cache,
+                      inclui `cached` e apenas os artefatos que precisaram ser gravados novamente.
+
+    ### Gera uma exceção:
+    - `HTTPException`: Se `chunked` for usado com as correlações de Kendall ou Spearman ou com o modo amostral,
+                       ou se os parâmetros do modo amostral forem inválidos.
+                       A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
     '''
     correlations = {
         'pearson': correlation_pearson,
@@ -157,30 +355,66 @@ def get_correlations(dataset_id: str,
         'spearman': correlation_spearman
     }
 
-    if correlation_pearson or correlation_kendall or correlation_spearman:
+    sampled = check_sampling_parameters(sample_size, time_budget)
+    if sampled and chunked:
+        raise HTTPException(
+            status_code=400, detail='O modo amostral não pode ser combinado com o modo em blocos')
+
+    if chunked and (correlation_kendall or correlation_spearman):
+        raise HTTPException(
+            status_code=400, detail='O modo em blocos está disponível apenas para a correlação de Pearson')
+
+    if not (correlation_pearson or correlation_kendall or correlation_spearman):
+        return JSONResponse(content={'message': 'Nenhuma correlação foi calculada'})
+
+    key, cached_response = None, None
+    if time_budget is None:
+        key, cached_response = find_cached_result('correlations', dataset_id, file_name, {
+            'index': index, 'correlations': [name for name, selected in correlations.items() if selected],
+            'chunked': chunked, 'sample_size': sample_size}, use_cache)
+    if cached_response is not None:
+        return cached_response
+
+    response = {}
+    results = {}
+    suffix = '_sample' if sampled else ''
+    if chunked:
+        correlation_pearson_matrix = generate_pearson_correlation_chunked(lambda: iter_csv_chunks(
+            dataset_id=dataset_id, file_name=file_name, index=index, from_gcs=USE_GCS))
+        results[f'{file_name}_correlation_pearson'] = (correlation_pearson_matrix, {'index': True})
+
+    else:
         if index:
             df = load_csv(dataset_id=dataset_id,
-                          file_name=file_name, index=0, from_gcs=USE_GCS)
+                          file_name=file_name, index=0, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
         else:
             df = load_csv(dataset_id=dataset_id,
-                          file_name=file_name, from_gcs=USE_GCS)
+                          file_name=file_name, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
 
-        correlations_matrixes = generate_correlation_matrix(
-            df, correlation_pearson, correlation_kendall, correlation_spearman)
+        if sampled:
+            correlations_matrixes, correlations_intervals, response['sample'] = generate_correlation_matrix_sampled(
+                df, correlation_pearson, correlation_kendall, correlation_spearman,
+                sample_size=sample_size, time_budget=time_budget)
+        else:
+            correlations_matrixes = generate_correlation_matrix(
+                df, correlation_pearson, correlation_kendall, correlation_spearman)
 
         for correlation_index, correlation_name in enumerate(correlations):
             if correlations[correlation_name]:
-                save_df(correlations_matrixes[correlation_index], dataset_id,
-                        f'{file_name}_correlation_{correlation_name}', index=True, to_gcs=USE_GCS)
+                artifact_name = f'{file_name}_correlation_{correlation_name}{suffix}'
+                results[artifact_name] = (correlations_matrixes[correlation_index], {'index': True})
+                if sampled:
+                    results[f'{artifact_name}_intervals'] = (correlations_intervals[correlation_index], {'index': False})
 
-        if USE_GCS:
-            gcs_path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_correlation_<correlation_name>.csv'
-            return JSONResponse(content={'message': f'Resultados salvos com sucesso no seguinte local: {gcs_path}'})
-
-        local_path = f'app/datasets/{dataset_id}/{file_name}_correlation_<correlation_name>.csv'
-        return JSONResponse(content={'message': f'Resultado salvo com sucesso no seguinte local: {local_path}'})
+    if USE_GCS:
+        gcs_path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_correlation_<correlation_name>{suffix}.csv'
+        response['message'] = f'Os resultados serão salvos no seguinte local: {gcs_path}'
+    else:
+        local_path = f'app/datasets/{dataset_id}/{file_name}_correlation_<correlation_name>{suffix}.csv'
+        response['message'] = f'Os resultados serão salvos no seguinte local: {local_path}'
 
-    return JSONResponse(content={'message': 'Nenhuma correlação foi calculada'})
+    artifacts = submit_results(key, dataset_id, response, results)
+    return JSONResponse(content={**response, 'artifacts': artifacts})
 
 
 @app.get('/outliers_detect_and_transform/{dataset_id}/{file_name}/', response_description='Detecta outliers em um dataset',)
@@ -192,7 +426,9 @@ def detect_and_transform_dataset_outliers(dataset_id: str,
                                           iqr: bool = False,
                                           winsorization: bool = False,
                                           treatment_method: str = None,
-                                          treatment_constant_value: float = None) -> JSONResponse:
+                                          treatment_constant_value: float = None,
+                                          n_jobs: int = None,
+                                          use_cache: bool = True) -> JSONResponse:
     '''
     Esta função carrega os dados de um dataset a partir do bucket do Google Cloud Storage,
     detecta outliers, trata os outliers e retorna o resultado.
@@ -219,48 +455,112 @@ def detect_and_transform_dataset_outliers(dataset_id: str,
         - remove
     - `treatment_constant_value` (float, opcional): O valor constante a ser utilizado no método de tratamento `constant`.
                                                     O padrão é `0`.
+    - `n_jobs` (int, opcional): O número de processos entre os quais as colunas são divididas na detecção e no tratamento
+                                de datasets grandes. O padrão é `None` (sem divisão).
+    - `use_cache` (bool, opcional): Se o resultado armazenado no cache de resultados pode ser usado. O padrão é `True`.
 
     ### Retorna:
     - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com a mensagem de que o arquivo
-                      foi salvo com sucesso e o caminho do arquivo no Google Cloud Storage.
+                      foi salvo com sucesso, o caminho do arquivo no Google Cloud Storage e o resumo da detecção
+                      (`outliers_summary`, com o número de outliers por método e coluna). Os outliers são salvos
+                      no formato binário de `outliers_store` e consultados por coluna em `/outliers`. Se o resultado
+                      veio do cache, inclui `cached` e apenas os artefatos que precisaram ser gravados novamente.
 
     ### Gera uma exceção:
     - `HTTPException`: Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket.
                           A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
-    - `HTTPException`: Se o método de tratamento de outliers não for encontrado.
+    - `HTTPException`: Se o método de tratamento de outliers não for encontrado ou se `n_jobs` não for positivo.
                           A exceção contém um código de status HTTP 400 e uma mensagem detalhada.                 
     '''
     if treatment_method not in ['log', 'sqrt', 'cbrt', 'scaling', 'constant', 'remove', None]:
         raise HTTPException(
             status_code=400, detail=f'Método "{treatment_method}" não encontrado')
+    check_n_jobs(n_jobs)
+
+    key, cached_response = find_cached_result('outliers_detect_and_transform', dataset_id, file_name, {
+        'index': index, 'z_score': z_score, 'robust_z_score': robust_z_score, 'iqr': iqr, 'winsorization': winsorization,
+        'treatment_method': treatment_method, 'treatment_constant_value': treatment_constant_value}, use_cache)
+    if cached_response is not None:
+        return cached_response
 
     if index:
-        df = load_csv(dataset_id=dataset_id, file_name=file_name, index=0)
+        df = load_csv(dataset_id=dataset_id, file_name=file_name,
+                      index=0, optimize_dtypes=OPTIMIZE_DTYPES)
     else:
-        df = load_csv(dataset_id=dataset_id, file_name=file_name)
+        df = load_csv(dataset_id=dataset_id, file_name=file_name,
+                      optimize_dtypes=OPTIMIZE_DTYPES)
 
-    outliers_dict = detect_outliers(
-        df, z_score, robust_z_score, iqr, winsorization)
+    outlier_masks = OutlierMasks(detect_outlier_masks(df, z_score, robust_z_score, iqr, winsorization, n_jobs),
+                                 df.columns.drop('Class'), df.index)
     df = transform_outliers(
-        df, outliers_dict, treatment_method, treatment_constant_value)
+        df, outlier_masks.masks, treatment_method, treatment_constant_value, n_jobs)
 
+    results = {f'{file_name}_outliers': (outlier_masks, {}),
+               f'{file_name}_outliers_summary': (outlier_masks.summary(), {}),
+               f'{file_name}_outliers_treated': (df, {'index': index})}
     if USE_GCS:
-        save_json(outliers_dict, dataset_id, f'{file_name}_outliers')
-        outliers_path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_outliers.json'
+        outliers_path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_outliers.npz'
         df_path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_outliers_treated.csv'
     else:
-        save_df(df, dataset_id, f'{file_name}_outliers_treated', index=index)
-        outliers_path = f'app/datasets/{dataset_id}/{file_name}_outliers.json'
+        outliers_path = f'app/datasets/{dataset_id}/{file_name}_outliers.npz'
         df_path = f'app/datasets/{dataset_id}/{file_name}_outliers_treated.csv'
 
-    return JSONResponse(content={'message': f'Outliers detectados e tratados com sucesso. Resultados salvos nos seguintes locais: {outliers_path} e {df_path}'})
+    response = {'message': f'Outliers detectados e tratados com sucesso. Resultados serão salvos nos seguintes locais: {outliers_path} e {df_path}',
+                'outliers_summary': results[f'{file_name}_outliers_summary'][0]}
+    artifacts = submit_results(key, dataset_id, response, results)
+    return JSONResponse(content={**response, 'artifacts': artifacts})
+
+
+@app.get('/outliers/{dataset_id}/{file_name}/{column}', response_description='Retorna os outliers de uma coluna de um dataset',)
+def get_column_outliers(dataset_id: str,
+                        file_name: str,
+                        column: str,
+                        method: str = None) -> JSONResponse:
+    '''
+    Esta função retorna os outliers de uma coluna, lidos do resultado binário salvo por `/outliers_detect_and_transform`.
+    Apenas os bits da coluna pedida são desempacotados.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV cujos outliers foram detectados.
+    - `column` (str, obrigatório): O nome da coluna.
+    - `method` (str, opcional): O método de detecção (`z_score`, `robust_z_score`, `iqr` ou `winsorization`).
+                                O padrão é `None` (todos os métodos detectados).
+
+    ### Retorna:
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com a coluna e, em `outliers`, a lista de
+                      outliers de cada método: posições das linhas (Z-score e Robust Z-score) ou rótulos do índice
+                      (IQR e Winsorization).
+
+    ### Gera uma exceção:
+    - `HTTPException`: Se o resultado, a coluna ou o método não forem encontrados.
+                       A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
+    - `HTTPException`: Se o método não for válido. A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
+    '''
+    if method not in ['z_score', 'robust_z_score', 'iqr', 'winsorization', None]:
+        raise HTTPException(status_code=400, detail=f'Método "{method}" não encontrado')
+
+    try:
+        outliers = load_column_outliers(dataset_id, f'{file_name}_outliers', column, method, from_gcs=USE_GCS)
+    except (NotFound, FileNotFoundError):
+        raise HTTPException(
+            status_code=404, detail=f'Outliers de "{dataset_id}/{file_name}" não encontrados')
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return JSONResponse(content={'column': column, 'outliers': outliers})
 
 
 @app.get('/balance/{dataset_id}/{file_name}', response_description="Balanceia os dados de um dataset",)
 def balance_dataset(dataset_id: str,
                     file_name: str,
                     method: str,
-                    index: bool = False):
+                    index: bool = False,
+                    n_jobs: int = None,
+                    neighbors_algorithm: str = 'brute',
+                    virtual: bool = False):
     '''
     Esta função carrega os dados de um dataset a partir do bucket do Google Cloud Storage,
     balanceia os dados e retorna o resultado.
@@ -280,6 +580,17 @@ def balance_dataset(dataset_id: str,
         - bsmote
         - adasyn
     - `index` (bool, opcional): Se o DataFrame possui índice a ser carregado. O padrão é `False`.
+    - `n_jobs` (int, opcional): O número de threads da busca de vizinhos de `smote`, `bsmote` e `adasyn`.
+                                O padrão é `None` (o número de CPUs).
+    - `neighbors_algorithm` (str, opcional): O algoritmo da busca de vizinhos. Os valores possíveis são:
+        - brute (padrão)
+        - kd_tree
+        - ball_tree
+    - `virtual` (bool, opcional): Se o balanceamento deve ser virtual: em vez do dataset balanceado, são salvos apenas
+                                  os pesos de cada linha (quantas vezes ela aparece no resultado) em
+                                  `{file_name}_{method}_weights.npz`, usados no treinamento com
+                                  `/machine_learning?balance_weights={method}`. Só a coluna `Class` é carregada.
+                                  Disponível para `random_under_sampling` e `random_over_sampling`. O padrão é `False`.
 
     ### Retorna:
     - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com a mensagem de que o arquivo 
@@ -288,43 +599,55 @@ def balance_dataset(dataset_id: str,
     ### Gera uma exceção:
     - `HTTPException`: Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket.
                        A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
-    - `HTTPException`: Se o método de balanceamento não for encontrado.
+    - `HTTPException`: Se o método de balanceamento ou o algoritmo de busca de vizinhos não forem encontrados.
                        A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
     '''
+    check_n_jobs(n_jobs)
+    if virtual:
+        df = load_csv(dataset_id=dataset_id, file_name=file_name, from_gcs=USE_GCS, columns=['Class'])
+        try:
+            weights = get_balance_weights(df['Class'], method)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        artifact_name = f'{file_name}_{method}_weights'
+        artifacts = [artifact_writer.submit(f'{dataset_id}/{artifact_name}', save_balance_weights,
+                                            weights, dataset_id, artifact_name, to_gcs=USE_GCS)]
+        if USE_GCS:
+            path = f'gs://<BUCKET_NAME>/{dataset_id}/{artifact_name}{BALANCE_WEIGHTS_EXTENSION}'
+        else:
+            path = f'app/datasets/{dataset_id}/{artifact_name}{BALANCE_WEIGHTS_EXTENSION}'
+        return {'message': f'O resultado será salvo no seguinte local: {path}', 'artifacts': artifacts}
+
     if index:
         df = load_csv(dataset_id=dataset_id, file_name=file_name,
-                      index=0, from_gcs=USE_GCS)
-    else:
-        df = load_csv(dataset_id=dataset_id, file_name=file_name)
-
-    if method == 'random_under_sampling':
-        df = random_under_sampling(df)
-    elif method == 'random_over_sampling':
-        df = random_over_sampling(df)
-    elif method == 'smote':
-        df = smote(df)
-    elif method == 'bsmote':
-        df = bsmote(df)
-    elif method == 'adasyn':
-        df = adasyn(df)
+                      index=0, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
     else:
-        raise HTTPException(
-            status_code=400, detail=f'Método "{method}" não encontrado')
+        df = load_csv(dataset_id=dataset_id, file_name=file_name,
+                      optimize_dtypes=OPTIMIZE_DTYPES)
 
-    save_df(df, dataset_id, f'{file_name}_{method}', index=index)
+    try:
+        df = balance_df(df, method, n_jobs, neighbors_algorithm)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    artifacts = [artifact_writer.submit(f'{dataset_id}/{file_name}_{method}', save_df,
+                                        df, dataset_id, f'{file_name}_{method}', index=index)]
 
     if USE_GCS:
         path = f'gs://<BUCKET_NAME>/{dataset_id}/{file_name}_{method}.csv'
     else:
         path = f'app/datasets/{dataset_id}/{file_name}_{method}.csv'
-    return {'message': f'Resultado salvo com sucesso no seguinte local: {path}'}
+    return {'message': f'O resultado será salvo no seguinte local: {path}', 'artifacts': artifacts}
 
 
 @app.get('/machine_learning/{dataset_id}/{file_name}/{classifier}', response_description='Aplica um algoritmo de Machine Learning em um dataset',)
 def apply_machine_learning(classifier: str,
                            dataset_id: str,
                            file_name: str,
-                           index: bool = False):
+                           index: bool = False,
+                           balance_weights: str = None,
+                           priority: int = TRAINING_PRIORITY):
     '''
     Esta função carrega os dados de um dataset a partir do bucket do Google Cloud Storage,
     aplica um algoritmo de aprendizado de máquina e retorna as métricas de teste, a matriz
@@ -346,6 +669,12 @@ def apply_machine_learning(classifier: str,
                                         caminho `{dataset_id}/{file_name}.csv`.
     - `file_name` (str, obrigatório): O nome do arquivo CSV.
     - `index` (bool, opcional): Se o DataFrame possui índice a ser carregado. O padrão é `False`.
+    - `balance_weights` (str, opcional): O método de um balanceamento virtual (`random_under_sampling` ou
+                                         `random_over_sampling`) salvo por `/balance?virtual=true`. O modelo é
+                                         treinado com os pesos salvos, sem uma cópia balanceada do dataset.
+                                         O padrão é `None`.
+    - `priority` (int, opcional): A prioridade do treinamento na fila de treinamentos; valores menores são executados
+                                  antes. O padrão é `TRAINING_PRIORITY`.
 
     ### Retorna:
     - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com as métricas de teste, a matriz
@@ -354,15 +683,21 @@ def apply_machine_learning(classifier: str,
     ### Gera uma exceção:
     - `HTTPException`: Se o arquivo CSV correspondente ao dataset_id não for encontrado no bucket.
                        A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
+    - `HTTPException`: Se os pesos do balanceamento virtual não forem encontrados.
+                       A exceção contém um código de status HTTP 404 e uma mensagem detalhada.
     - `HTTPException`: Se o classificador não for encontrado.
                        A exceção contém um código de status HTTP 400 e uma mensagem detalhada.
     '''
-    if classifier in ['logistic_regression', 'decision_tree', 'random_forest', 'xgboost', 'lightgbm', 'mlp']:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': classifier,
-            'index': index}).start()
+    if classifier in MODELS:
+        sample_weight = None
+        if balance_weights is not None:
+            try:
+                sample_weight = load_balance_weights(dataset_id, f'{file_name}_{balance_weights}_weights', from_gcs=USE_GCS)
+            except (NotFound, FileNotFoundError):
+                raise HTTPException(
+                    status_code=404, detail=f'Pesos do balanceamento "{balance_weights}" de "{dataset_id}/{file_name}" não encontrados')
+        schedule_training(dataset_id, file_name, classifier, priority, index=index, from_gcs=USE_GCS, sample_weight=sample_weight,
+                          process_pool=training_process_pool if USE_TRAINING_PROCESSES else None)
     else:
         raise HTTPException(
             status_code=400, detail=f'Classificador "{classifier}" não encontrado')
@@ -376,13 +711,14 @@ def apply_machine_learning(classifier: str,
         if classifier == 'decision_tree':
             path += f' e app/datasets/{dataset_id}/{file_name}_{classifier}.png'
 
-    return JSONResponse(content={'message': f'O treinamento do classificador "{classifier}" foi iniciado. O resultado será salvo no seguinte local: {path}'})
+    return JSONResponse(content={'message': f'O treinamento do classificador "{classifier}" foi enfileirado. O resultado será salvo no seguinte local: {path}'})
 
 
 @app.get('/running_training_tasks/{dataset_id}', response_description='Retorna uma lista com os treinamentos em andamento',)
 def get_dataset_running_training_tasks(dataset_id: str) -> JSONResponse:
     '''
-    Esta função retorna uma lista com os treinamentos em andamento.
+    Esta função retorna uma lista com os treinamentos em andamento: os que estão sendo executados (`running`)
+    e os que aguardam na fila de treinamentos (`queued`), com a prioridade, as CPUs reservadas e a posição na fila.
 
     ### Parâmetros:
     - `dataset_id` (str, obrigatório): O ID do dataset.
@@ -390,10 +726,18 @@ def get_dataset_running_training_tasks(dataset_id: str) -> JSONResponse:
     ### Retorna:
     - `JSONResponse`: Um JSONResponse onde o conteúdo é uma lista com os treinamentos em andamento.
     '''
+    scheduled = {status['job_id']: status for status in training_scheduler.status()}
+    queued = sorted([status for status in scheduled.values() if status['status'] == 'queued'], key=lambda status: status['priority'])
+    queue_positions = {status['job_id']: position for position, status in enumerate(queued, start=1)}
     running_training_tasks = []
     for task in training_tasks:
-        if task.startswith(dataset_id) and training_tasks[task]['status'] == 'running':
-            running_training_tasks.append(training_tasks[task])
+        if task.startswith(dataset_id) and training_tasks[task]['status'] in ['queued', 'running']:
+            running_training_task = dict(training_tasks[task])
+            if task in scheduled:
+                running_training_task.update(priority=scheduled[task]['priority'], cpu_slots=scheduled[task]['cpu_slots'])
+            if task in queue_positions:
+                running_training_task['queue_position'] = queue_positions[task]
+            running_training_tasks.append(running_training_task)
     if len(running_training_tasks) == 0:
         return JSONResponse(content={'message': 'Não há treinamentos em andamento'})
     print(f'Running tasks: {running_training_tasks}')
@@ -447,6 +791,7 @@ def execute_pipeline(dataset_id: str,
                      index: bool = False,
                      missing_data_method: str = None,
                      missing_data_constant_value: float = None,
+                     missing_data_fitted_on: str = None,
                      outliers_z_score: bool = False,
                      outliers_robust_z_score: bool = False,
                      outliers_iqr: bool = False,
@@ -454,16 +799,22 @@ def execute_pipeline(dataset_id: str,
                      outliers_treatment_method: str = None,
                      outliers_treatment_constant_value: float = 0,
                      balance_method: str = None,
+                     balance_neighbors_algorithm: str = 'brute',
+                     balance_virtual: bool = False,
                      superficial_analysis: bool = False,
                      correlation_pearson: bool = False,
                      correlation_kendall: bool = False,
                      correlation_spearman: bool = False,
+                     sample_size: int = None,
+                     time_budget: float = None,
+                     n_jobs: int = None,
                      ml_logistic_regression: bool = False,
                      ml_decision_tree: bool = False,
                      ml_random_forest: bool = False,
                      ml_xgboost: bool = False,
                      ml_lightgbm: bool = False,
-                     ml_mlp: bool = False) -> JSONResponse:
+                     ml_mlp: bool = False,
+                     ml_priority: int = TRAINING_PRIORITY) -> JSONResponse:
     '''
     Esta função executa o pipeline completo de análise de dados.
 
@@ -481,6 +832,10 @@ def execute_pipeline(dataset_id: str,
         - constant
     - `missing_data_constant_value` (float, opcional): O valor constante a ser utilizado no método de tratamento `constant`.
                                                        O padrão é `None`.
+    - `missing_data_fitted_on` (str, opcional): O nome de um arquivo do mesmo dataset já tratado pelo pipeline. Os valores
+                                                de preenchimento calculados nele (salvos em `{file_name}_missing_data.json`)
+                                                são reaplicados sem serem recalculados, e `missing_data_method` é ignorado.
+                                                O padrão é `None`.
     - `outliers_z_score` (bool, opcional): Se o método Z-score deve ser utilizado para detecção de outliers. O padrão é `False`.
     - `outliers_robust_z_score` (bool, opcional): Se o método Robust Z-score deve ser utilizado para detecção de outliers. O padrão é `False`.
     - `outliers_iqr` (bool, opcional): Se o método IQR deve ser utilizado para detecção de outliers. O padrão é `False`.
@@ -500,65 +855,110 @@ def execute_pipeline(dataset_id: str,
         - smote
         - bsmote
         - adasyn
+    - `balance_neighbors_algorithm` (str, opcional): O algoritmo da busca de vizinhos do balanceamento (`brute`, `kd_tree`
+                                                     ou `ball_tree`). O padrão é `brute`.
+    - `balance_virtual` (bool, opcional): Se o balanceamento deve ser virtual (veja `/balance`): os modelos são treinados
+                                          com os pesos de cada linha do dataset tratado, em vez de uma cópia balanceada
+                                          do dataset. O padrão é `False`.
     - `superficial_analysis` (bool, opcional): Se a análise superficial deve ser executada. O padrão é `False`.
     - `correlation_pearson` (bool, opcional): Se a correlação de Pearson deve ser calculada. O padrão é `False`.
     - `correlation_kendall` (bool, opcional): Se a correlação de Kendall deve ser calculada. O padrão é `False`.
     - `correlation_spearman` (bool, opcional): Se a correlação de Spearman deve ser calculada. O padrão é `False`.
+    - `sample_size` (int, opcional): Ativa o modo amostral na análise superficial e nas correlações, que passam a ser
+                                     estimadas com intervalos de confiança a partir de uma amostra estratificada por
+                                     `Class` (veja `/superficial_analysis` e `/correlations`). O padrão é `None`.
+    - `time_budget` (float, opcional): Ativa o modo amostral com o tamanho da amostra escolhido para que cada cálculo
+                                       leve cerca de `time_budget` segundos. O padrão é `None`.
+    - `n_jobs` (int, opcional): O número de processos entre os quais as colunas são divididas no tratamento de dados
+                                faltantes e na detecção e no tratamento de outliers de datasets grandes, e o número
+                                de threads da busca de vizinhos do balanceamento. O padrão é `None` (sem divisão
+                                das colunas e uma thread por CPU na busca de vizinhos).
     - `ml_logistic_regression` (bool, opcional): Se a regressão logística deve ser executada. O padrão é `False`.
     - `ml_decision_tree` (bool, opcional): Se a árvore de decisão deve ser executada. O padrão é `False`.
     - `ml_random_forest` (bool, opcional): Se a floresta aleatória deve ser executada. O padrão é `False`.
     - `ml_xgboost` (bool, opcional): Se o XGBoost deve ser executado. O padrão é `False`.
     - `ml_lightgbm` (bool, opcional): Se o LightGBM deve ser executado. O padrão é `False`.
     - `ml_mlp` (bool, opcional): Se a rede neural MLP deve ser executada. O padrão é `False`.
+    - `ml_priority` (int, opcional): A prioridade dos treinamentos na fila de treinamentos; valores menores são executados
+                                     antes. O padrão é `TRAINING_PRIORITY`.
 
     ### Retorna:
-    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com a mensagem de que o pipeline foi executado com sucesso.
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com a mensagem de que o pipeline foi executado com sucesso
+                      e os identificadores dos artefatos enfileirados para gravação (veja `/artifacts/{dataset_id}`).
     '''
     print('Iniciando pipeline...')
+    artifacts = []
+    sampled = check_sampling_parameters(sample_size, time_budget)
+    check_n_jobs(n_jobs)
     if index:
         df = load_csv(dataset_id=dataset_id, file_name=file_name,
-                      index=0, from_gcs=USE_GCS)
+                      index=0, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
     else:
         df = load_csv(dataset_id=dataset_id,
-                      file_name=file_name, from_gcs=USE_GCS)
+                      file_name=file_name, from_gcs=USE_GCS, optimize_dtypes=OPTIMIZE_DTYPES)
     print('Dados carregados com sucesso')
 
-    if missing_data_method is not None:
+    if missing_data_fitted_on is not None:
+        print(f'Reaplicando o tratamento de dados faltantes de "{missing_data_fitted_on}"...', end=' ')
+        try:
+            imputer = MissingDataImputer.from_dict(load_json(
+                dataset_id, f'{missing_data_fitted_on}_missing_data', from_gcs=USE_GCS))
+        except (NotFound, FileNotFoundError):
+            raise HTTPException(
+                status_code=404, detail=f'Tratamento de dados faltantes de "{dataset_id}/{missing_data_fitted_on}" não encontrado')
+        df = imputer.transform(df)
+        print('Tratamento de dados faltantes finalizado')
+
+    elif missing_data_method in IMPUTATION_METHODS and (missing_data_method != 'constant' or missing_data_constant_value is not None):
+        print('Iniciando tratamento de dados faltantes...', end=' ')
+        try:
+            imputer = MissingDataImputer(missing_data_method, missing_data_constant_value).fit(df, n_jobs=n_jobs)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        df = imputer.transform(df)
+        artifacts.append(artifact_writer.submit(
+            f'{dataset_id}/{file_name}_missing_data', save_json, imputer.to_dict(),
+            dataset_id, f'{file_name}_missing_data', to_gcs=USE_GCS))
+        print('Tratamento de dados faltantes finalizado')
+
+    elif missing_data_method is not None:
         print('Iniciando tratamento de dados faltantes...', end=' ')
         df = handle_missing_data(
-            df, missing_data_method, missing_data_constant_value)
+            df, missing_data_method, missing_data_constant_value, n_jobs)
         print('Tratamento de dados faltantes finalizado')
 
     if outliers_treatment_method is not None:
         print('Iniciando tratamento de outliers...', end=' ')
-        outliers_dict = detect_outliers(
-            df, outliers_z_score, outliers_robust_z_score, outliers_iqr, outliers_winsorization)
+        outliers_masks = detect_outlier_masks(
+            df, outliers_z_score, outliers_robust_z_score, outliers_iqr, outliers_winsorization, n_jobs)
         df = transform_outliers(
-            df, outliers_dict, outliers_treatment_method, outliers_treatment_constant_value)
+            df, outliers_masks, outliers_treatment_method, outliers_treatment_constant_value, n_jobs)
         print('Tratamento de outliers finalizado')
 
+    sample_weight = None
     if balance_method is not None:
         print(f'Iniciando balanceamento "{balance_method}"...', end=' ')
-        if balance_method == 'random_under_sampling':
-            df = random_under_sampling(df)
-        elif balance_method == 'random_over_sampling':
-            df = random_over_sampling(df)
-        elif balance_method == 'smote':
-            df = smote(df)
-        elif balance_method == 'bsmote':
-            df = bsmote(df)
-        elif balance_method == 'adasyn':
-            df = adasyn(df)
-        else:
-            raise HTTPException(
-                status_code=400, detail=f'Método "{balance_method}" não encontrado')
+        try:
+            if balance_virtual:
+                sample_weight = get_balance_weights(df['Class'], balance_method)
+            else:
+                df = balance_df(df, balance_method, n_jobs, balance_neighbors_algorithm)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         print('Balanceamento finalizado')
 
     if superficial_analysis:
         print('Iniciando análise superficial...', end=' ')
-        df_superficial_analysis = generate_statistics(df.copy())
-        save_df(df_superficial_analysis, dataset_id,
-                f'{file_name}_superficial_analysis', index=True, to_gcs=USE_GCS)
+        if sampled:
+            df_superficial_analysis, _ = generate_statistics_sampled(
+                df, sample_size=sample_size, time_budget=time_budget)
+            artifact_name = f'{file_name}_superficial_analysis_sample'
+        else:
+            df_superficial_analysis = generate_statistics(df)
+            artifact_name = f'{file_name}_superficial_analysis'
+        artifacts.append(artifact_writer.submit(
+            f'{dataset_id}/{artifact_name}', save_df, df_superficial_analysis,
+            dataset_id, artifact_name, index=True, to_gcs=USE_GCS))
         print('Análise superficial finalizada')
 
     if correlation_pearson or correlation_kendall or correlation_spearman:
@@ -568,96 +968,241 @@ def execute_pipeline(dataset_id: str,
             'spearman': correlation_spearman
         }
         print('Iniciando cálculo de correlações...', end=' ')
-        correlations_matrixes = generate_correlation_matrix(
-            df, correlation_pearson, correlation_kendall, correlation_spearman)
+        if sampled:
+            correlations_matrixes, correlations_intervals, _ = generate_correlation_matrix_sampled(
+                df, correlation_pearson, correlation_kendall, correlation_spearman,
+                sample_size=sample_size, time_budget=time_budget)
+        else:
+            correlations_matrixes = generate_correlation_matrix(
+                df, correlation_pearson, correlation_kendall, correlation_spearman)
         for correlation_index, correlation_name in enumerate(correlations):
             if correlations[correlation_name]:
-                save_df(correlations_matrixes[correlation_index], dataset_id,
-                        f'{file_name}_correlation_{correlation_name}', index=True, to_gcs=USE_GCS)
+                artifact_name = f'{file_name}_correlation_{correlation_name}' + ('_sample' if sampled else '')
+                artifacts.append(artifact_writer.submit(
+                    f'{dataset_id}/{artifact_name}', save_df, correlations_matrixes[correlation_index],
+                    dataset_id, artifact_name, index=True, to_gcs=USE_GCS))
+                if sampled:
+                    artifacts.append(artifact_writer.submit(
+                        f'{dataset_id}/{artifact_name}_intervals', save_df, correlations_intervals[correlation_index],
+                        dataset_id, f'{artifact_name}_intervals', index=False, to_gcs=USE_GCS))
         print('Cálculo de correlações finalizado')
 
     print('Iniciando treinamento dos modelos...')
-    if ml_logistic_regression:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': 'logistic_regression',
-            'df': df,
-            'index': index}).start()
-
-    if ml_decision_tree:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': 'decision_tree',
-            'df': df,
-            'index': index}).start()
-
-    if ml_random_forest:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': 'random_forest',
-            'df': df,
-            'index': index}).start()
-
-    if ml_xgboost:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': 'xgboost',
-            'df': df,
-            'index': index}).start()
-
-    if ml_lightgbm:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': 'lightgbm',
-            'df': df,
-            'index': index}).start()
-
-    if ml_mlp:
-        Thread(target=train_and_evaluate_model, kwargs={
-            'dataset_id': dataset_id,
-            'file_name': file_name,
-            'model_name': 'mlp',
-            'df': df,
-            'index': index}).start()
+    models = {
+        'logistic_regression': ml_logistic_regression,
+        'decision_tree': ml_decision_tree,
+        'random_forest': ml_random_forest,
+        'xgboost': ml_xgboost,
+        'lightgbm': ml_lightgbm,
+        'mlp': ml_mlp
+    }
+    selected_models = [model_name for model_name, selected in models.items() if selected]
+    shared_dataset = None
+    if USE_TRAINING_PROCESSES and selected_models:
+        try:
+            # A reserva do pipeline impede que o primeiro treinamento libere o dataset antes que os outros o reservem
+            shared_dataset = SharedDataset(df, sample_weight).acquire()
+        except ValueError as e:
+            print(f'{e}; os modelos serão treinados no processo da API')
+    for model_name in selected_models:
+        if shared_dataset is None:
+            schedule_training(dataset_id, file_name, model_name, ml_priority,
+                              df=df, index=index, sample_weight=sample_weight)
+        else:
+            schedule_training(dataset_id, file_name, model_name, ml_priority,
+                              shared_dataset=shared_dataset.acquire(), process_pool=training_process_pool)
+    if shared_dataset is not None:
+        shared_dataset.release()
     print('Treinamentos inicializados')
 
     message = 'Pipeline finalizado com sucesso.'
     if USE_GCS:
         message += f' Os resultados serão salvos no seguinte local: gs://<BUCKET_NAME>/{dataset_id}/'
-        return JSONResponse(content={'message': message, 'use_gcs': True})
+        return JSONResponse(content={'message': message, 'use_gcs': True, 'artifacts': artifacts})
 
     message += f' Os resultados serão salvos no seguinte local: app/datasets/{dataset_id}/'
-    return JSONResponse(content={'message': message, 'use_gcs': False})
+    return JSONResponse(content={'message': message, 'use_gcs': False, 'artifacts': artifacts})
+
+
+def write_upload_chunk(file, ingest: CsvIngest, chunk: bytes) -> None:
+    '''
+    Processa um bloco recebido no upload (hash, descompressão e contagem de linhas) e o grava no arquivo.
+    É executada fora do event loop, junto com a escrita.
+    '''
+    ingest.update(chunk)
+    file.write(chunk)
 
 
 @app.post("/upload/{dataset_id}/")
-async def upload_file(dataset_id: str, file: UploadFile = File(...)):
+async def upload_file(dataset_id: str, file: UploadFile = File(...), build_cache: bool = True):
+    '''
+    Esta função recebe um arquivo e o grava em disco em blocos de `UPLOAD_CHUNK_SIZE` bytes,
+    sem carregá-lo inteiro em memória e sem bloquear o event loop com o processamento e a escrita dos blocos.
+
+    Para arquivos CSV, o hash SHA-256, o número de linhas e o esquema são calculados durante o
+    recebimento e salvos no manifesto do dataset. Com `build_cache`, o cache colunar é construído
+    depois da resposta, pelo `artifact_writer` (veja `build_columnar_cache`), para que a primeira análise
+    não precise ler o CSV; o manifesto é então atualizado com o número exato de linhas. Arquivos CSV
+    comprimidos (`.csv.gz`, `.csv.zst` e `.csv.zip`) são gravados como recebidos e lidos de forma transparente.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file` (UploadFile, obrigatório): O arquivo enviado.
+    - `build_cache` (bool, opcional): Se o cache colunar de arquivos CSV deve ser construído. O padrão é `True`.
+
+    ### Retorna:
+    - `dict`: O caminho do arquivo salvo e, para arquivos CSV, o manifesto da ingestão e o artefato do cache colunar.
+
+    ### Gera uma exceção:
+    - `HTTPException`: Se ocorrer um erro ao salvar o arquivo. A exceção contém um código de status HTTP 500.
+    '''
     os.makedirs(f"app/datasets/{dataset_id}", exist_ok=True)
-    file_location = f"app/datasets/{dataset_id}/{file.filename}"
+    file_name = os.path.basename(file.filename)
+    file_location = f"app/datasets/{dataset_id}/{file_name}"
+    temp_location = f"{file_location}.upload"
+    stem, compression = split_csv_file_name(file_name)
+    ingest = CsvIngest(compression=compression)
 
     try:
-        with open(file_location, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        f = await run_in_threadpool(open, temp_location, "wb")
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(write_upload_chunk, f, ingest, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+        os.replace(temp_location, file_location)
     except Exception as e:
+        if os.path.exists(temp_location):
+            os.remove(temp_location)
         raise HTTPException(status_code=500, detail=str(e))
 
-    return {"info": "File saved successfully", "file_path": file_location}
+    response = {"info": "File saved successfully", "file_path": file_location}
+    if stem is None:
+        return response
+
+    manifest = await run_in_threadpool(ingest.manifest)
+    await run_in_threadpool(save_manifest, dataset_id, stem, manifest)
+
+    if build_cache:
+        response['artifacts'] = [artifact_writer.submit(f'{dataset_id}/{stem}.parquet',
+                                                        build_columnar_cache, dataset_id, stem, manifest)]
+
+    return {**response, **manifest}
 
 
 @app.get('/datasets/{dataset_id}/{file_name}')
-def serve_file(dataset_id: str, file_name: str):
+def serve_file(dataset_id: str, file_name: str, request: Request):
+    '''
+    Esta função envia um arquivo de um dataset (CSV, JSON de outliers, imagem da árvore de decisão etc.).
+
+    A resposta tem um ETag forte derivado do hash do conteúdo, então requisições com `If-None-Match`
+    para um arquivo que não mudou recebem 304 sem corpo. O cabeçalho `Range` (um intervalo de bytes)
+    é atendido com 206, ou 416 se o intervalo for inválido. Arquivos de texto são enviados comprimidos
+    com gzip quando o cliente aceita, a partir de uma versão comprimida gravada uma única vez no cache.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo.
+
+    ### Retorna:
+    - `Response`: O arquivo inteiro (200), um intervalo dele (206) ou uma resposta vazia (304).
+
+    ### Gera uma exceção:
+    - `HTTPException`: Se o arquivo não for encontrado. A exceção contém um código de status HTTP 404.
+    - `HTTPException`: Se o intervalo pedido não puder ser atendido. A exceção contém um código de status HTTP 416.
+    '''
     file_path = f'app/datasets/{dataset_id}/{file_name}'
-    if os.path.exists(file_path):
-        return FileResponse(path=file_path)
-    else:
+    if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
+    etag = get_file_etag(file_path)
+    range_header = request.headers.get('range')
+    gzip_path = None
+    if range_header is None and accepts_gzip(request.headers.get('accept-encoding')):
+        gzip_path = get_gzip_variant(file_path)
+        if gzip_path is not None:
+            etag = f'{etag[:-1]}-gzip"'
+
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Accept-Ranges': 'bytes', 'Vary': 'Accept-Encoding'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    if gzip_path is not None:
+        return FileResponse(path=gzip_path, headers={**headers, 'Content-Encoding': 'gzip'},
+                            media_type=guess_type(file_path)[0] or 'application/octet-stream')
+
+    size = os.path.getsize(file_path)
+    if_range = request.headers.get('if-range')
+    if range_header is not None and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range_header(range_header, size)
+        except ValueError as e:
+            raise HTTPException(status_code=416, detail=str(e), headers={'Content-Range': f'bytes */{size}'})
+
+        if byte_range is not None:
+            start, end = byte_range
+            return StreamingResponse(iter_file_range(file_path, start, end), status_code=206,
+                                     media_type=guess_type(file_path)[0] or 'application/octet-stream',
+                                     headers={**headers, 'Content-Range': f'bytes {start}-{end}/{size}',
+                                              'Content-Length': str(end - start + 1)})
+
+    return FileResponse(path=file_path, headers=headers)
+
+
+@app.get('/storage_stats', response_description='Retorna as estatísticas de latência das operações no Google Cloud Storage',)
+def get_storage_stats() -> JSONResponse:
+    '''
+    Esta função retorna as estatísticas de latência das operações feitas no bucket pelo cliente compartilhado.
+
+    ### Retorna:
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com, para cada operação, o número de chamadas,
+                      de erros e os tempos total, médio e máximo em segundos.
+    '''
+    return JSONResponse(content=get_operation_stats())
+
+
+@app.get('/result_cache_stats', response_description='Retorna as estatísticas do cache de resultados',)
+def get_result_cache_stats() -> JSONResponse:
+    '''
+    Esta função retorna as estatísticas do cache de resultados dos endpoints de análise.
+
+    ### Retorna:
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é um dicionário com o número de acertos, de falhas,
+                      a taxa de acertos, o número de descartes e de entradas e os bytes ocupados.
+    '''
+    return JSONResponse(content=result_cache.stats())
+
+
+@app.get('/artifacts/{dataset_id}', response_description='Retorna o estado da gravação dos artefatos de um dataset',)
+def get_dataset_artifacts(dataset_id: str) -> JSONResponse:
+    '''
+    Esta função retorna o estado da gravação em segundo plano dos artefatos de um dataset.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+
+    ### Retorna:
+    - `JSONResponse`: Um JSONResponse onde o conteúdo é uma lista com o estado de cada artefato
+                      (`queued`, `writing`, `finished` ou `failed`), o número de tentativas e, em caso de falha, o erro.
+    '''
+    artifacts = artifact_writer.status(f'{dataset_id}/')
+    if len(artifacts) == 0:
+        return JSONResponse(content={'message': 'Não há artefatos para este dataset'})
+    return JSONResponse(content=artifacts)
+
+
+@app.on_event('shutdown')
+def flush_artifacts() -> None:
+    '''
+    Termina os treinamentos pendentes, encerra os processos de treinamento e grava os artefatos pendentes
+    antes de encerrar a API.
+    '''
+    print(f'Aguardando {training_scheduler.pending()} treinamentos pendentes...')
+    training_scheduler.shutdown()
+    training_process_pool.shutdown()
+    print(f'Gravando {artifact_writer.pending()} artefatos pendentes...')
+    artifact_writer.shutdown()
+
 
 def custom_openapi():
     '''
@@ -1,11 +1,178 @@
-from sklearn.impute import SimpleImputer
 import numpy as np
 import pandas as pd
+from app.streaming_statistics import MomentsAccumulator
+from app.column_shards import FrameColumns, map_column_shards
 
-def handle_missing_data(df, method, constant_value=None):
+IMPUTATION_METHODS = ['mean', 'median', 'most_frequent', 'constant']
+
+class MissingDataImputer:
+    '''
+    Preenche os dados faltantes de um DataFrame mantendo os tipos das colunas e o índice.
+
+    `fit` calcula um valor de preenchimento apenas para as colunas que têm valores faltantes (a média, a mediana,
+    o valor mais frequente, com empates resolvidos pelo menor valor como no `SimpleImputer`, ou a constante).
+    `transform` preenche só essas colunas: o DataFrame retornado compartilha as demais com o original, sem copiá-las,
+    ou, com `inplace=True`, o próprio DataFrame é alterado. Os valores calculados podem ser salvos com `to_dict`
+    e reaplicados em outros blocos do mesmo dataset com `from_dict`, sem recalcular as estatísticas.
+
+    ### Parâmetros:
+    - `method` (str, obrigatório): O método de preenchimento (`mean`, `median`, `most_frequent` ou `constant`).
+    - `constant_value` (int, float ou str, opcional): O valor usado pelo método `constant`. O padrão é `None`.
+    - `fill_values` (dict, opcional): Valores de preenchimento já calculados, por coluna. O padrão é `None`.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o método não for encontrado ou se o valor constante não for fornecido para o método `constant`.
+    '''
+    def __init__(self, method: str, constant_value=None, fill_values: dict = None):
+        if method not in IMPUTATION_METHODS:
+            raise ValueError(f'Método "{method}" não encontrado')
+        if method == 'constant' and constant_value is None:
+            raise ValueError('Valor constante não fornecido para o método "constant"')
+        self.method = method
+        self.constant_value = constant_value
+        self.fill_values = dict(fill_values) if fill_values is not None else None
+
+    def fit(self, df: pd.DataFrame, columns: list = None, n_jobs: int = None) -> 'MissingDataImputer':
+        '''
+        Calcula os valores de preenchimento.
+
+        As colunas sem nenhum valor preenchido não recebem valor de preenchimento. Em datasets grandes, as
+        estatísticas das colunas numéricas são divididas entre `n_jobs` processos (veja `map_column_shards`).
+
+        ### Parâmetros:
+        - `df` (DataFrame, obrigatório): O DataFrame usado no cálculo.
+        - `columns` (list, opcional): As colunas que devem receber um valor. O padrão é `None` (as colunas com
+                                      valores faltantes em `df`).
+        - `n_jobs` (int, opcional): O número de processos. O padrão é `None` (sem divisão).
+
+        ### Retorna:
+        - `MissingDataImputer`: O próprio objeto.
+
+        ### Gera uma exceção:
+        - `ValueError`: Se `mean` ou `median` forem usados em uma coluna não numérica.
+        '''
+        if columns is None:
+            columns = df.columns[df.isna().any().to_numpy()].tolist()
+
+        if self.method == 'constant':
+            self.fill_values = {column: self.constant_value for column in columns}
+            return self
+
+        numeric = [column for column in columns if is_numeric_column(df[column])]
+        others = [column for column in columns if column not in numeric]
+        if others and self.method != 'most_frequent':
+            raise ValueError(f'O método "{self.method}" não pode ser usado nas colunas não numéricas {others}')
+
+        fill_values = {}
+        if numeric:
+            statistics = map_column_shards(column_fill_values, [FrameColumns(df, numeric, np.float64)], n_jobs=n_jobs,
+                                           args=(self.method,), output_rows=1)[:, 0]
+            fill_values.update(zip(numeric, statistics.tolist()))
+        for column in others:
+            modes = df[column].mode(dropna=True)
+            fill_values[column] = modes.iloc[0] if len(modes) > 0 else np.nan
+
+        self.fill_values = {column: value for column, value in fill_values.items() if not pd.isna(value)}
+        return self
+
+    def transform(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        '''
+        Preenche os dados faltantes das colunas com valor de preenchimento.
+
+        ### Parâmetros:
+        - `df` (DataFrame, obrigatório): O DataFrame a ser preenchido.
+        - `inplace` (bool, opcional): Se `df` deve ser alterado diretamente. O padrão é `False` (um novo DataFrame
+                                      que compartilha com `df` as colunas que não foram alteradas).
+
+        ### Retorna:
+        - `DataFrame`: O DataFrame preenchido.
+
+        ### Gera uma exceção:
+        - `ValueError`: Se os valores de preenchimento ainda não tiverem sido calculados.
+        '''
+        if self.fill_values is None:
+            raise ValueError('Os valores de preenchimento ainda não foram calculados')
+
+        filled = {column: fill_column(df[column], value) for column, value in self.fill_values.items()
+                  if column in df.columns and df[column].hasnans}
+        if inplace:
+            for column, values in filled.items():
+                df[column] = values
+            return df
+        if not filled:
+            return df.copy(deep=False)
+        return pd.DataFrame({column: filled.get(column, df[column]) for column in df.columns}, index=df.index, copy=False)
+
+    def fit_transform(self, df: pd.DataFrame, inplace: bool = False, n_jobs: int = None) -> pd.DataFrame:
+        '''
+        Calcula os valores de preenchimento em `df` e preenche os seus dados faltantes.
+        '''
+        return self.fit(df, n_jobs=n_jobs).transform(df, inplace)
+
+    def to_dict(self) -> dict:
+        '''
+        Retorna o método e os valores de preenchimento em um dicionário que pode ser salvo em JSON.
+        '''
+        fill_values = {str(column): value.item() if isinstance(value, np.generic) else value
+                       for column, value in (self.fill_values or {}).items()}
+        return {'method': self.method, 'constant_value': self.constant_value, 'fill_values': fill_values}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'MissingDataImputer':
+        '''
+        Recria um `MissingDataImputer` salvo com `to_dict`.
+        '''
+        return cls(data['method'], data.get('constant_value'), data['fill_values'])
+
+def is_numeric_column(column: pd.Series) -> bool:
+    '''
+    Verifica se uma coluna é numérica (sem contar colunas booleanas).
+    '''
+    return pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype)
+
+def column_fill_values(columns_values: np.ndarray, method: str) -> np.ndarray:
+    '''
+    Calcula o valor de preenchimento (`mean`, `median` ou `most_frequent`) de cada coluna de uma matriz
+    `(colunas, linhas)`, ignorando os valores vazios. Retorna uma matriz `(colunas, 1)`, com `NaN` nas colunas vazias.
+    '''
+    fill_values = np.full((columns_values.shape[0], 1), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for position, values in enumerate(columns_values):
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            if method == 'mean':
+                fill_values[position, 0] = values.mean()
+            elif method == 'median':
+                fill_values[position, 0] = np.median(values)
+            else:
+                unique, counts = np.unique(values, return_counts=True)
+                fill_values[position, 0] = unique[np.argmax(counts)]
+    return fill_values
+
+def fill_column(column: pd.Series, value) -> pd.Series:
+    '''
+    Preenche os valores faltantes de uma coluna mantendo o seu tipo: o valor é convertido para o tipo de ponto
+    flutuante da coluna e, em colunas categóricas, é adicionado às categorias. Colunas inteiras com valores
+    faltantes (como `Int64`) só passam a ponto flutuante se o valor não for inteiro.
+    '''
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        column = column.cat.add_categories([value])
+    elif isinstance(column.dtype, np.dtype) and np.issubdtype(column.dtype, np.floating):
+        value = column.dtype.type(value)
+
+    try:
+        return column.fillna(value)
+    except (TypeError, ValueError):
+        return column.astype(np.float64).fillna(value)
+
+def handle_missing_data(df, method, constant_value=None, n_jobs=None):
     '''
     Esta função trata os dados faltantes de um DataFrame.
 
+    Os tipos das colunas e o índice são mantidos, e apenas as colunas com valores faltantes são alteradas
+    (veja `MissingDataImputer`).
+
     ### Parâmetros:
     - `df` (DataFrame, obrigatório): O DataFrame a ser tratado.
     - `method` (str, obrigatório): O método de tratamento a ser utilizado. Os valores possíveis são:
@@ -16,36 +183,72 @@ def handle_missing_data(df, method, constant_value=None):
         - constant
     - `constant_value` (int ou float, opcional): O valor constante a ser utilizado no método de tratamento `constant`.
                                                  O padrão é `None`.
+    - `n_jobs` (int, opcional): O número de processos usados no cálculo dos valores de preenchimento de datasets
+                                grandes. O padrão é `None` (sem divisão).
 
     ### Retorna:
     - `DataFrame`: O DataFrame tratado.
+    '''
+    if method == 'remove':
+        return df.dropna()
+
+    if method in IMPUTATION_METHODS and (method != 'constant' or constant_value is not None):
+        return MissingDataImputer(method, constant_value).fit_transform(df, n_jobs=n_jobs)
+
+    print('Método inválido ou valor constante não foi fornecido para inputação constante')
+    return df.copy()
+
+def handle_missing_data_chunked(read_chunks, method, constant_value=None, imputer=None):
+    '''
+    Esta função trata os dados faltantes de um dataset percorrendo-o em blocos, com memória limitada
+    independentemente do número de linhas. Os blocos tratados são devolvidos um a um, mantendo o índice original
+    e os tipos das colunas.
+
+    Com o método `mean`, o dataset é lido duas vezes: a primeira para calcular as médias e a segunda para preencher.
+    Com um `imputer` já ajustado (por exemplo, recriado com `MissingDataImputer.from_dict`), os valores de
+    preenchimento são reaplicados em uma única leitura, sem recalcular nada, e `method` é ignorado.
+
+    ### Parâmetros:
+    - `read_chunks`: Função sem argumentos que retorna um iterador de DataFrames (por exemplo, `iter_csv_chunks`).
+    - `method` (str, obrigatório): O método de tratamento a ser utilizado. Os valores possíveis são:
+        - remove
+        - mean
+        - constant
+    - `constant_value` (int ou float, opcional): O valor constante a ser utilizado no método de tratamento `constant`.
+                                                 O padrão é `None`.
+    - `imputer` (MissingDataImputer, opcional): Os valores de preenchimento a serem reaplicados. O padrão é `None`.
+
+    ### Retorna:
+    - `Iterator[DataFrame]`: Os blocos tratados.
 
     ### Gera uma exceção:
-    - `ValueError`: Se o método de tratamento não for encontrado.
+    - `ValueError`: Se o método de tratamento não for suportado no modo em blocos.
     - `ValueError`: Se o valor constante não for fornecido para o método de tratamento `constant`.
     '''
-    df_handled = df.copy()
+    if imputer is not None:
+        for chunk in read_chunks():
+            yield imputer.transform(chunk)
 
-    if method == 'remove':
-        df_handled.dropna(inplace=True)
+    elif method == 'remove':
+        for chunk in read_chunks():
+            yield chunk.dropna()
 
     elif method == 'mean':
-        imputer = SimpleImputer(missing_values=np.nan, strategy='mean')
-        df_handled = pd.DataFrame(imputer.fit_transform(df_handled), columns=df.columns)
-
-    elif method == 'median':
-        imputer = SimpleImputer(missing_values=np.nan, strategy='median')
-        df_handled = pd.DataFrame(imputer.fit_transform(df_handled), columns=df.columns)
+        moments = None
+        for chunk in read_chunks():
+            if moments is None:
+                columns = [column for column in chunk.columns if is_numeric_column(chunk[column])]
+                moments = MomentsAccumulator(columns)
+            moments.update(chunk[columns].to_numpy(dtype=np.float64, na_value=np.nan))
 
-    elif method == 'most_frequent':
-        imputer = SimpleImputer(missing_values=np.nan, strategy='most_frequent')
-        df_handled = pd.DataFrame(imputer.fit_transform(df_handled), columns=df.columns)
+        imputer = MissingDataImputer('mean', fill_values={
+            column: moments.mean[column_index] for column_index, column in enumerate(columns) if moments.count[column_index] > 0})
+        for chunk in read_chunks():
+            yield imputer.transform(chunk)
 
     elif method == 'constant' and constant_value is not None:
-        imputer = SimpleImputer(missing_values=np.nan, strategy='constant', fill_value=constant_value)
-        df_handled = pd.DataFrame(imputer.fit_transform(df_handled), columns=df.columns)
+        for chunk in read_chunks():
+            yield chunk.fillna(constant_value)
 
     else:
-        print('Método inválido ou valor constante não foi fornecido para inputação constante')
-
-    return df_handled
\ No newline at end of file
+        raise ValueError(f'Método "{method}" inválido no modo em blocos ou valor constante não fornecido')
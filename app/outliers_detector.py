@@ -1,12 +1,22 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import zscore
+from app.streaming_statistics import MomentsAccumulator, QuantileSketch
+from app.superficial_analysis import sorted_quantiles
+from app.column_shards import FrameColumns, map_column_shards, should_shard_columns
+
+Z_SCORE_THRESHOLD = 3
+ROBUST_Z_SCORE_THRESHOLD = 3.5
+ROBUST_Z_SCORE_CONSTANT = 0.6745
+IQR_FACTOR = 1.5
+WINSORIZATION_QUANTILES = (0.01, 0.99)
+POSITIONAL_METHODS = ['z_score', 'robust_z_score']
 
 def detect_outliers(df: pd.DataFrame,
                     z_score_method: bool = False,
                     robust_z_score_method: bool = False,
                     iqr_method: bool = False,
-                    winsorization_method: bool = False) -> dict:
+                    winsorization_method: bool = False,
+                    n_jobs: int = None) -> dict:
     '''
     Detecta outliers no dataset.
 
@@ -22,48 +32,301 @@ def detect_outliers(df: pd.DataFrame,
     - `robust_z_score_method`: Ativa o método Robust Z-score.
     - `iqr_method`: Ativa o método IQR.
     - `winsorization_method`: Ativa o método Winsorization.
+    - `n_jobs`: O número de processos usados em datasets grandes. O padrão é `None` (sem divisão).
 
-    ### Retorno:outliers/
-    - `dict` com os outliers detectados.
+    ### Retorno:
+    - `dict` com os outliers detectados: para cada método e coluna, as posições das linhas (Z-score e
+      Robust Z-score) ou os rótulos do índice (IQR e Winsorization).
+    '''
+    columns = df.columns.drop('Class')
+    masks = detect_outlier_masks(df, z_score_method, robust_z_score_method, iqr_method, winsorization_method, n_jobs)
+    return {method: masks_to_lists(mask, columns, None if method in POSITIONAL_METHODS else df.index)
+            for method, mask in masks.items()}
+
+def detect_outlier_masks(df: pd.DataFrame,
+                         z_score_method: bool = False,
+                         robust_z_score_method: bool = False,
+                         iqr_method: bool = False,
+                         winsorization_method: bool = False,
+                         n_jobs: int = None) -> dict:
+    '''
+    Detecta outliers em todas as colunas (exceto `Class`) de uma vez, tratando o dataset como uma única matriz.
+
+    A matriz é mantida com cada coluna contígua na memória. Médias e desvios padrão são calculados ao longo
+    de cada coluna; para os métodos baseados em quantis, cada coluna é ordenada uma única vez e a mesma
+    ordenação fornece a mediana (Robust Z-score), os quartis (IQR) e os percentis 1 e 99 (Winsorization).
+    Os resultados são os mesmos da detecção coluna a coluna com `scipy.stats.zscore` e `pd.Series.quantile`:
+    colunas com valores vazios não têm outliers pelo Z-score e pelo Robust Z-score, e os quantis ignoram os
+    valores vazios.
+
+    Em datasets grandes, as colunas são divididas entre `n_jobs` processos (veja `map_column_shards`).
+
+    ### Parâmetros:
+    - `df`: DataFrame com os dados.
+    - `z_score_method`: Ativa o método Z-score.
+    - `robust_z_score_method`: Ativa o método Robust Z-score.
+    - `iqr_method`: Ativa o método IQR.
+    - `winsorization_method`: Ativa o método Winsorization.
+    - `n_jobs`: O número de processos. O padrão é `None` (sem divisão).
+
+    ### Retorno:
+    - `dict` com, para cada método ativo, uma máscara booleana `(linhas, colunas)` com `True` nos outliers.
     '''
-    df_outliers = df.copy()
-    df_outliers = df_outliers.drop(columns=['Class'])
+    columns_values = FrameColumns(df, df.columns.drop('Class'), np.float64)
+    flags = (z_score_method, robust_z_score_method, iqr_method, winsorization_method)
+    methods = get_active_methods(*flags)
+    if not methods or not should_shard_columns(*columns_values.shape, n_jobs):
+        return get_column_outlier_masks(columns_values.to_numpy(), *flags)
+
+    stacked_masks = map_column_shards(stack_column_outlier_masks, [columns_values], (len(methods),), bool, n_jobs, flags)
+    return {method: stacked_masks[position].T for position, method in enumerate(methods)}
 
+def get_active_methods(z_score_method: bool = False,
+                       robust_z_score_method: bool = False,
+                       iqr_method: bool = False,
+                       winsorization_method: bool = False) -> list:
+    '''
+    Retorna os nomes dos métodos de detecção ativos, na ordem usada nos resultados.
+    '''
     methods = {
         'z_score': z_score_method,
         'robust_z_score': robust_z_score_method,
         'iqr': iqr_method,
         'winsorization': winsorization_method
     }
-    outliers_dict = {}
-
-    for method, active in methods.items():
-        if active:
-            outliers_dict[method] = {}
-
-            for column in df_outliers.columns:
-                if method == 'z_score':
-                    z_scores = np.abs(zscore(df_outliers[column]))
-                    outliers = np.where(z_scores > 3)
-                    outliers_dict['z_score'][column] = outliers[0].tolist()
-
-                if method == 'robust_z_score':
-                    median = df_outliers[column].median()
-                    mad = np.median(np.abs(df_outliers[column] - median))
-                    modified_z_scores = 0.6745 * (df_outliers[column] - median) / mad
-                    outliers = np.where(np.abs(modified_z_scores) > 3.5)
-                    outliers_dict['robust_z_score'][column] = outliers[0].tolist()
-
-                if method == 'iqr':
-                    Q1 = df_outliers[column].quantile(0.25)
-                    Q3 = df_outliers[column].quantile(0.75)
-                    IQR = Q3 - Q1
-                    outliers = df_outliers[(df_outliers[column] < (Q1 - 1.5 * IQR)) | (df_outliers[column] > (Q3 + 1.5 * IQR))].index
-                    outliers_dict['iqr'][column] = outliers.tolist()
-
-                if method == 'winsorization':
-                    q = df_outliers[column].quantile([0.01, 0.99])
-                    outliers = df_outliers[(df_outliers[column] < q.iloc[0]) | (df_outliers[column] > q.iloc[1])].index
-                    outliers_dict['winsorization'][column] = outliers.tolist()
-
-    return outliers_dict
\ No newline at end of file
+    return [method for method, active in methods.items() if active]
+
+def stack_column_outlier_masks(columns_values: np.ndarray, *flags) -> np.ndarray:
+    '''
+    Executa `get_column_outlier_masks` em uma fatia de colunas e empilha as máscaras em um array
+    `(métodos, colunas, linhas)`, o formato de saída de `map_column_shards`.
+    '''
+    return np.stack([mask.T for mask in get_column_outlier_masks(columns_values, *flags).values()])
+
+def get_column_outlier_masks(columns_values: np.ndarray,
+                             z_score_method: bool = False,
+                             robust_z_score_method: bool = False,
+                             iqr_method: bool = False,
+                             winsorization_method: bool = False) -> dict:
+    '''
+    Calcula as máscaras de outliers de uma matriz `(colunas, linhas)` com cada coluna contígua na memória.
+
+    ### Retorno:
+    - `dict` com, para cada método ativo, uma máscara booleana `(linhas, colunas)` com `True` nos outliers.
+    '''
+    statistics = {}
+
+    if z_score_method:
+        statistics['mean'] = columns_values.mean(axis=1)
+        statistics['std'] = columns_values.std(axis=1)
+
+    if robust_z_score_method or iqr_method or winsorization_method:
+        sorted_values = np.sort(columns_values, axis=1)
+        count = (~np.isnan(sorted_values)).sum(axis=1)
+        q01, q1, median, q3, q99 = sorted_quantiles(
+            sorted_values, count, [WINSORIZATION_QUANTILES[0], 0.25, 0.5, 0.75, WINSORIZATION_QUANTILES[1]])
+        statistics.update({'q01': q01, 'q1': q1, 'q3': q3, 'q99': q99})
+
+        if robust_z_score_method:
+            statistics['median'] = np.where(count == columns_values.shape[1], median, np.nan)
+            statistics['mad'] = sorted_median_absolute_deviation(sorted_values, statistics['median'])
+
+    methods = get_active_methods(z_score_method, robust_z_score_method, iqr_method, winsorization_method)
+    return get_outlier_masks(columns_values.T, statistics, methods)
+
+def sorted_median_absolute_deviation(sorted_values: np.ndarray, median: np.ndarray) -> np.ndarray:
+    '''
+    Calcula o MAD (mediana dos desvios absolutos em relação à mediana) de cada coluna a partir dos seus valores
+    já ordenados, sem ordenar os desvios.
+
+    Em uma coluna ordenada, os desvios dos valores abaixo da mediana, lidos de trás para frente, e os dos valores
+    acima dela formam duas sequências crescentes; o k-ésimo menor desvio é encontrado por busca binária na
+    partição entre as duas, feita para todas as colunas ao mesmo tempo, em O(log n) passos.
+
+    ### Parâmetros:
+    - `sorted_values`: Matriz `(colunas, linhas)` sem valores vazios, com os valores de cada coluna ordenados.
+    - `median`: A mediana de cada coluna.
+
+    ### Retorno:
+    - `np.ndarray` com o MAD de cada coluna (`NaN` nas colunas com mediana `NaN` ou sem linhas).
+    '''
+    size, rows = sorted_values.shape
+    if rows == 0:
+        return np.full(size, np.nan)
+
+    columns = np.arange(size)
+    below = (sorted_values < median[:, None]).sum(axis=1)
+    above = rows - below
+
+    def deviation_below(i):
+        return median - sorted_values[columns, np.clip(below - 1 - i, 0, rows - 1)]
+
+    def deviation_above(j):
+        return sorted_values[columns, np.clip(below + j, 0, rows - 1)] - median
+
+    def kth_deviation(k: int) -> np.ndarray:
+        lower = np.maximum(0, k + 1 - above)
+        upper = np.minimum(k + 1, below)
+        while (lower < upper).any():
+            middle = (lower + upper) // 2
+            enough = (middle >= below) | (k + 1 - middle <= 0) | (deviation_below(middle) >= deviation_above(k - middle))
+            enough |= lower >= upper
+            upper = np.where(enough & (lower < upper), middle, upper)
+            lower = np.where(enough, lower, middle + 1)
+        taken_above = k + 1 - lower
+        last_below = np.where(lower > 0, deviation_below(lower - 1), -np.inf)
+        last_above = np.where(taken_above > 0, deviation_above(taken_above - 1), -np.inf)
+        return np.maximum(last_below, last_above)
+
+    with np.errstate(invalid='ignore'):
+        mad = (kth_deviation((rows - 1) // 2) + kth_deviation(rows // 2)) / 2
+    return np.where(np.isnan(median), np.nan, mad)
+
+def get_outlier_bounds(statistics: dict, method: str) -> tuple:
+    '''
+    Retorna, para cada coluna, os limites fora dos quais um valor é outlier pelo método dado.
+
+    Os critérios dos métodos são reescritos como intervalos, o que evita calcular os escores de cada valor:
+    `|x - média| / desvio padrão > 3` equivale a `x` fora de `média ± 3 * desvio padrão`, e o Robust Z-score
+    `|0.6745 * (x - mediana) / MAD| > 3.5` a `x` fora de `mediana ± 3.5 * MAD / 0.6745`. Com desvio padrão ou
+    MAD nulo, o intervalo se reduz a um ponto, e todo valor diferente dele é outlier, como na divisão por zero.
+
+    ### Parâmetros:
+    - `statistics`: As estatísticas de cada coluna (veja `get_outlier_masks`).
+    - `method`: O método (`z_score`, `robust_z_score`, `iqr` ou `winsorization`).
+
+    ### Retorno:
+    - Tupla com os limites inferior e superior de cada coluna (`NaN` nas colunas sem outliers definidos).
+    '''
+    if method == 'z_score':
+        spread = Z_SCORE_THRESHOLD * statistics['std']
+        return statistics['mean'] - spread, statistics['mean'] + spread
+    if method == 'robust_z_score':
+        spread = ROBUST_Z_SCORE_THRESHOLD * statistics['mad'] / ROBUST_Z_SCORE_CONSTANT
+        return statistics['median'] - spread, statistics['median'] + spread
+    if method == 'iqr':
+        spread = IQR_FACTOR * (statistics['q3'] - statistics['q1'])
+        return statistics['q1'] - spread, statistics['q3'] + spread
+    if method == 'winsorization':
+        return statistics['q01'], statistics['q99']
+    raise ValueError(f'Método "{method}" não encontrado')
+
+def get_outlier_masks(values: np.ndarray, statistics: dict, methods: list) -> dict:
+    '''
+    Marca os outliers de uma matriz a partir das estatísticas de cada coluna.
+
+    ### Parâmetros:
+    - `values`: Matriz `(linhas, colunas)`. As comparações são mais rápidas quando cada coluna é contígua
+                na memória (ordem Fortran).
+    - `statistics`: As estatísticas de cada coluna usadas pelos métodos: `mean` e `std` (Z-score), `median` e `mad`
+                    (Robust Z-score), `q1` e `q3` (IQR) e `q01` e `q99` (Winsorization). Estatísticas `NaN` não
+                    marcam outliers.
+    - `methods`: Os métodos (`z_score`, `robust_z_score`, `iqr` e/ou `winsorization`).
+
+    ### Retorno:
+    - `dict` com uma máscara booleana `(linhas, colunas)` por método.
+    '''
+    masks = {}
+    with np.errstate(invalid='ignore'):
+        for method in methods:
+            lower, upper = get_outlier_bounds(statistics, method)
+            mask = values < lower
+            mask |= values > upper
+            masks[method] = mask
+    return masks
+
+def masks_to_lists(mask: np.ndarray, columns: pd.Index, index: pd.Index = None) -> dict:
+    '''
+    Converte uma máscara de outliers no formato de listas por coluna de `detect_outliers`.
+
+    ### Parâmetros:
+    - `mask`: Máscara booleana `(linhas, colunas)`.
+    - `columns`: Os nomes das colunas.
+    - `index`: O índice do DataFrame, para retornar rótulos; com `None`, são retornadas as posições das linhas.
+
+    ### Retorno:
+    - `dict` com a lista de outliers de cada coluna.
+    '''
+    column_positions, row_positions = np.nonzero(mask.T)
+    splits = np.searchsorted(column_positions, np.arange(1, len(columns)))
+    labels = row_positions if index is None else index.to_numpy()[row_positions]
+    return {column: outliers.tolist() for column, outliers in zip(columns, np.split(labels, splits))}
+
+def detect_outliers_chunked(read_chunks,
+                            z_score_method: bool = False,
+                            robust_z_score_method: bool = False,
+                            iqr_method: bool = False,
+                            winsorization_method: bool = False) -> dict:
+    '''
+    Detecta outliers percorrendo o dataset em blocos, com memória limitada independentemente do número de linhas.
+
+    O dataset é lido duas vezes (três com o Robust Z-score, que precisa da mediana antes de estimar o MAD):
+    as primeiras passadas acumulam média, desvio padrão e quantis (via `QuantileSketch`) e a última
+    marca os outliers. O formato do retorno é o mesmo de `detect_outliers`: posições das linhas para
+    Z-score e Robust Z-score e rótulos do índice para IQR e Winsorization.
+
+    ### Parâmetros:
+    - `read_chunks`: Função sem argumentos que retorna um iterador de DataFrames (por exemplo, `iter_csv_chunks`).
+    - `z_score_method`: Ativa o método Z-score.
+    - `robust_z_score_method`: Ativa o método Robust Z-score.
+    - `iqr_method`: Ativa o método IQR.
+    - `winsorization_method`: Ativa o método Winsorization.
+
+    ### Retorno:
+    - `dict` com os outliers detectados.
+    '''
+    methods = {
+        'z_score': z_score_method,
+        'robust_z_score': robust_z_score_method,
+        'iqr': iqr_method,
+        'winsorization': winsorization_method
+    }
+    if not any(methods.values()):
+        return {}
+
+    columns = None
+    for chunk in read_chunks():
+        if columns is None:
+            columns = chunk.columns.drop('Class')
+            moments = MomentsAccumulator(columns)
+            sketches = [QuantileSketch() for _ in columns]
+
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        moments.update(values)
+        for column_index in range(len(columns)):
+            sketches[column_index].update(values[:, column_index])
+
+    quantiles = np.array([sketch.quantile([WINSORIZATION_QUANTILES[0], 0.25, 0.5, 0.75, WINSORIZATION_QUANTILES[1]])
+                          for sketch in sketches]).T
+    q01, q1, median, q3, q99 = quantiles
+    has_missing = moments.missing > 0
+    statistics = {
+        'mean': np.where(has_missing, np.nan, moments.mean),
+        'std': moments.std(ddof=0),
+        'median': np.where(has_missing, np.nan, median),
+        'q01': q01, 'q1': q1, 'q3': q3, 'q99': q99,
+    }
+
+    if robust_z_score_method:
+        mad_sketches = [QuantileSketch() for _ in columns]
+        for chunk in read_chunks():
+            deviations = np.abs(chunk[columns].to_numpy(dtype=np.float64) - median)
+            for column_index in range(len(columns)):
+                mad_sketches[column_index].update(deviations[:, column_index])
+        statistics['mad'] = np.array([sketch.quantile(0.5) for sketch in mad_sketches])
+
+    active_methods = [method for method, active in methods.items() if active]
+    outliers_dict = {method: {column: [] for column in columns} for method in active_methods}
+    offset = 0
+
+    for chunk in read_chunks():
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        positions = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+
+        for method, mask in get_outlier_masks(values, statistics, active_methods).items():
+            labels = positions if method in POSITIONAL_METHODS else chunk.index.to_numpy()
+            for column_index, column in enumerate(columns):
+                outliers_dict[method][column].extend(labels[mask[:, column_index]].tolist())
+
+    return outliers_dict
@@ -0,0 +1,216 @@
+from io import BytesIO
+import zipfile
+import numpy as np
+import pandas as pd
+import os
+
+from app.storage_manager import get_bucket, track_operation
+from app.outliers_detector import POSITIONAL_METHODS
+
+OUTLIERS_EXTENSION = '.npz'
+OUTLIERS_CONTENT_TYPE = 'application/octet-stream'
+OUTLIERS_FORMAT_VERSION = 1
+OUTLIERS_COMPRESSION_LEVEL = 1
+
+def check_outliers_format(arrays) -> None:
+    '''
+    Verifica se um arquivo `.npz` aberto com `np.load` está na versão do formato de outliers suportada.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se o conteúdo não estiver no formato esperado.
+    '''
+    if 'format_version' not in arrays or int(arrays['format_version']) != OUTLIERS_FORMAT_VERSION:
+        raise ValueError('Formato de outliers não suportado')
+
+class OutlierMasks:
+    '''
+    Resultado compacto da detecção de outliers: uma máscara de bits por método, em vez de listas de índices.
+
+    Cada máscara booleana `(linhas, colunas)` é guardada coluna a coluna com `np.packbits` (um bit por linha)
+    em um arquivo `.npz` comprimido (com o nível `OUTLIERS_COMPRESSION_LEVEL`, o mais rápido), em que as sequências
+    de zeros das linhas normais ocupam poucos bytes.
+    Os índices de uma coluna são extraídos apenas quando pedidos, com a mesma convenção de `detect_outliers`:
+    posições das linhas para o Z-score e o Robust Z-score e rótulos do índice para o IQR e a Winsorization.
+
+    ### Parâmetros:
+    - `masks` (dict, obrigatório): Para cada método, a máscara booleana `(linhas, colunas)` com `True` nos outliers,
+                                   como retornada por `detect_outlier_masks`.
+    - `columns` (list, obrigatório): Os nomes das colunas das máscaras.
+    - `index` (pd.Index, opcional): O índice do DataFrame. O padrão é `None` (índice padrão `0..linhas-1`).
+    '''
+    def __init__(self, masks: dict, columns: list, index: pd.Index = None):
+        self.masks = masks
+        self.columns = [str(column) for column in columns]
+        self.rows = next(iter(masks.values())).shape[0] if masks else (0 if index is None else len(index))
+        if index is not None and index.equals(pd.RangeIndex(self.rows)):
+            index = None
+        self.index = index
+
+    def summary(self) -> dict:
+        '''
+        Retorna o resumo da detecção: o número de linhas, as colunas e, para cada método, o número de outliers
+        por coluna (`counts`) e o número de linhas com outlier em pelo menos uma coluna (`rows_with_outliers`).
+        '''
+        methods = {}
+        for method, mask in self.masks.items():
+            counts = np.count_nonzero(mask, axis=0)
+            methods[method] = {
+                'counts': dict(zip(self.columns, counts.tolist())),
+                'total': int(counts.sum()),
+                'rows_with_outliers': int(np.count_nonzero(mask.any(axis=1))),
+            }
+        return {'rows': self.rows, 'columns': self.columns, 'methods': methods}
+
+    def column_indices(self, column: str, method: str) -> list:
+        '''
+        Retorna os outliers de uma coluna para um método, como em `detect_outliers`.
+
+        ### Gera uma exceção:
+        - `KeyError`: Se a coluna ou o método não estiverem no resultado.
+        '''
+        positions = np.flatnonzero(self.masks[method][:, self.columns.index(column)])
+        if method in POSITIONAL_METHODS or self.index is None:
+            return positions.tolist()
+        return self.index[positions].tolist()
+
+    def to_lists(self) -> dict:
+        '''
+        Retorna o resultado no formato de `detect_outliers` (listas de índices por método e coluna).
+        '''
+        return {method: {column: self.column_indices(column, method) for column in self.columns}
+                for method in self.masks}
+
+    def to_bytes(self) -> bytes:
+        '''
+        Serializa o resultado no formato binário (`.npz` comprimido com as máscaras de bits).
+        '''
+        arrays = {'format_version': np.array(OUTLIERS_FORMAT_VERSION), 'rows': np.array(self.rows),
+                  'columns': np.array(self.columns, dtype=str), 'methods': np.array(list(self.masks), dtype=str)}
+        if self.index is not None:
+            index = self.index.to_numpy()
+            arrays['index'] = index.astype(str) if index.dtype == object else index
+        for method, mask in self.masks.items():
+            arrays[f'mask_{method}'] = np.packbits(np.ascontiguousarray(mask.T), axis=1)
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=OUTLIERS_COMPRESSION_LEVEL) as archive:
+            for name, array in arrays.items():
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as file:
+                    np.lib.format.write_array(file, array, allow_pickle=False)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'OutlierMasks':
+        '''
+        Lê um resultado serializado por `to_bytes`.
+
+        ### Gera uma exceção:
+        - `ValueError`: Se o conteúdo não estiver no formato esperado.
+        '''
+        with np.load(BytesIO(data), allow_pickle=False) as arrays:
+            check_outliers_format(arrays)
+            rows = int(arrays['rows'])
+            columns = arrays['columns'].tolist()
+            index = pd.Index(arrays['index']) if 'index' in arrays else None
+            masks = {method: np.unpackbits(arrays[f'mask_{method}'], axis=1, count=rows).T.astype(bool)
+                     for method in arrays['methods'].tolist()}
+        outlier_masks = cls(masks, columns, index)
+        outlier_masks.rows = rows
+        return outlier_masks
+
+def save_outliers(outlier_masks: OutlierMasks, dataset_id: str, file_name: str, to_gcs: bool = False) -> None:
+    '''
+    Esta função salva um resultado de detecção de outliers no formato binário, localmente ou em um bucket
+    do Google Cloud Storage, sob o caminho `{dataset_id}/{file_name}.npz`.
+
+    ### Parâmetros:
+    - `outlier_masks` (OutlierMasks, obrigatório): O resultado a ser salvo.
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo.
+    - `to_gcs` (bool, opcional): Se o arquivo deve ser salvo no bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Não retorna nada.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.GoogleCloudError`: Se ocorrer um erro ao tentar salvar o arquivo no bucket.
+    '''
+    data = outlier_masks.to_bytes()
+    if to_gcs:
+        blob = get_bucket().blob(f'{dataset_id}/{file_name}{OUTLIERS_EXTENSION}')
+        with track_operation('upload'):
+            blob.upload_from_string(data, OUTLIERS_CONTENT_TYPE)
+    else:
+        os.makedirs(f'app/datasets/{dataset_id}', exist_ok=True)
+        with open(f'app/datasets/{dataset_id}/{file_name}{OUTLIERS_EXTENSION}', 'wb') as file:
+            file.write(data)
+
+def read_outliers_file(dataset_id: str, file_name: str, from_gcs: bool = False) -> bytes:
+    '''
+    Esta função lê o conteúdo de um arquivo de outliers salvo por `save_outliers`.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo, sem a extensão.
+    - `from_gcs` (bool, opcional): Se o arquivo deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `bytes`: O conteúdo do arquivo.
+
+    ### Gera uma exceção:
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    - `google.api_core.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    '''
+    if from_gcs:
+        blob = get_bucket().blob(f'{dataset_id}/{file_name}{OUTLIERS_EXTENSION}')
+        with track_operation('download'):
+            return blob.download_as_bytes()
+    with open(f'app/datasets/{dataset_id}/{file_name}{OUTLIERS_EXTENSION}', 'rb') as file:
+        return file.read()
+
+def load_outliers(dataset_id: str, file_name: str, from_gcs: bool = False) -> OutlierMasks:
+    '''
+    Esta função carrega um resultado de detecção de outliers salvo por `save_outliers`.
+
+    ### Retorna:
+    - `OutlierMasks`: O resultado carregado.
+    '''
+    return OutlierMasks.from_bytes(read_outliers_file(dataset_id, file_name, from_gcs))
+
+def load_column_outliers(dataset_id: str, file_name: str, column: str, method: str = None, from_gcs: bool = False) -> dict:
+    '''
+    Esta função retorna os outliers de uma única coluna a partir de um arquivo salvo por `save_outliers`,
+    desempacotando apenas os bits dessa coluna.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo, sem a extensão.
+    - `column` (str, obrigatório): O nome da coluna.
+    - `method` (str, opcional): O método de detecção. O padrão é `None` (todos os métodos do arquivo).
+    - `from_gcs` (bool, opcional): Se o arquivo deve ser lido do bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `dict`: Para cada método, a lista de outliers da coluna, como em `detect_outliers`.
+
+    ### Gera uma exceção:
+    - `KeyError`: Se a coluna ou o método não estiverem no arquivo.
+    - `ValueError`: Se o arquivo não estiver no formato esperado.
+    '''
+    data = read_outliers_file(dataset_id, file_name, from_gcs)
+    with np.load(BytesIO(data), allow_pickle=False) as arrays:
+        check_outliers_format(arrays)
+        columns = arrays['columns'].tolist()
+        methods = arrays['methods'].tolist()
+        if column not in columns:
+            raise KeyError(f'Coluna "{column}" não encontrada')
+        if method is not None and method not in methods:
+            raise KeyError(f'Método "{method}" não encontrado')
+
+        rows = int(arrays['rows'])
+        index = arrays['index'] if 'index' in arrays else None
+        column_position = columns.index(column)
+        outliers = {}
+        for name in methods if method is None else [method]:
+            bits = arrays[f'mask_{name}'][column_position]
+            positions = np.flatnonzero(np.unpackbits(bits, count=rows))
+            outliers[name] = positions.tolist() if name in POSITIONAL_METHODS or index is None else index[positions].tolist()
+    return outliers
@@ -1,42 +1,139 @@
-from sklearn.preprocessing import MinMaxScaler
 import numpy as np
 import pandas as pd
+from app.column_shards import FrameColumns, map_column_shards, should_shard_columns
+
+POSITIVE_TRANSFORMS = {'log': np.log, 'sqrt': np.sqrt, 'cbrt': np.cbrt}
 
 def transform_outliers(df: pd.DataFrame,
                        outliers_dict: dict,
                        treatment_method=None,
-                       treatment_constant_value=0):
-    
-    df_transformed = df.copy()
-    scaler = MinMaxScaler()
+                       treatment_constant_value=0,
+                       n_jobs: int = None):
+    '''
+    Trata os outliers de um DataFrame.
+
+    Cada atributo com resultado em algum método é tratado uma única vez, por mais métodos que estejam ativos:
+    as transformações (`log`, `sqrt`, `cbrt` e `scaling`) são aplicadas à coluna inteira com funções vetorizadas
+    do numpy, e `constant` e `remove` usam a união dos outliers de todos os métodos, atribuída ou removida de uma vez.
+    Em datasets grandes cujos atributos têm o mesmo tipo de ponto flutuante, as transformações e o `constant` são
+    divididos por colunas entre `n_jobs` processos (veja `map_column_shards`).
+
+    ### Tratamentos:
+    - `log`, `sqrt` e `cbrt`: Aplica a função aos valores positivos; os demais (inclusive os vazios) passam a ser `0`.
+    - `scaling`: Normaliza a coluna para o intervalo `[0, 1]`, como o `MinMaxScaler`.
+    - `constant`: Substitui os outliers por `treatment_constant_value`.
+    - `remove`: Remove as linhas com outliers.
+
+    ### Parâmetros:
+    - `df`: DataFrame com os dados.
+    - `outliers_dict`: Os outliers de cada método, no formato de `detect_outliers` (listas de índices por coluna,
+                       interpretados como rótulos do índice) ou de `detect_outlier_masks` (máscaras booleanas
+                       `(linhas, colunas)` sobre as colunas de `df` sem `Class`).
+    - `treatment_method`: O tratamento a ser aplicado. O padrão é `None` (nenhum tratamento).
+    - `treatment_constant_value`: O valor usado pelo tratamento `constant`. O padrão é `0`.
+    - `n_jobs`: O número de processos. O padrão é `None` (sem divisão).
+
+    ### Retorno:
+    - `pd.DataFrame` com os outliers tratados.
+    '''
+    if treatment_method is None:
+        print('Nenhuma transformação de outliers selecionada')
+        return df.copy()
 
-    attributes = df_transformed.columns.drop('Class')
+    columns = df.columns.drop('Class')
+    attributes = [attribute for attribute in columns
+                  if any(isinstance(outliers, np.ndarray) or attribute in outliers for outliers in outliers_dict.values())]
 
-    for method in outliers_dict.keys():
+    sharded = treatment_method in ['log', 'sqrt', 'cbrt', 'scaling', 'constant'] and can_shard_attributes(df, attributes, n_jobs)
+    if sharded and treatment_method != 'constant':
+        df_transformed = df.copy()
+        df_transformed[attributes] = map_column_shards(
+            transform_columns, [FrameColumns(df, attributes, df[attributes[0]].dtype)], output_dtype=df[attributes[0]].dtype,
+            n_jobs=n_jobs, args=(treatment_method,)).T
+        return df_transformed
+
+    if treatment_method in POSITIVE_TRANSFORMS or treatment_method == 'scaling':
+        df_transformed = df.copy()
         for attribute in attributes:
-            if attribute in outliers_dict[method]:
-                outlier_indices = outliers_dict[method][attribute]
-                valid_indices = df_transformed.index.intersection(outlier_indices)
+            df_transformed[attribute] = transform_column(df[attribute].to_numpy(), treatment_method)
+        return df_transformed
+
+    outliers_mask = get_outliers_union_mask(df, outliers_dict, attributes)
+
+    if treatment_method == 'constant':
+        df_transformed = df.copy()
+        constant = np.nan if treatment_constant_value is None else treatment_constant_value
+        if sharded:
+            df_transformed[attributes] = map_column_shards(
+                replace_column_outliers, [FrameColumns(df, attributes, df[attributes[0]].dtype), np.ascontiguousarray(outliers_mask.T)],
+                output_dtype=df[attributes[0]].dtype, n_jobs=n_jobs, args=(constant,)).T
+            return df_transformed
+        for position in np.flatnonzero(outliers_mask.any(axis=0)):
+            attribute = attributes[position]
+            df_transformed[attribute] = np.where(outliers_mask[:, position], constant, df[attribute].to_numpy())
+        return df_transformed
+
+    if treatment_method == 'remove':
+        return df[~outliers_mask.any(axis=1)]
 
-                if treatment_method == 'log':
-                    df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.log(x) if x > 0 else 0)
+    return df.copy()
 
-                elif treatment_method == 'sqrt':
-                    df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.sqrt(x) if x > 0 else 0)
+def can_shard_attributes(df: pd.DataFrame, attributes: list, n_jobs: int = None) -> bool:
+    '''
+    Verifica se o tratamento dos atributos pode ser dividido entre processos: os atributos precisam ter o mesmo
+    tipo de ponto flutuante (que é mantido no resultado) e o dataset precisa ser grande o bastante.
+    '''
+    dtypes = {df[attribute].dtype for attribute in attributes}
+    return (len(dtypes) == 1 and np.issubdtype(next(iter(dtypes)), np.floating)
+            and should_shard_columns(len(attributes), len(df), n_jobs))
 
-                elif treatment_method == 'cbrt':
-                    df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.cbrt(x) if x > 0 else 0)
+def transform_columns(columns_values: np.ndarray, treatment_method: str) -> np.ndarray:
+    '''
+    Aplica `transform_column` a cada coluna de uma matriz `(colunas, linhas)`.
+    '''
+    return np.stack([transform_column(values, treatment_method) for values in columns_values])
 
-                elif treatment_method == 'scaling':
-                    df_transformed[attribute] = scaler.fit_transform(df_transformed[attribute].values.reshape(-1,1))
+def replace_column_outliers(columns_values: np.ndarray, columns_mask: np.ndarray, constant) -> np.ndarray:
+    '''
+    Substitui por `constant` os valores de uma matriz `(colunas, linhas)` marcados na máscara de mesmo formato.
+    '''
+    return np.where(columns_mask, constant, columns_values)
 
-                elif treatment_method == 'constant':
-                    df_transformed.loc[valid_indices, attribute] = treatment_constant_value
+def transform_column(values: np.ndarray, treatment_method: str) -> np.ndarray:
+    '''
+    Aplica a transformação `treatment_method` (`log`, `sqrt`, `cbrt` ou `scaling`) a todos os valores de uma coluna.
+    Colunas inteiras são convertidas para `float64`; colunas `float32` continuam `float32`.
+    '''
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
 
-                elif treatment_method == 'remove':
-                    df_transformed = df_transformed.drop(valid_indices)
+    if treatment_method == 'scaling':
+        with np.errstate(invalid='ignore'):
+            data_min, data_max = np.nanmin(values, initial=np.inf), np.nanmax(values, initial=-np.inf)
+        data_range = data_max - data_min
+        scale = 1 / (data_range if data_range >= 10 * np.finfo(values.dtype).eps else 1)
+        return values * scale + (0 - data_min * scale)
 
-                elif treatment_method == None:
-                    print('Nenhuma transformação de outliers selecionada')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values > 0, POSITIVE_TRANSFORMS[treatment_method](values), values.dtype.type(0))
 
-    return df_transformed
\ No newline at end of file
+def get_outliers_union_mask(df: pd.DataFrame, outliers_dict: dict, attributes: list) -> np.ndarray:
+    '''
+    Retorna a máscara booleana `(linhas, atributos)` com `True` nas linhas que são outliers de cada atributo
+    em pelo menos um método.
+    '''
+    columns = df.columns.drop('Class')
+    outliers_mask = np.zeros((len(df), len(attributes)), dtype=bool)
+    for outliers in outliers_dict.values():
+        if isinstance(outliers, np.ndarray):
+            outliers_mask |= outliers[:, columns.get_indexer(attributes)]
+            continue
+        for position, attribute in enumerate(attributes):
+            if len(outliers.get(attribute, [])) == 0:
+                continue
+            if df.index.is_unique:
+                rows = df.index.get_indexer(outliers[attribute])
+                outliers_mask[rows[rows >= 0], position] = True
+            else:
+                outliers_mask[:, position] |= df.index.isin(outliers[attribute])
+    return outliers_mask
@@ -0,0 +1,330 @@
+from collections import OrderedDict
+import pandas as pd
+import threading
+import hashlib
+import shutil
+import json
+import os
+
+from app.dataset_manager import find_local_csv_path, get_gcs_csv_blob, get_csv_extension, save_df
+from app.json_manager import save_json, numpy_encoder
+from app.file_server import get_file_etag
+from app.storage_manager import get_bucket
+from app.outliers_store import OutlierMasks, save_outliers, OUTLIERS_EXTENSION
+
+RESULT_CACHE_DIR = 'app/datasets/.results'
+RESULT_CACHE_MAX_BYTES = 512 * 1024 ** 2
+RESULT_ENTRY_FILE = 'entry.json'
+RESULT_PUBLISHED_FILE = 'published.json'
+
+def get_dataset_digest(dataset_id: str, file_name: str, from_gcs: bool = False) -> str:
+    '''
+    Retorna um identificador do conteúdo do CSV de um dataset.
+
+    Localmente, é o hash SHA-256 do arquivo (calculado uma única vez por versão, veja `get_file_etag`).
+    No bucket, é o MD5 calculado pelo próprio Google Cloud Storage ou, na falta dele, a geração do blob.
+
+    ### Parâmetros:
+    - `dataset_id` (str, obrigatório): O ID do dataset.
+    - `file_name` (str, obrigatório): O nome do arquivo CSV.
+    - `from_gcs` (bool, opcional): Se o arquivo CSV está no bucket do Google Cloud Storage. O padrão é `False`.
+
+    ### Retorna:
+    - `str`: O identificador do conteúdo.
+
+    ### Gera uma exceção:
+    - `google.cloud.exceptions.NotFound`: Se o arquivo não for encontrado no bucket.
+    - `FileNotFoundError`: Se o arquivo não for encontrado localmente.
+    '''
+    if from_gcs:
+        blob, _ = get_gcs_csv_blob(dataset_id, file_name)
+        md5_hash = getattr(blob, 'md5_hash', None)
+        return f'md5-{md5_hash}' if md5_hash else f'gcs-{blob.generation}'
+
+    return f'sha256-{get_file_etag(find_local_csv_path(dataset_id, file_name)).strip(chr(34))}'
+
+def normalize_parameters(parameters: dict) -> dict:
+    '''
+    Normaliza os parâmetros de um endpoint para a chave do cache: números inteiros representados como
+    `float` viram `int` e listas são ordenadas, de forma que chamadas equivalentes gerem a mesma chave.
+    '''
+    normalized = {}
+    for name, value in parameters.items():
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(value)
+        normalized[name] = value
+    return normalized
+
+def get_result_key(endpoint: str, dataset_digest: str, parameters: dict) -> str:
+    '''
+    Retorna a chave de um resultado: o hash SHA-256 do endpoint, do conteúdo do dataset e dos parâmetros normalizados.
+
+    ### Parâmetros:
+    - `endpoint` (str, obrigatório): O nome do endpoint.
+    - `dataset_digest` (str, obrigatório): O identificador do conteúdo do dataset (veja `get_dataset_digest`).
+    - `parameters` (dict, obrigatório): Os parâmetros que afetam o resultado.
+
+    ### Retorna:
+    - `str`: A chave, em hexadecimal.
+    '''
+    description = json.dumps({'endpoint': endpoint, 'dataset': dataset_digest,
+                              'parameters': normalize_parameters(parameters)}, sort_keys=True)
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+def get_artifact_location(dataset_id: str, artifact_name: str, kind: str, to_gcs: bool = False) -> str:
+    '''
+    Retorna o local onde um artefato é publicado: o caminho local ou o nome do blob no bucket.
+    '''
+    extension = {'df': get_csv_extension(), 'outliers': OUTLIERS_EXTENSION}.get(kind, '.json')
+    if to_gcs:
+        return f'{dataset_id}/{artifact_name}{extension}'
+    return f'app/datasets/{dataset_id}/{artifact_name}{extension}'
+
+def get_artifact_version(location: str, to_gcs: bool = False) -> str:
+    '''
+    Retorna a versão atual de um artefato publicado (o ETag do arquivo local ou a geração do blob),
+    ou `None` se ele não existir.
+    '''
+    if to_gcs:
+        blob = get_bucket().get_blob(location)
+        return None if blob is None else f'gcs-{blob.generation}'
+    if not os.path.exists(location):
+        return None
+    return get_file_etag(location)
+
+class ResultCache:
+    '''
+    Cache em disco dos resultados dos endpoints de análise, endereçado pelo conteúdo do dataset e pelos parâmetros.
+
+    Cada entrada guarda a resposta do endpoint e os resultados que foram gravados como artefatos (DataFrames
+    em Parquet, outliers no formato binário de `outliers_store` e dicionários em JSON). Em um acerto, o endpoint
+    responde sem carregar o dataset; os artefatos só são gravados novamente se o arquivo publicado tiver sido
+    apagado ou sobrescrito desde a última vez que o cache o publicou (por exemplo, pela mesma análise com
+    outros parâmetros).
+
+    As entradas são descartadas da menos usada recentemente para a mais usada quando o tamanho total passa de
+    `max_bytes`. O uso de cada entrada é registrado na data de modificação do seu `entry.json`, de forma que a
+    ordem sobrevive a reinícios da API.
+
+    ### Parâmetros:
+    - `directory` (str, opcional): O diretório das entradas. O padrão é `RESULT_CACHE_DIR`.
+    - `max_bytes` (int, opcional): O tamanho máximo do cache, em bytes. O padrão é `RESULT_CACHE_MAX_BYTES`.
+    '''
+    def __init__(self, directory: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = None
+        self._published = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict:
+        '''
+        Retorna a entrada de um resultado (com a resposta do endpoint em `response` e os artefatos em `artifacts`),
+        ou `None` se ela não estiver no cache.
+        '''
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                entry_path = os.path.join(self.directory, key, RESULT_ENTRY_FILE)
+                with open(entry_path) as file:
+                    entry = json.load(file)
+                os.utime(entry_path)
+            except (OSError, ValueError):
+                self.current_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, response: dict, results: dict) -> None:
+        '''
+        Armazena um resultado. A entrada é gravada em um diretório temporário e movida de uma vez, de forma que
+        uma entrada incompleta nunca é lida.
+
+        ### Parâmetros:
+        - `key` (str, obrigatório): A chave do resultado (veja `get_result_key`).
+        - `response` (dict, obrigatório): O conteúdo da resposta do endpoint.
+        - `results` (dict, obrigatório): Para cada nome de artefato, uma tupla com o valor (DataFrame, `OutlierMasks` ou dicionário),
+                                         o tipo (`df`, `outliers` ou `json`, como em `publish`) e os argumentos da função de
+                                         gravação (por exemplo, `{'index': True}`).
+
+        ### Não retorna nada.
+        '''
+        entry_dir = os.path.join(self.directory, key)
+        temp_dir = f'{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp'
+        os.makedirs(temp_dir, exist_ok=True)
+
+        artifacts = {}
+        for artifact_name, (value, kind, save_kwargs) in results.items():
+            if kind == 'df':
+                file_name = f'{len(artifacts)}.parquet'
+                value.to_parquet(os.path.join(temp_dir, file_name), index=True)
+            elif kind == 'outliers':
+                file_name = f'{len(artifacts)}{OUTLIERS_EXTENSION}'
+                with open(os.path.join(temp_dir, file_name), 'wb') as file:
+                    file.write(value.to_bytes())
+            else:
+                file_name = f'{len(artifacts)}.json'
+                with open(os.path.join(temp_dir, file_name), 'w') as file:
+                    json.dump(value, file, cls=numpy_encoder)
+            artifacts[artifact_name] = {'file': file_name, 'kind': kind, 'save_kwargs': save_kwargs}
+
+        with open(os.path.join(temp_dir, RESULT_ENTRY_FILE), 'w') as file:
+            json.dump({'response': response, 'artifacts': artifacts}, file)
+        size = sum(entry.stat().st_size for entry in os.scandir(temp_dir))
+
+        with self._lock:
+            self._load_index()
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+            self._entries[key] = size
+            self.current_bytes += size
+            self._evict()
+
+    def load_artifact(self, key: str, artifact: dict):
+        '''
+        Carrega o valor de um artefato armazenado em uma entrada.
+
+        ### Parâmetros:
+        - `key` (str, obrigatório): A chave do resultado.
+        - `artifact` (dict, obrigatório): A descrição do artefato, como em `entry['artifacts']`.
+
+        ### Retorna:
+        - `pd.DataFrame | OutlierMasks | dict`: O valor do artefato.
+        '''
+        path = os.path.join(self.directory, key, artifact['file'])
+        if artifact['kind'] == 'df':
+            return pd.read_parquet(path)
+        if artifact['kind'] == 'outliers':
+            with open(path, 'rb') as file:
+                return OutlierMasks.from_bytes(file.read())
+        with open(path) as file:
+            return json.load(file)
+
+    def publish(self, key: str, dataset_id: str, artifact_name: str, value, kind: str, to_gcs: bool = False, **save_kwargs) -> None:
+        '''
+        Grava um artefato no seu local público (com `save_df`, `save_outliers` ou `save_json`) e registra que a versão gravada
+        corresponde à entrada `key`. É usada como função de gravação do `artifact_writer`.
+
+        ### Parâmetros:
+        - `key` (str, obrigatório): A chave do resultado.
+        - `dataset_id` (str, obrigatório): O ID do dataset.
+        - `artifact_name` (str, obrigatório): O nome do artefato.
+        - `value` (pd.DataFrame | OutlierMasks | dict, obrigatório): O valor do artefato, ou `None` para carregá-lo da entrada.
+        - `kind` (str, obrigatório): `df` para DataFrames, `outliers` para resultados de outliers ou `json` para dicionários.
+        - `to_gcs` (bool, opcional): Se o artefato deve ser gravado no bucket. O padrão é `False`.
+
+        ### Não retorna nada.
+        '''
+        if value is None:
+            with open(os.path.join(self.directory, key, RESULT_ENTRY_FILE)) as file:
+                value = self.load_artifact(key, json.load(file)['artifacts'][artifact_name])
+
+        if kind == 'df':
+            save_df(value, dataset_id, artifact_name, to_gcs=to_gcs, **save_kwargs)
+        elif kind == 'outliers':
+            save_outliers(value, dataset_id, artifact_name, to_gcs=to_gcs)
+        else:
+            save_json(value, dataset_id, artifact_name, to_gcs=to_gcs)
+
+        location = get_artifact_location(dataset_id, artifact_name, kind, to_gcs)
+        version = get_artifact_version(location, to_gcs)
+        with self._lock:
+            self._load_published()
+            self._published[location] = {'key': key, 'version': version}
+            self._save_published()
+
+    def is_published(self, key: str, location: str, to_gcs: bool = False) -> bool:
+        '''
+        Verifica se o artefato em `location` ainda é o que foi publicado a partir da entrada `key`.
+        '''
+        with self._lock:
+            self._load_published()
+            published = self._published.get(location)
+        if published is None or published['key'] != key:
+            return False
+        return published['version'] is not None and published['version'] == get_artifact_version(location, to_gcs)
+
+    def stats(self) -> dict:
+        '''
+        Retorna os contadores do cache: acertos, falhas, taxa de acertos, descartes, entradas e bytes ocupados.
+        '''
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        '''
+        Remove todas as entradas do cache e zera os contadores.
+        '''
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self._entries = None
+            self._published = None
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def _load_index(self) -> None:
+        if self._entries is not None:
+            return
+
+        found = []
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                entry_path = os.path.join(entry.path, RESULT_ENTRY_FILE)
+                if entry.is_dir() and not entry.name.endswith('.tmp') and os.path.exists(entry_path):
+                    size = sum(file.stat().st_size for file in os.scandir(entry.path))
+                    found.append((os.stat(entry_path).st_mtime_ns, entry.name, size))
+
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(found))
+        self.current_bytes = sum(self._entries.values())
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def _load_published(self) -> None:
+        if self._published is not None:
+            return
+        try:
+            with open(os.path.join(self.directory, RESULT_PUBLISHED_FILE)) as file:
+                self._published = json.load(file)
+        except (OSError, ValueError):
+            self._published = {}
+
+    def _save_published(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        published_path = os.path.join(self.directory, RESULT_PUBLISHED_FILE)
+        temp_path = f'{published_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self._published, file)
+        os.replace(temp_path, published_path)
+
+result_cache = ResultCache()
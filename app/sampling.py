@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+import time
+
+SEED = 42
+SAMPLE_CONFIDENCE = 0.95
+SAMPLE_PILOT_SIZE = 2_000
+SAMPLE_BUDGET_SAFETY = 0.8
+
+def stratified_sample(df: pd.DataFrame, sample_size: int, stratify_column: str = 'Class', seed: int = SEED) -> pd.DataFrame:
+    '''
+    Sorteia uma amostra sem reposição estratificada pela coluna `stratify_column`, com alocação proporcional.
+
+    Cada estrato recebe uma parte da amostra proporcional ao seu tamanho (pelo método dos maiores restos),
+    com pelo menos uma linha por estrato quando a amostra comporta, para que classes raras (como as fraudes)
+    não desapareçam; essas linhas são descontadas dos maiores estratos, e a amostra tem sempre `sample_size`
+    linhas. Sem a coluna de estratificação, a amostra é aleatória simples.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame com os dados.
+    - `sample_size` (int, obrigatório): O número de linhas da amostra.
+    - `stratify_column` (str, opcional): A coluna usada na estratificação. O padrão é `Class`.
+    - `seed` (int, opcional): A semente do gerador aleatório. O padrão é `SEED`.
+
+    ### Retorna:
+    - `pd.DataFrame`: A amostra, com as linhas na ordem original.
+    '''
+    if sample_size >= len(df):
+        return df
+
+    rng = np.random.default_rng(seed)
+    if stratify_column not in df.columns:
+        return df.iloc[np.sort(rng.choice(len(df), size=sample_size, replace=False))]
+
+    codes, strata = pd.factorize(df[stratify_column], use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(strata))
+
+    quotas = counts / len(df) * sample_size
+    allocation = np.floor(quotas).astype(np.int64)
+    if sample_size >= len(strata):
+        allocation = np.maximum(allocation, 1)
+    remainder = sample_size - allocation.sum()
+    if remainder > 0:
+        allocation[np.argsort(allocation - quotas, kind='stable')[:remainder]] += 1
+    for _ in range(-remainder):
+        # As linhas garantidas aos estratos raros saem dos maiores estratos, que continuam com mais de uma linha
+        allocation[np.argmax(allocation)] -= 1
+    allocation = np.minimum(allocation, counts)
+
+    positions = [rng.choice(np.flatnonzero(codes == stratum), size=size, replace=False)
+                 for stratum, size in enumerate(allocation) if size > 0]
+    return df.iloc[np.sort(np.concatenate(positions))]
+
+def choose_sample_size(df: pd.DataFrame, compute, sample_size: int = None, time_budget: float = None) -> int:
+    '''
+    Escolhe o tamanho da amostra a partir de um tamanho pedido e/ou de um orçamento de tempo.
+
+    Com `time_budget`, `compute` é executado em uma amostra piloto de `SAMPLE_PILOT_SIZE` linhas, e o
+    tamanho é extrapolado (supondo custo proporcional ao número de linhas) para caber em
+    `SAMPLE_BUDGET_SAFETY` do tempo que resta do orçamento. Com os dois parâmetros, vale o menor tamanho.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame com os dados.
+    - `compute` (callable, obrigatório): A função que será executada na amostra.
+    - `sample_size` (int, opcional): O tamanho máximo da amostra. O padrão é `None`.
+    - `time_budget` (float, opcional): O tempo disponível para o cálculo, em segundos. O padrão é `None`.
+
+    ### Retorna:
+    - `int`: O número de linhas da amostra (no máximo o número de linhas do dataset).
+    '''
+    size = len(df) if sample_size is None else min(sample_size, len(df))
+
+    if time_budget is not None and size > SAMPLE_PILOT_SIZE:
+        start = time.perf_counter()
+        compute(stratified_sample(df, SAMPLE_PILOT_SIZE))
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        remaining = max(time_budget - elapsed, 0)
+        size = min(size, max(SAMPLE_PILOT_SIZE, int(SAMPLE_PILOT_SIZE * remaining / elapsed * SAMPLE_BUDGET_SAFETY)))
+
+    return size
+
+def draw_sample(df: pd.DataFrame, compute, sample_size: int = None, time_budget: float = None) -> tuple:
+    '''
+    Sorteia a amostra estratificada usada no modo amostral, com o tamanho escolhido por `choose_sample_size`.
+
+    ### Parâmetros:
+    - `df` (pd.DataFrame, obrigatório): O DataFrame com os dados.
+    - `compute` (callable, obrigatório): A função que será executada na amostra.
+    - `sample_size` (int, opcional): O tamanho máximo da amostra. O padrão é `None`.
+    - `time_budget` (float, opcional): O tempo disponível para o cálculo, em segundos. O padrão é `None`.
+
+    ### Retorna:
+    - `tuple`: A amostra e um dicionário com o número de linhas da amostra (`rows`) e do dataset (`population_rows`).
+    '''
+    sample = stratified_sample(df, choose_sample_size(df, compute, sample_size, time_budget))
+    return sample, {'rows': len(sample), 'population_rows': len(df)}
+
+def finite_population_correction(sample_rows: int, population_rows: int) -> float:
+    '''
+    Retorna o fator de correção para população finita, usado nos erros padrão de amostras sem reposição.
+    '''
+    if population_rows <= 1:
+        return 0.0
+    return float(np.sqrt(max(population_rows - sample_rows, 0) / (population_rows - 1)))
@@ -0,0 +1,140 @@
+from google.cloud import storage
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+from contextlib import contextmanager
+import google.auth
+import threading
+import time
+
+BUCKET_NAME = 'banks-dev-392615.appspot.com'
+CREDENTIALS_PATH = 'banks-dev-392615-7412df8a19f0.json'
+HTTP_POOL_SIZE = 32
+
+_storage_client = None
+_bucket = None
+_client_lock = threading.Lock()
+
+_operation_stats = {}
+_stats_lock = threading.Lock()
+
+def get_credentials():
+    '''
+    Tenta carregar as credenciais a partir do arquivo JSON. Se não conseguir,
+    cai de volta para as credenciais padrão do Google Cloud.
+
+    ### Retorno:
+    - `google.auth.credentials.Credentials`: Objeto de credenciais do Google Cloud.
+    '''
+    try:
+        return service_account.Credentials.from_service_account_file(CREDENTIALS_PATH)
+    except Exception as e:
+        credentials, _ = google.auth.default()
+        return credentials
+
+def get_storage_client() -> storage.Client:
+    '''
+    Retorna o cliente do Google Cloud Storage compartilhado pelo processo.
+
+    O cliente é criado na primeira chamada e reutilizado em todas as seguintes, de forma que
+    as credenciais são lidas uma única vez e as conexões HTTP (e seus handshakes TLS) são
+    mantidas em um pool de até `HTTP_POOL_SIZE` conexões. A criação é protegida por lock,
+    então o cliente pode ser obtido de várias threads ao mesmo tempo.
+
+    ### Retorno:
+    - `google.cloud.storage.Client`: O cliente do Google Cloud Storage.
+    '''
+    global _storage_client
+
+    if _storage_client is None:
+        with _client_lock:
+            if _storage_client is None:
+                credentials = get_credentials()
+                session = AuthorizedSession(credentials)
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                _storage_client = storage.Client(credentials=credentials, _http=session)
+
+    return _storage_client
+
+def get_bucket():
+    '''
+    Retorna o bucket `BUCKET_NAME` usando o cliente compartilhado, ou o bucket definido com `set_bucket`.
+
+    ### Retorno:
+    - `google.cloud.storage.Bucket`: O bucket do Google Cloud Storage.
+    '''
+    global _bucket
+
+    if _bucket is None:
+        bucket = get_storage_client().bucket(BUCKET_NAME)
+        with _client_lock:
+            if _bucket is None:
+                _bucket = bucket
+
+    return _bucket
+
+def set_bucket(bucket) -> None:
+    '''
+    Substitui o bucket usado por todos os módulos. Útil para testes com um bucket falso local.
+    Passar `None` faz com que o bucket real seja criado novamente na próxima chamada de `get_bucket`.
+
+    ### Parâmetros:
+    - `bucket`: Um objeto com a mesma interface de `google.cloud.storage.Bucket`, ou `None`.
+    '''
+    global _bucket
+
+    with _client_lock:
+        _bucket = bucket
+
+@contextmanager
+def track_operation(operation: str):
+    '''
+    Mede a latência de uma operação no bucket e acumula as estatísticas por tipo de operação.
+
+    ### Parâmetros:
+    - `operation` (str, obrigatório): O nome da operação, como `download` ou `upload`.
+    '''
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            stats = _operation_stats.setdefault(operation, {
+                'count': 0,
+                'errors': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+            })
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+def get_operation_stats() -> dict:
+    '''
+    Retorna as estatísticas de latência acumuladas por tipo de operação.
+
+    ### Retorno:
+    - `dict`: Para cada operação, o número de chamadas, de erros, o tempo total, o tempo médio e o tempo máximo, em segundos.
+    '''
+    with _stats_lock:
+        return {
+            operation: {
+                **stats,
+                'mean_seconds': stats['total_seconds'] / stats['count'] if stats['count'] else 0.0,
+            }
+            for operation, stats in _operation_stats.items()
+        }
+
+def reset_operation_stats() -> None:
+    '''
+    Zera as estatísticas de latência.
+    '''
+    with _stats_lock:
+        _operation_stats.clear()
@@ -0,0 +1,403 @@
+import pandas as pd
+import numpy as np
+
+QUANTILE_SKETCH_SIZE = 4096
+FREQUENT_ITEMS_CAPACITY = 4096
+
+class MomentsAccumulator:
+    '''
+    Acumulador combinável de estatísticas por coluna: contagem, valores vazios, zeros, mínimo, máximo
+    e os momentos centrais de ordem 2 a 4 (para desvio padrão, assimetria e curtose).
+
+    Os blocos são combinados com as fórmulas de Pébay, então o resultado não depende de como os dados
+    foram divididos e é numericamente estável mesmo para médias altas.
+
+    ### Parâmetros:
+    - `columns` (list, obrigatório): Os nomes das colunas acumuladas.
+    '''
+    _FIELDS = ['count', 'missing', 'zeros', 'min', 'max', 'mean', 'm2', 'm3', 'm4']
+
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.rows = 0
+        self.count = np.zeros(size)
+        self.missing = np.zeros(size, dtype=np.int64)
+        self.zeros = np.zeros(size, dtype=np.int64)
+        self.min = np.full(size, np.nan)
+        self.max = np.full(size, np.nan)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.m3 = np.zeros(size)
+        self.m4 = np.zeros(size)
+
+    def update(self, values: np.ndarray) -> None:
+        '''
+        Acumula um bloco de linhas.
+
+        ### Parâmetros:
+        - `values` (np.ndarray, obrigatório): Matriz `(linhas, colunas)` com as colunas na ordem de `columns`.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[0] == 0:
+            return
+
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0).astype(np.float64)
+        complete = bool((count == values.shape[0]).all())
+
+        other = MomentsAccumulator(self.columns)
+        other.rows = values.shape[0]
+        other.count = count
+        other.missing = values.shape[0] - valid.sum(axis=0)
+        other.zeros = (values == 0).sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if complete:
+                other.min = values.min(axis=0)
+                other.max = values.max(axis=0)
+                other.mean = values.sum(axis=0) / count
+                deviations = values - other.mean
+            else:
+                other.min = np.where(count > 0, np.nanmin(np.where(valid, values, np.inf), axis=0), np.nan)
+                other.max = np.where(count > 0, np.nanmax(np.where(valid, values, -np.inf), axis=0), np.nan)
+                other.mean = np.where(count > 0, np.where(valid, values, 0).sum(axis=0) / count, 0)
+                deviations = np.where(valid, values - other.mean, 0)
+            squared = deviations * deviations
+            other.m2 = squared.sum(axis=0)
+            other.m3 = np.einsum('ij,ij->j', squared, deviations)
+            other.m4 = np.einsum('ij,ij->j', squared, squared)
+
+        self.merge(other)
+
+    def merge(self, other: 'MomentsAccumulator') -> None:
+        '''
+        Combina outro acumulador das mesmas colunas neste acumulador.
+        '''
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            mean = np.where(n > 0, self.mean + delta * n_b / n, 0)
+            m2 = self.m2 + other.m2 + delta ** 2 * n_a * n_b / n
+            m3 = (self.m3 + other.m3
+                  + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+                  + 3 * delta * (n_a * other.m2 - n_b * self.m2) / n)
+            m4 = (self.m4 + other.m4
+                  + delta ** 4 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 3
+                  + 6 * delta ** 2 * (n_a ** 2 * other.m2 + n_b ** 2 * self.m2) / n ** 2
+                  + 4 * delta * (n_a * other.m3 - n_b * self.m3) / n)
+
+        empty = n == 0
+        self.mean = mean
+        self.m2 = np.where(empty, 0, m2)
+        self.m3 = np.where(empty, 0, m3)
+        self.m4 = np.where(empty, 0, m4)
+        self.count = n
+        self.rows += other.rows
+        self.missing = self.missing + other.missing
+        self.zeros = self.zeros + other.zeros
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    def to_arrays(self, prefix: str) -> dict:
+        '''
+        Retorna o estado do acumulador como um dicionário de arrays, para ser salvo com `np.savez`.
+
+        ### Parâmetros:
+        - `prefix` (str, obrigatório): O prefixo dos nomes dos arrays.
+        '''
+        arrays = {f'{prefix}_{field}': getattr(self, field) for field in self._FIELDS}
+        arrays[f'{prefix}_rows'] = np.array(self.rows)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, prefix: str, columns: list) -> 'MomentsAccumulator':
+        '''
+        Recria um acumulador a partir do dicionário de arrays gerado por `to_arrays`.
+        '''
+        accumulator = cls(columns)
+        for field in cls._FIELDS:
+            setattr(accumulator, field, np.asarray(arrays[f'{prefix}_{field}']))
+        accumulator.rows = int(arrays[f'{prefix}_rows'])
+        return accumulator
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        '''
+        Retorna o desvio padrão de cada coluna.
+        '''
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, np.sqrt(self.m2 / (self.count - ddof)), np.nan)
+
+    def skew(self) -> np.ndarray:
+        '''
+        Retorna a assimetria de cada coluna, com a mesma correção de viés usada pelo pandas.
+        '''
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            m2 = self.m2 / n
+            m3 = self.m3 / n
+            result = np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5
+        result = np.where(self.m2 == 0, 0, result)
+        return np.where(n < 3, np.nan, result)
+
+    def kurtosis(self) -> np.ndarray:
+        '''
+        Retorna a curtose (excesso) de cada coluna, com a mesma correção de viés usada pelo pandas.
+        '''
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            numerator = n * (n + 1) * (n - 1) * self.m4
+            denominator = (n - 2) * (n - 3) * self.m2 ** 2
+            result = numerator / denominator - adjustment
+        result = np.where(denominator == 0, 0, result)
+        return np.where(n < 4, np.nan, result)
+
+class QuantileSketch:
+    '''
+    Sketch combinável de quantis (variante do KLL com compactadores de capacidade fixa).
+
+    Cada nível guarda no máximo `size` valores; quando um nível enche, ele é ordenado e metade dos
+    valores (alternados, com deslocamento aleatório) sobe para o nível seguinte com o dobro do peso.
+    A memória é limitada a `size` valores por nível, independentemente do número de linhas, e o erro
+    de posição é da ordem de `log(n / size) / size`. Enquanto nenhum nível enche, os quantis são exatos.
+
+    ### Parâmetros:
+    - `size` (int, opcional): A capacidade de cada nível. O padrão é `QUANTILE_SKETCH_SIZE`.
+    - `seed` (int, opcional): A semente do gerador aleatório. O padrão é `None`.
+    '''
+    def __init__(self, size: int = QUANTILE_SKETCH_SIZE, seed: int = None):
+        self.size = size
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        '''
+        Adiciona valores ao sketch. Valores vazios (`NaN`) são ignorados.
+        '''
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        '''
+        Combina outro sketch neste sketch.
+        '''
+        for level, values in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], values])
+        self.count += other.count
+        self._compress()
+
+    def to_arrays(self, prefix: str) -> dict:
+        '''
+        Retorna o estado do sketch como um dicionário de arrays, para ser salvo com `np.savez`.
+
+        ### Parâmetros:
+        - `prefix` (str, obrigatório): O prefixo dos nomes dos arrays.
+        '''
+        arrays = {f'{prefix}_level_{level}': values for level, values in enumerate(self.levels)}
+        arrays[f'{prefix}_size'] = np.array(self.size)
+        arrays[f'{prefix}_count'] = np.array(self.count)
+        arrays[f'{prefix}_levels'] = np.array(len(self.levels))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, prefix: str) -> 'QuantileSketch':
+        '''
+        Recria um sketch a partir do dicionário de arrays gerado por `to_arrays`.
+        '''
+        sketch = cls(size=int(arrays[f'{prefix}_size']))
+        sketch.count = int(arrays[f'{prefix}_count'])
+        sketch.levels = [np.asarray(arrays[f'{prefix}_level_{level}'], dtype=np.float64)
+                         for level in range(int(arrays[f'{prefix}_levels']))]
+        return sketch
+
+    def quantile(self, q) -> np.ndarray:
+        '''
+        Estima os quantis `q` com interpolação linear, como `np.percentile`.
+
+        ### Parâmetros:
+        - `q` (float ou lista de float, obrigatório): Os quantis desejados, entre 0 e 1.
+
+        ### Retorno:
+        - `np.ndarray` com os quantis estimados (`NaN` se o sketch estiver vazio).
+        '''
+        q = np.asarray(q, dtype=np.float64)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_values), 2.0 ** level)
+                                  for level, level_values in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        positions = np.cumsum(weights) - (weights + 1) / 2
+
+        return np.interp(q * (weights.sum() - 1), positions, values)
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            values = self.levels[level]
+            if len(values) > self.size:
+                values = np.sort(values)
+                leftover = values[-1:] if len(values) % 2 else values[:0]
+                values = values[:len(values) - len(leftover)]
+                promoted = values[self._rng.integers(2)::2]
+                self.levels[level] = leftover
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+class FrequentItemsSketch:
+    '''
+    Sketch combinável de valores frequentes (algoritmo de Misra-Gries), usado para estimar a moda.
+
+    Guarda no máximo `capacity` contadores. Enquanto a coluna tiver até `capacity` valores distintos
+    as contagens são exatas; acima disso, qualquer valor com frequência maior que `n / capacity`
+    continua sendo encontrado.
+
+    ### Parâmetros:
+    - `capacity` (int, opcional): O número máximo de contadores. O padrão é `FREQUENT_ITEMS_CAPACITY`.
+    '''
+    def __init__(self, capacity: int = FREQUENT_ITEMS_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.float64)
+
+    def update(self, values: np.ndarray) -> None:
+        '''
+        Adiciona valores ao sketch. Valores vazios (`NaN`) são ignorados.
+        '''
+        self._add(pd.Series(values).value_counts(dropna=True).astype(np.float64))
+
+    def merge(self, other: 'FrequentItemsSketch') -> None:
+        '''
+        Combina outro sketch neste sketch.
+        '''
+        self._add(other.counts)
+
+    def to_arrays(self, prefix: str) -> dict:
+        '''
+        Retorna o estado do sketch como um dicionário de arrays, para ser salvo com `np.savez`.
+
+        ### Parâmetros:
+        - `prefix` (str, obrigatório): O prefixo dos nomes dos arrays.
+        '''
+        return {
+            f'{prefix}_capacity': np.array(self.capacity),
+            f'{prefix}_values': self.counts.index.to_numpy(dtype=np.float64),
+            f'{prefix}_counts': self.counts.to_numpy(dtype=np.float64),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, prefix: str) -> 'FrequentItemsSketch':
+        '''
+        Recria um sketch a partir do dicionário de arrays gerado por `to_arrays`.
+        '''
+        sketch = cls(capacity=int(arrays[f'{prefix}_capacity']))
+        sketch.counts = pd.Series(np.asarray(arrays[f'{prefix}_counts'], dtype=np.float64),
+                                  index=np.asarray(arrays[f'{prefix}_values'], dtype=np.float64))
+        return sketch
+
+    def most_frequent(self) -> float:
+        '''
+        Retorna o valor mais frequente (o menor deles, em caso de empate), ou `NaN` se o sketch estiver vazio.
+        '''
+        if self.counts.empty:
+            return np.nan
+        return self.counts[self.counts == self.counts.max()].index.min()
+
+    def _add(self, counts: pd.Series) -> None:
+        combined = self.counts.add(counts, fill_value=0)
+        if len(combined) > self.capacity:
+            threshold = combined.nlargest(self.capacity + 1).iloc[-1]
+            combined = combined - threshold
+            combined = combined[combined > 0]
+        self.counts = combined
+
+class StatisticsState:
+    '''
+    Estado combinável das estatísticas superficiais de um dataset: para cada coluna (exceto `Class`),
+    um `MomentsAccumulator`, um `QuantileSketch` e um `FrequentItemsSketch`.
+
+    O estado pode ser atualizado com novos blocos de linhas, combinado com o estado de outra parte do
+    dataset e salvo em disco com `to_arrays`, de forma que as estatísticas de um dataset que cresce
+    são atualizadas processando apenas as linhas novas.
+
+    ### Parâmetros:
+    - `columns` (list, obrigatório): Os nomes das colunas acumuladas.
+    '''
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        self.moments = MomentsAccumulator(self.columns)
+        self.sketches = [QuantileSketch() for _ in self.columns]
+        self.frequent_items = [FrequentItemsSketch() for _ in self.columns]
+
+    @classmethod
+    def from_chunks(cls, chunks) -> 'StatisticsState':
+        '''
+        Cria um estado a partir de um iterador de DataFrames.
+
+        ### Parâmetros:
+        - `chunks`: Iterador de DataFrames com as mesmas colunas.
+
+        ### Retorno:
+        - `StatisticsState` com todos os blocos acumulados, ou `None` se o iterador estiver vazio.
+        '''
+        state = None
+        for chunk in chunks:
+            if state is None:
+                state = cls(chunk.columns.drop('Class'))
+            state.update(chunk)
+        return state
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        '''
+        Acumula um bloco de linhas do dataset.
+        '''
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        self.moments.update(values)
+        for column_index in range(len(self.columns)):
+            self.sketches[column_index].update(values[:, column_index])
+            self.frequent_items[column_index].update(values[:, column_index])
+
+    def merge(self, other: 'StatisticsState') -> None:
+        '''
+        Combina o estado de outra parte do dataset, com as mesmas colunas, neste estado.
+        '''
+        self.moments.merge(other.moments)
+        for column_index in range(len(self.columns)):
+            self.sketches[column_index].merge(other.sketches[column_index])
+            self.frequent_items[column_index].merge(other.frequent_items[column_index])
+
+    def to_arrays(self) -> dict:
+        '''
+        Retorna o estado como um dicionário de arrays, para ser salvo com `np.savez`.
+        '''
+        arrays = {'columns': np.array(self.columns, dtype=str)}
+        arrays.update(self.moments.to_arrays('moments'))
+        for column_index in range(len(self.columns)):
+            arrays.update(self.sketches[column_index].to_arrays(f'quantiles_{column_index}'))
+            arrays.update(self.frequent_items[column_index].to_arrays(f'frequent_{column_index}'))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> 'StatisticsState':
+        '''
+        Recria um estado a partir do dicionário de arrays gerado por `to_arrays`.
+        '''
+        state = cls(arrays['columns'].tolist())
+        state.moments = MomentsAccumulator.from_arrays(arrays, 'moments', state.columns)
+        state.sketches = [QuantileSketch.from_arrays(arrays, f'quantiles_{column_index}')
+                          for column_index in range(len(state.columns))]
+        state.frequent_items = [FrequentItemsSketch.from_arrays(arrays, f'frequent_{column_index}')
+                                for column_index in range(len(state.columns))]
+        return state
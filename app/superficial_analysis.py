@@ -1,74 +1,445 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import mode
-import sys
-import os
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+from app.streaming_statistics import MomentsAccumulator, StatisticsState
+from app.correlation_engine import compute_correlations, PearsonAccumulator
+from app.sampling import draw_sample, finite_population_correction, SAMPLE_CONFIDENCE
+from scipy.stats import norm, t as student_t, chi2
+
+FISHER_VARIANCES = {
+    'pearson': (1.0, 3),
+    'kendall': (0.437, 4),
+    'spearman': (1.06, 3),
+}
 
 def generate_statistics(df: pd.DataFrame) -> pd.DataFrame:
     '''
     Gera estatísticas superficiais sobre o dataset.
 
+    Todas as colunas (exceto `Class`) são processadas juntas, como uma única matriz: cada coluna é
+    ordenada uma única vez, e a mesma ordenação fornece a mediana, os quartis do IQR e a moda; média,
+    desvio padrão, assimetria e curtose são calculados em uma única passada com `MomentsAccumulator`.
+
     ### Parâmetros:
     - `df`: DataFrame com os dados.
     
     ### Retorno:
         - `DataFrame` com as estatísticas.
     '''
-    results = {}
+    columns = df.columns.drop('Class')
+    values = df[columns].to_numpy(dtype=np.float64)
+
+    moments = MomentsAccumulator(columns)
+    moments.update(values)
+    has_missing = moments.missing > 0
 
-    columns = df.columns.copy()
-    columns = columns.drop('Class')
-
-    for column in columns:
-        column_data = df[column]
-        column_mean = column_data.mean()
-        column_median = column_data.median()
-        column_mode = mode(column_data, keepdims=True)[0][0]
-        num_missing = column_data.isnull().sum()
-        percent_missing = (num_missing / len(df)) * 100
-        num_zeros = (column_data == 0).sum()
-        max_value = column_data.max()
-        min_value = column_data.min()
-        std_dev = column_data.std()
-        range_value = np.ptp(column_data)
-        iqr = np.percentile(column_data, 75) - np.percentile(column_data, 25)
-        skewness = column_data.skew()
-        kurtosis = column_data.kurtosis()
+    sorted_values = np.sort(np.ascontiguousarray(values.T), axis=1)
+    q1, median, q3 = sorted_quantiles(sorted_values, moments.count, [0.25, 0.5, 0.75])
+    column_mode = np.where(has_missing, np.nan, sorted_mode(sorted_values))
 
+    results = {}
+    std_dev, skewness, kurtosis = moments.std(), moments.skew(), moments.kurtosis()
+
+    for column_index, column in enumerate(columns):
         results[column] = {
-            'Média': column_mean,
-            'Mediana': column_median,
-            'Moda': column_mode,
-            'Campos vazios': num_missing,
-            'Campos vazios (%)': percent_missing,
-            'Campos com valor zero': num_zeros,
-            'Valor máximo': max_value,
-            'Valor mínimo': min_value,
-            'Desvio padrão': std_dev,
-            'Intervalo de valores': range_value,
-            'IQR': iqr,
-            'Assimetria': skewness,
-            'Curtose': kurtosis
+            'Média': moments.mean[column_index] if moments.count[column_index] else np.nan,
+            'Mediana': median[column_index],
+            'Moda': column_mode[column_index],
+            'Campos vazios': moments.missing[column_index],
+            'Campos vazios (%)': (moments.missing[column_index] / len(df)) * 100,
+            'Campos com valor zero': moments.zeros[column_index],
+            'Valor máximo': moments.max[column_index],
+            'Valor mínimo': moments.min[column_index],
+            'Desvio padrão': std_dev[column_index],
+            'Intervalo de valores': np.nan if has_missing[column_index] else moments.max[column_index] - moments.min[column_index],
+            'IQR': np.nan if has_missing[column_index] else q3[column_index] - q1[column_index],
+            'Assimetria': skewness[column_index],
+            'Curtose': kurtosis[column_index]
         }
 
     results_df = pd.DataFrame.from_dict(results, orient='index')
     
     return results_df.transpose()
 
+def sorted_quantiles(sorted_values: np.ndarray, count: np.ndarray, q: list) -> np.ndarray:
+    '''
+    Calcula quantis de cada coluna a partir dos seus valores já ordenados, com interpolação linear
+    (como `np.percentile`) e ignorando valores vazios, que a ordenação deixa no fim de cada coluna.
+
+    ### Parâmetros:
+    - `sorted_values`: Matriz `(colunas, linhas)` com os valores de cada coluna ordenados em uma linha.
+    - `count`: O número de valores não vazios de cada coluna.
+    - `q`: Os quantis desejados, entre 0 e 1.
+
+    ### Retorno:
+        - `np.ndarray` de formato `(len(q), colunas)`, com `NaN` nas colunas sem valores.
+    '''
+    if sorted_values.shape[1] == 0:
+        return np.full((len(q), sorted_values.shape[0]), np.nan)
+
+    last = np.maximum(count - 1, 0)
+    positions = np.asarray(q)[:, None] * last
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, last.astype(np.int64))
+    lower_values = np.take_along_axis(sorted_values, lower.T, axis=1).T
+    upper_values = np.take_along_axis(sorted_values, upper.T, axis=1).T
+    quantiles = lower_values + (upper_values - lower_values) * (positions - lower)
+
+    return np.where(count > 0, quantiles, np.nan)
+
+def sorted_mode(sorted_values: np.ndarray) -> np.ndarray:
+    '''
+    Calcula a moda de cada coluna a partir dos seus valores já ordenados. Em caso de empate, retorna o menor
+    valor, como `scipy.stats.mode`.
+
+    ### Parâmetros:
+    - `sorted_values`: Matriz `(colunas, linhas)` com os valores de cada coluna ordenados em uma linha.
+
+    ### Retorno:
+        - `np.ndarray` com a moda de cada coluna (`NaN` se não houver linhas).
+    '''
+    size, rows = sorted_values.shape
+    if rows == 0:
+        return np.full(size, np.nan)
+
+    flat = np.ascontiguousarray(sorted_values).ravel()
+    starts_run = np.empty(flat.shape, dtype=bool)
+    starts_run[0] = True
+    np.not_equal(flat[1:], flat[:-1], out=starts_run[1:])
+    starts_run[::rows] = True
+    starts = np.flatnonzero(starts_run)
+    lengths = np.diff(starts, append=flat.size)
+
+    column_starts = np.searchsorted(starts, np.arange(size) * rows)
+    longest = np.maximum.reduceat(lengths, column_starts)
+    run_columns = np.repeat(np.arange(size), np.diff(column_starts, append=len(starts)))
+    candidates = np.flatnonzero(lengths == longest[run_columns])
+    first = candidates[np.searchsorted(run_columns[candidates], np.arange(size))]
+
+    return flat[starts[first]]
+
 def generate_correlation_matrix(df: pd.DataFrame,
                                 correlation_pearson: bool = False,
                                 correlation_kendall: bool = False,
-                                correlation_spearman: bool = False) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-
-    if correlation_pearson:
-        print('Calculando correlação de Pearson...')
-        correlation_pearson_matrix = df.corr(method='pearson')
-    if correlation_kendall:
-        print('Calculando correlação de Kendall...')
-        correlation_kendall_matrix = df.corr(method='kendall')
-    if correlation_spearman:
-        print('Calculando correlação de Spearman...')
-        correlation_spearman_matrix = df.corr(method='spearman')
-
-    return (correlation_pearson_matrix, correlation_kendall_matrix, correlation_spearman_matrix)
\ No newline at end of file
+                                correlation_spearman: bool = False,
+                                n_jobs: int = None) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    '''
+    Calcula as correlações pedidas entre os atributos do dataset, com os mesmos resultados de `df.corr`.
+
+    As correlações são calculadas por `compute_correlations`: Pearson e Spearman com produtos de matrizes
+    (Spearman ranqueia as colunas uma única vez) e Kendall com os pares de colunas distribuídos entre processos.
+
+    ### Parâmetros:
+    - `df`: DataFrame com os dados.
+    - `correlation_pearson`: Se a correlação de Pearson deve ser calculada.
+    - `correlation_kendall`: Se a correlação de Kendall deve ser calculada.
+    - `correlation_spearman`: Se a correlação de Spearman deve ser calculada.
+    - `n_jobs`: O número de processos usados na correlação de Kendall. O padrão é `CORRELATION_JOBS`.
+
+    ### Retorno:
+        - Tupla com as matrizes de Pearson, Kendall e Spearman (`None` para as que não foram pedidas).
+    '''
+    requested = {
+        'pearson': correlation_pearson,
+        'kendall': correlation_kendall,
+        'spearman': correlation_spearman,
+    }
+    methods = [method for method, selected in requested.items() if selected]
+    print(f'Calculando correlações: {", ".join(methods)}...')
+    correlations = compute_correlations(df, methods, n_jobs=n_jobs)
+
+    return tuple(correlations.get(method) for method in requested)
+
+def generate_statistics_chunked(read_chunks) -> pd.DataFrame:
+    '''
+    Gera as mesmas estatísticas de `generate_statistics` percorrendo o dataset em blocos, com memória limitada
+    independentemente do número de linhas.
+
+    Média, desvio padrão, assimetria, curtose, contagens, mínimo e máximo são exatos. Mediana e IQR são
+    estimados por um `QuantileSketch` e a moda por um `FrequentItemsSketch`; ambos são exatos enquanto
+    o dataset couber na capacidade dos sketches.
+
+    ### Parâmetros:
+    - `read_chunks`: Função sem argumentos que retorna um iterador de DataFrames (por exemplo, `iter_csv_chunks`).
+
+    ### Retorno:
+        - `DataFrame` com as estatísticas.
+    '''
+    return generate_statistics_from_state(StatisticsState.from_chunks(read_chunks()))
+
+def generate_statistics_from_state(state: StatisticsState) -> pd.DataFrame:
+    '''
+    Gera as estatísticas de `generate_statistics` a partir de um `StatisticsState`, sem ler o dataset.
+    O custo depende apenas do número de colunas e do tamanho dos sketches.
+
+    ### Parâmetros:
+    - `state`: O estado acumulado do dataset.
+
+    ### Retorno:
+        - `DataFrame` com as estatísticas.
+    '''
+    moments = state.moments
+    results = {}
+    std_dev, skewness, kurtosis = moments.std(), moments.skew(), moments.kurtosis()
+
+    for column_index, column in enumerate(state.columns):
+        q1, median, q3 = state.sketches[column_index].quantile([0.25, 0.5, 0.75])
+        has_missing = moments.missing[column_index] > 0
+
+        results[column] = {
+            'Média': moments.mean[column_index] if moments.count[column_index] else np.nan,
+            'Mediana': median,
+            'Moda': np.nan if has_missing else state.frequent_items[column_index].most_frequent(),
+            'Campos vazios': moments.missing[column_index],
+            'Campos vazios (%)': (moments.missing[column_index] / moments.rows) * 100,
+            'Campos com valor zero': moments.zeros[column_index],
+            'Valor máximo': moments.max[column_index],
+            'Valor mínimo': moments.min[column_index],
+            'Desvio padrão': std_dev[column_index],
+            'Intervalo de valores': np.nan if has_missing else moments.max[column_index] - moments.min[column_index],
+            'IQR': np.nan if has_missing else q3 - q1,
+            'Assimetria': skewness[column_index],
+            'Curtose': kurtosis[column_index]
+        }
+
+    results_df = pd.DataFrame.from_dict(results, orient='index')
+
+    return results_df.transpose()
+
+def generate_pearson_correlation_chunked(read_chunks) -> pd.DataFrame:
+    '''
+    Calcula a correlação de Pearson entre as colunas numéricas percorrendo o dataset em blocos.
+
+    Assim como `df.corr(method='pearson')`, cada par de colunas usa apenas as linhas em que as duas
+    colunas têm valor (veja `PearsonAccumulator`).
+
+    ### Parâmetros:
+    - `read_chunks`: Função sem argumentos que retorna um iterador de DataFrames (por exemplo, `iter_csv_chunks`).
+
+    ### Retorno:
+        - `DataFrame` com a matriz de correlação.
+    '''
+    columns = None
+
+    for chunk in read_chunks():
+        if columns is None:
+            columns = chunk.select_dtypes(include='number').columns
+            accumulator = PearsonAccumulator(len(columns))
+        accumulator.update(chunk[columns].to_numpy(dtype=np.float64))
+
+    return pd.DataFrame(accumulator.correlation(), index=columns, columns=columns)
+
+def generate_statistics_sampled(df: pd.DataFrame,
+                                sample_size: int = None,
+                                time_budget: float = None,
+                                confidence: float = SAMPLE_CONFIDENCE) -> tuple[pd.DataFrame, dict]:
+    '''
+    Estima as estatísticas de `generate_statistics` a partir de uma amostra estratificada por `Class`,
+    com intervalos de confiança.
+
+    As contagens (`Campos vazios` e `Campos com valor zero`) são extrapoladas para o número de linhas do
+    dataset. Os intervalos são: t de Student para a média, qui-quadrado para o desvio padrão, Wilson para
+    as proporções, estatísticas de ordem (sem supor distribuição) para a mediana e o IQR, e os erros padrão
+    assintóticos para assimetria e curtose. Os erros padrão usam a correção para população finita.
+    Moda, mínimo, máximo e intervalo de valores não têm intervalo de confiança.
+
+    ### Parâmetros:
+    - `df`: DataFrame com os dados.
+    - `sample_size`: O número máximo de linhas da amostra.
+    - `time_budget`: O tempo disponível para o cálculo, em segundos (veja `choose_sample_size`).
+    - `confidence`: O nível de confiança dos intervalos. O padrão é `SAMPLE_CONFIDENCE`.
+
+    ### Retorno:
+        - Tupla com o `DataFrame` das estimativas, acrescido das linhas `<estatística> (IC inferior)` e
+          `<estatística> (IC superior)`, e um dicionário com o tamanho da amostra e do dataset.
+    '''
+    sample, info = draw_sample(df, generate_statistics, sample_size, time_budget)
+    print(f'Estimando estatísticas com uma amostra de {info["rows"]} de {info["population_rows"]} linhas...')
+
+    statistics = generate_statistics(sample)
+    rows, population_rows = info['rows'], info['population_rows']
+    fpc = finite_population_correction(rows, population_rows)
+    z = norm.ppf(0.5 + confidence / 2)
+
+    values = sample[statistics.columns].to_numpy(dtype=np.float64)
+    count = (~np.isnan(values)).sum(axis=0)
+    dof = np.maximum(count - 1, 1)
+    has_missing = count < rows
+
+    missing = statistics.loc['Campos vazios'].to_numpy(dtype=np.float64) / max(rows, 1)
+    zeros = statistics.loc['Campos com valor zero'].to_numpy(dtype=np.float64) / max(rows, 1)
+    statistics.loc['Campos vazios'] = missing * population_rows
+    statistics.loc['Campos com valor zero'] = zeros * population_rows
+
+    mean = statistics.loc['Média'].to_numpy(dtype=np.float64)
+    std_dev = statistics.loc['Desvio padrão'].to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_error = student_t.ppf(0.5 + confidence / 2, dof) * std_dev / np.sqrt(count) * fpc
+        std_lower = std_dev * np.sqrt(dof / chi2.ppf(0.5 + confidence / 2, dof))
+        std_upper = std_dev * np.sqrt(dof / chi2.ppf(0.5 - confidence / 2, dof))
+        skew_error = np.sqrt(6 * count * (count - 1) / ((count - 2) * (count + 1) * (count + 3)))
+        kurtosis_error = 2 * skew_error * np.sqrt((count ** 2 - 1) / ((count - 3) * (count + 5)))
+
+    sorted_values = np.sort(np.ascontiguousarray(values.T), axis=1)
+    (q1_lower, median_lower, q3_lower), (q1_upper, median_upper, q3_upper) = quantile_intervals(
+        sorted_values, count, [0.25, 0.5, 0.75], z)
+
+    missing_lower, missing_upper = wilson_interval(missing, rows, z, fpc)
+    zeros_lower, zeros_upper = wilson_interval(zeros, rows, z, fpc)
+    skewness = statistics.loc['Assimetria'].to_numpy(dtype=np.float64)
+    kurtosis = statistics.loc['Curtose'].to_numpy(dtype=np.float64)
+
+    intervals = {
+        'Média': (mean - mean_error, mean + mean_error),
+        'Mediana': (median_lower, median_upper),
+        'Campos vazios': (missing_lower * population_rows, missing_upper * population_rows),
+        'Campos vazios (%)': (missing_lower * 100, missing_upper * 100),
+        'Campos com valor zero': (zeros_lower * population_rows, zeros_upper * population_rows),
+        'Desvio padrão': (std_lower, std_upper),
+        'IQR': (np.where(has_missing, np.nan, np.maximum(q3_lower - q1_upper, 0)),
+                np.where(has_missing, np.nan, q3_upper - q1_lower)),
+        'Assimetria': (skewness - z * skew_error * fpc, skewness + z * skew_error * fpc),
+        'Curtose': (kurtosis - z * kurtosis_error * fpc, kurtosis + z * kurtosis_error * fpc),
+    }
+    for name, (lower, upper) in intervals.items():
+        statistics.loc[f'{name} (IC inferior)'] = lower
+        statistics.loc[f'{name} (IC superior)'] = upper
+
+    info['confidence'] = confidence
+    return statistics, info
+
+def quantile_intervals(sorted_values: np.ndarray, count: np.ndarray, q: list, z: float) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Calcula intervalos de confiança para quantis a partir de estatísticas de ordem, sem supor uma distribuição:
+    os limites são os valores ordenados nas posições `n * q ± z * sqrt(n * q * (1 - q))`.
+
+    ### Parâmetros:
+    - `sorted_values`: Matriz `(colunas, linhas)` com os valores de cada coluna ordenados em uma linha.
+    - `count`: O número de valores não vazios de cada coluna.
+    - `q`: Os quantis desejados, entre 0 e 1.
+    - `z`: O quantil da normal padrão correspondente ao nível de confiança.
+
+    ### Retorno:
+        - Tupla com os limites inferiores e superiores, cada um no formato `(len(q), colunas)`.
+    '''
+    if sorted_values.shape[1] == 0:
+        empty = np.full((len(q), sorted_values.shape[0]), np.nan)
+        return empty, empty
+
+    q = np.asarray(q)[:, None]
+    last = np.maximum(count - 1, 0)
+    spread = z * np.sqrt(count * q * (1 - q))
+    lower = np.clip(np.floor(count * q - spread), 0, last).astype(np.int64)
+    upper = np.clip(np.ceil(count * q + spread), 0, last).astype(np.int64)
+
+    lower_values = np.take_along_axis(sorted_values, lower.T, axis=1).T
+    upper_values = np.take_along_axis(sorted_values, upper.T, axis=1).T
+    return np.where(count > 0, lower_values, np.nan), np.where(count > 0, upper_values, np.nan)
+
+def wilson_interval(proportion: np.ndarray, rows: int, z: float, fpc: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Calcula o intervalo de Wilson para proporções estimadas em `rows` linhas, que continua válido para
+    proporções próximas de 0 (como a de valores vazios). A correção para população finita `fpc` é
+    aplicada pelo tamanho efetivo da amostra, `rows / fpc²`.
+    '''
+    if rows == 0:
+        return np.full_like(proportion, np.nan), np.full_like(proportion, np.nan)
+    if fpc == 0:
+        return proportion, proportion
+
+    rows = rows / fpc ** 2
+    divisor = 1 + z ** 2 / rows
+    center = (proportion + z ** 2 / (2 * rows)) / divisor
+    margin = z / divisor * np.sqrt(proportion * (1 - proportion) / rows + z ** 2 / (4 * rows ** 2))
+    return np.clip(center - margin, 0, 1), np.clip(center + margin, 0, 1)
+
+def generate_correlation_matrix_sampled(df: pd.DataFrame,
+                                        correlation_pearson: bool = False,
+                                        correlation_kendall: bool = False,
+                                        correlation_spearman: bool = False,
+                                        sample_size: int = None,
+                                        time_budget: float = None,
+                                        confidence: float = SAMPLE_CONFIDENCE,
+                                        n_jobs: int = None) -> tuple[tuple, tuple, dict]:
+    '''
+    Estima as correlações de `generate_correlation_matrix` a partir de uma amostra estratificada por `Class`,
+    com intervalos de confiança pela transformação z de Fisher.
+
+    O erro padrão de `atanh(r)` é `sqrt(c / (n - k))`, onde `n` é o número de linhas da amostra em que as duas
+    colunas têm valor e `(c, k)` vêm de `FISHER_VARIANCES`: `(1, 3)` para Pearson, `(1.06, 3)` para Spearman
+    e `(0.437, 4)` para Kendall (Fieller, Hartley e Pearson, 1957).
+
+    ### Parâmetros:
+    - `df`: DataFrame com os dados.
+    - `correlation_pearson`: Se a correlação de Pearson deve ser calculada.
+    - `correlation_kendall`: Se a correlação de Kendall deve ser calculada.
+    - `correlation_spearman`: Se a correlação de Spearman deve ser calculada.
+    - `sample_size`: O número máximo de linhas da amostra.
+    - `time_budget`: O tempo disponível para o cálculo, em segundos (veja `choose_sample_size`).
+    - `confidence`: O nível de confiança dos intervalos. O padrão é `SAMPLE_CONFIDENCE`.
+    - `n_jobs`: O número de processos usados na correlação de Kendall. O padrão é `CORRELATION_JOBS`.
+
+    ### Retorno:
+        - Tupla com as matrizes estimadas de Pearson, Kendall e Spearman, as tabelas com os intervalos de cada
+          par de atributos (`None` para os métodos que não foram pedidos) e um dicionário com o tamanho da
+          amostra e do dataset.
+    '''
+    requested = {
+        'pearson': correlation_pearson,
+        'kendall': correlation_kendall,
+        'spearman': correlation_spearman,
+    }
+    methods = [method for method, selected in requested.items() if selected]
+
+    sample, info = draw_sample(df, lambda sample: compute_correlations(sample, methods, n_jobs=n_jobs),
+                               sample_size, time_budget)
+    print(f'Estimando correlações ({", ".join(methods)}) com uma amostra de {info["rows"]} de {info["population_rows"]} linhas...')
+    correlations = compute_correlations(sample, methods, n_jobs=n_jobs)
+
+    valid = (~sample.isna()).to_numpy(dtype=np.float64)
+    pair_rows = valid.T @ valid
+    fpc = finite_population_correction(info['rows'], info['population_rows'])
+    intervals = {method: correlation_intervals(correlations[method], pair_rows, method, confidence, fpc)
+                 for method in methods}
+
+    info['confidence'] = confidence
+    return (tuple(correlations.get(method) for method in requested),
+            tuple(intervals.get(method) for method in requested),
+            info)
+
+def correlation_intervals(correlation: pd.DataFrame,
+                          pair_rows: np.ndarray,
+                          method: str,
+                          confidence: float = SAMPLE_CONFIDENCE,
+                          fpc: float = 1.0) -> pd.DataFrame:
+    '''
+    Calcula os intervalos de confiança de uma matriz de correlação pela transformação z de Fisher.
+
+    ### Parâmetros:
+    - `correlation`: A matriz de correlação estimada.
+    - `pair_rows`: Matriz com o número de linhas usadas em cada par de colunas.
+    - `method`: O método de correlação (`pearson`, `kendall` ou `spearman`).
+    - `confidence`: O nível de confiança dos intervalos. O padrão é `SAMPLE_CONFIDENCE`.
+    - `fpc`: O fator de correção para população finita. O padrão é `1.0`.
+
+    ### Retorno:
+        - `DataFrame` com uma linha por par de atributos e as colunas `Atributo 1`, `Atributo 2`, `Estimativa`,
+          `IC inferior`, `IC superior` e `Linhas`.
+    '''
+    factor, offset = FISHER_VARIANCES[method]
+    first, second = np.triu_indices(len(correlation.columns), k=1)
+    estimate = correlation.to_numpy(dtype=np.float64)[first, second]
+    rows = pair_rows[first, second]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fisher = np.arctanh(np.clip(estimate, -1 + 1e-12, 1 - 1e-12))
+        margin = norm.ppf(0.5 + confidence / 2) * np.sqrt(factor / (rows - offset)) * fpc
+        margin = np.where(rows > offset, margin, np.inf)
+
+    return pd.DataFrame({
+        'Atributo 1': correlation.columns[first],
+        'Atributo 2': correlation.columns[second],
+        'Estimativa': estimate,
+        'IC inferior': np.tanh(fisher - margin),
+        'IC superior': np.tanh(fisher + margin),
+        'Linhas': rows.astype(np.int64),
+    })
@@ -0,0 +1,186 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+import resource
+import queue
+import numpy as np
+import pandas as pd
+from app.column_shards import SharedArray
+from app.training_scheduler import TRAINING_WORKERS
+
+TRAINING_PROCESSES = TRAINING_WORKERS
+TRAINING_MEMORY_LIMIT = None
+TRAINING_START_METHOD = 'spawn'
+
+class SharedDataset:
+    '''
+    Dataset de treinamento em memória compartilhada, lido pelos processos de treinamento sem ser copiado para cada um.
+
+    Os atributos (convertidos para um único tipo numérico), a classe e, se houver, os pesos de um balanceamento
+    virtual são copiados uma única vez para a memória compartilhada. Cada treinamento que usa o dataset o reserva
+    com `acquire` e o libera com `release`; a memória é liberada quando o último treinamento termina.
+
+    ### Parâmetros:
+    - `df` (DataFrame, obrigatório): O dataset, com a coluna `Class` numérica.
+    - `sample_weight` (np.ndarray, opcional): O peso de cada linha. O padrão é `None`.
+
+    ### Gera uma exceção:
+    - `ValueError`: Se algum atributo ou a classe não forem numéricos.
+    '''
+    def __init__(self, df: pd.DataFrame, sample_weight: np.ndarray = None):
+        X = df.drop(columns='Class')
+        self.columns = X.columns.tolist()
+        arrays = {'X': X.to_numpy(), 'y': df['Class'].to_numpy()}
+        if sample_weight is not None:
+            arrays['sample_weight'] = np.asarray(sample_weight)
+        if any(values.dtype.kind not in 'biuf' for values in arrays.values()):
+            raise ValueError('O dataset compartilhado só pode ter atributos e classe numéricos')
+
+        self.arrays = {}
+        try:
+            for name, values in arrays.items():
+                self.arrays[name] = SharedArray(values.shape, values.dtype)
+                np.copyto(self.arrays[name].array, values)
+        except Exception:
+            self.close()
+            raise
+        self._references = 0
+        self._lock = threading.Lock()
+
+    def describe(self) -> dict:
+        '''
+        Retorna a descrição usada pelos processos de treinamento para se conectarem ao dataset (veja `attach`).
+        '''
+        return {'columns': self.columns, 'arrays': {name: shared.describe() for name, shared in self.arrays.items()}}
+
+    @staticmethod
+    def attach(description: dict) -> tuple:
+        '''
+        Conecta-se a um dataset criado em outro processo.
+
+        ### Retorna:
+        - `tuple`: Os arrays compartilhados (que devem ser fechados depois do uso), os atributos (DataFrame), a classe
+                   (Series) e os pesos (ou `None`). Os DataFrames usam a memória compartilhada sem copiá-la.
+        '''
+        shared = {name: SharedArray.attach(array_description) for name, array_description in description['arrays'].items()}
+        X = pd.DataFrame(shared['X'].array, columns=description['columns'], copy=False)
+        y = pd.Series(shared['y'].array, name='Class', copy=False)
+        sample_weight = shared['sample_weight'].array if 'sample_weight' in shared else None
+        return list(shared.values()), X, y, sample_weight
+
+    def acquire(self) -> 'SharedDataset':
+        '''
+        Reserva o dataset para um treinamento.
+        '''
+        with self._lock:
+            self._references += 1
+        return self
+
+    def release(self) -> None:
+        '''
+        Libera a reserva de um treinamento e, se era a última, a memória compartilhada.
+        '''
+        with self._lock:
+            self._references -= 1
+            if self._references > 0:
+                return
+        self.close()
+
+    def close(self) -> None:
+        '''
+        Libera a memória compartilhada.
+        '''
+        for shared in self.arrays.values():
+            if shared.array is not None:
+                shared.close()
+
+def run_with_memory_limit(memory_limit: int, function, args: tuple, kwargs: dict):
+    '''
+    Executa `function` em um processo de treinamento com o espaço de endereçamento limitado a `memory_limit` bytes
+    (`RLIMIT_AS`), restaurando o limite anterior ao terminar. Uma alocação acima do limite gera um `MemoryError`.
+    '''
+    if memory_limit is None:
+        return function(*args, **kwargs)
+
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    if hard_limit != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard_limit))
+    try:
+        return function(*args, **kwargs)
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft_limit, hard_limit))
+
+class TrainingProcessPool:
+    '''
+    Processos de treinamento, que executam os modelos fora do processo da API: o GIL da API fica livre durante o
+    treinamento, e a falha de um modelo não derruba o servidor.
+
+    Cada processo tem o seu próprio executor, usado por um treinamento de cada vez. Quando um processo é encerrado
+    inesperadamente (por exemplo, por falta de memória ou por uma falha em uma biblioteca nativa), apenas o
+    treinamento que estava nele falha, e o processo é substituído por um novo. Os processos são criados com `spawn`,
+    já que a API tem várias threads, e só na primeira vez em que são usados.
+
+    ### Parâmetros:
+    - `processes` (int, opcional): O número de processos. O padrão é `TRAINING_PROCESSES`.
+    - `memory_limit` (int, opcional): O limite de memória (espaço de endereçamento do processo), em bytes, de cada
+                                      treinamento. O padrão é `TRAINING_MEMORY_LIMIT` (sem limite).
+    '''
+    def __init__(self, processes: int = TRAINING_PROCESSES, memory_limit: int = TRAINING_MEMORY_LIMIT):
+        self.processes = processes
+        self.memory_limit = memory_limit
+        self.restarts = 0
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def run(self, function, *args, **kwargs):
+        '''
+        Executa `function` em um dos processos e retorna o seu resultado, esperando um processo livre se necessário.
+        `function` e os seus argumentos devem poder ser serializados com `pickle`.
+
+        ### Gera uma exceção:
+        - `RuntimeError`: Se o processo for encerrado durante a execução.
+        - As exceções geradas por `function`, inclusive `MemoryError` se o limite de memória for excedido.
+        '''
+        executor = self._checkout()
+        try:
+            return executor.submit(run_with_memory_limit, self.memory_limit, function, args, kwargs).result()
+        except BrokenProcessPool as e:
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor = self._create_executor()
+            with self._lock:
+                self.restarts += 1
+            raise RuntimeError('O processo de treinamento foi encerrado inesperadamente e foi reiniciado') from e
+        finally:
+            self._idle.put(executor)
+
+    def shutdown(self) -> None:
+        '''
+        Encerra os processos livres.
+        '''
+        while True:
+            try:
+                executor = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            executor.shutdown(wait=True)
+            with self._lock:
+                self._created -= 1
+
+    def _checkout(self) -> ProcessPoolExecutor:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.processes
+            if create:
+                self._created += 1
+        return self._create_executor() if create else self._idle.get()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(TRAINING_START_METHOD))
+
+training_process_pool = TrainingProcessPool()
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from threadpoolctl import threadpool_limits
+import datetime
+import itertools
+import threading
+import heapq
+import time
+import os
+
+TRAINING_CPU_SLOTS = os.cpu_count() or 1
+TRAINING_WORKERS = min(TRAINING_CPU_SLOTS, 4)
+TRAINING_PRIORITY = 10
+TRAINING_STATUS_HISTORY = 1000
+
+class TrainingScheduler:
+    '''
+    Fila de treinamentos executados em segundo plano por um número limitado de threads.
+
+    Os treinamentos são executados em ordem de prioridade (o menor valor primeiro) e, com a mesma prioridade,
+    em ordem de chegada. Cada treinamento reserva `cpu_slots` das `cpu_slots` CPUs do escalonador e recebe esse
+    número como o argumento `n_jobs`, que limita as threads do modelo (XGBoost, LightGBM e Random Forest criam os
+    seus próprios pools); as bibliotecas nativas (BLAS e OpenMP) também ficam limitadas a `cpu_slots` threads
+    durante o treinamento, com `threadpool_limits`. Um treinamento só começa quando há CPUs livres para ele e, para que os treinamentos
+    grandes não esperem indefinidamente, os seguintes na fila esperam por ele.
+
+    ### Parâmetros:
+    - `workers` (int, opcional): O número máximo de treinamentos simultâneos. O padrão é `TRAINING_WORKERS`.
+    - `cpu_slots` (int, opcional): O número de CPUs distribuídas entre os treinamentos. O padrão é `TRAINING_CPU_SLOTS`.
+    '''
+    def __init__(self, workers: int = TRAINING_WORKERS, cpu_slots: int = TRAINING_CPU_SLOTS):
+        self.workers = workers
+        self.cpu_slots = cpu_slots
+        self.free_slots = cpu_slots
+        self._jobs = []
+        self._sequence = itertools.count()
+        self._statuses = OrderedDict()
+        self._threads = []
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    def submit(self, job_id: str, function, *args, priority: int = TRAINING_PRIORITY, cpu_slots: int = 1, **kwargs) -> str:
+        '''
+        Enfileira um treinamento. Os argumentos, e `n_jobs` com o número de CPUs reservadas, são repassados para `function`.
+
+        ### Parâmetros:
+        - `job_id` (str, obrigatório): O identificador do treinamento, por exemplo `{dataset_id}_{model_name}`.
+        - `function` (callable, obrigatório): A função que executa o treinamento.
+        - `priority` (int, opcional): A prioridade; valores menores são executados antes. O padrão é `TRAINING_PRIORITY`.
+        - `cpu_slots` (int, opcional): O número de CPUs reservadas, limitado a `cpu_slots` do escalonador. O padrão é `1`.
+
+        ### Retorna:
+        - `str`: O identificador do treinamento.
+        '''
+        cpu_slots = max(1, min(cpu_slots, self.cpu_slots))
+        self._start_workers()
+        with self._condition:
+            self._statuses.pop(job_id, None)
+            self._statuses[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'priority': priority,
+                'cpu_slots': cpu_slots,
+                'queued_time': datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self._prune_statuses()
+            heapq.heappush(self._jobs, (priority, next(self._sequence), job_id, function, args, kwargs, cpu_slots))
+            self._condition.notify_all()
+        return job_id
+
+    def status(self, prefix: str = '') -> list:
+        '''
+        Retorna o estado dos treinamentos cujo identificador começa com `prefix`.
+
+        ### Parâmetros:
+        - `prefix` (str, opcional): O prefixo dos identificadores. O padrão é `''` (todos os treinamentos).
+
+        ### Retorna:
+        - `list`: Uma lista de dicionários com o identificador, o estado (`queued`, `running`, `finished` ou `failed`),
+                  a prioridade, as CPUs reservadas e, em caso de falha, o erro.
+        '''
+        with self._condition:
+            return [dict(status) for job_id, status in self._statuses.items() if job_id.startswith(prefix)]
+
+    def pending(self) -> int:
+        '''
+        Retorna o número de treinamentos na fila ou em execução.
+        '''
+        with self._condition:
+            return sum(status['status'] in ['queued', 'running'] for status in self._statuses.values())
+
+    def join(self, timeout: float = None) -> bool:
+        '''
+        Espera até que todos os treinamentos enfileirados terminem.
+
+        ### Parâmetros:
+        - `timeout` (float, opcional): O tempo máximo de espera, em segundos. O padrão é `None` (sem limite).
+
+        ### Retorna:
+        - `bool`: `True` se todos os treinamentos terminaram, `False` se o tempo acabou antes.
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._jobs or self.free_slots < self.cpu_slots:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = None) -> bool:
+        '''
+        Espera os treinamentos pendentes e encerra as threads.
+
+        ### Parâmetros:
+        - `timeout` (float, opcional): O tempo máximo de espera, em segundos. O padrão é `None` (sem limite).
+
+        ### Retorna:
+        - `bool`: `True` se todos os treinamentos terminaram antes do encerramento.
+        '''
+        finished = self.join(timeout)
+        with self._condition:
+            threads, self._threads = self._threads, []
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+        with self._condition:
+            self._stopping = False
+        return finished
+
+    def _start_workers(self) -> None:
+        with self._condition:
+            if self._threads:
+                return
+            for worker_index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'training-scheduler-{worker_index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopping and not (self._jobs and self._jobs[0][-1] <= self.free_slots):
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                _, _, job_id, function, args, kwargs, cpu_slots = heapq.heappop(self._jobs)
+                self.free_slots -= cpu_slots
+                self._update_status(job_id, status='running',
+                                    start_time=datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+
+            try:
+                with threadpool_limits(limits=cpu_slots):
+                    function(*args, n_jobs=cpu_slots, **kwargs)
+            except Exception as e:
+                print(f'Falha no treinamento "{job_id}": {e}')
+                fields = {'status': 'failed', 'error': str(e)}
+            else:
+                fields = {'status': 'finished', 'error': None}
+
+            with self._condition:
+                self.free_slots += cpu_slots
+                self._update_status(job_id, finish_time=datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'), **fields)
+                self._condition.notify_all()
+
+    def _update_status(self, job_id: str, **fields) -> None:
+        if job_id in self._statuses:
+            self._statuses[job_id].update(fields)
+
+    def _prune_statuses(self) -> None:
+        finished = [job_id for job_id, status in self._statuses.items()
+                    if status['status'] in ['finished', 'failed']]
+        for job_id in finished[:max(len(self._statuses) - TRAINING_STATUS_HISTORY, 0)]:
+            del self._statuses[job_id]
+
+training_scheduler = TrainingScheduler()
@@ -0,0 +1,58 @@
+'''
+Compara o tempo da detecção de outliers, do tratamento de outliers e do tratamento de dados faltantes executados
+no processo atual (`n_jobs=1`) com a divisão das colunas entre processos (veja `map_column_shards`).
+
+A entrada tem o formato do dataset de fraudes (284.807 linhas e 30 atributos) e de um dataset quatro vezes maior.
+Os processos são criados antes das medições, já que são reaproveitados entre as chamadas.
+
+Uso, a partir da raiz do repositório:
+
+    python benchmarks/benchmark_column_shards.py
+'''
+import pandas as pd
+import numpy as np
+import timeit
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import app.column_shards as column_shards
+from app.outliers_detector import detect_outlier_masks
+from app.outliers_treater import transform_outliers
+from app.missing_data_treater import handle_missing_data
+
+SEED = 42
+REPEATS = 3
+SHAPES = [(284_807, 30), (1_139_228, 30)]
+N_JOBS = [2, 4]
+MISSING_FRACTION = 0.01
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    values = rng.standard_t(3, size=(rows, columns))
+    values[rng.random((rows, columns)) < MISSING_FRACTION] = np.nan
+    df = pd.DataFrame(values, columns=[f'V{i}' for i in range(columns)])
+    df['Class'] = rng.integers(0, 2, rows)
+    return df
+
+def get_tasks(df: pd.DataFrame) -> dict:
+    outliers_masks = detect_outlier_masks(df, z_score_method=True, iqr_method=True, n_jobs=1)
+    return {
+        'detecção de outliers': lambda n_jobs: detect_outlier_masks(df, True, True, True, True, n_jobs=n_jobs),
+        'tratamento de outliers (log)': lambda n_jobs: transform_outliers(df, outliers_masks, 'log', n_jobs=n_jobs),
+        'dados faltantes (median)': lambda n_jobs: handle_missing_data(df, 'median', n_jobs=n_jobs),
+    }
+
+if __name__ == '__main__':
+    column_shards.SHARD_PARALLEL_MIN_CELLS = 0
+    print(f'CPUs: {os.cpu_count()}')
+    for rows, columns in SHAPES:
+        df = make_dataset(rows, columns)
+        for name, task in get_tasks(df).items():
+            for n_jobs in N_JOBS:
+                task(n_jobs)
+            serial = min(timeit.repeat(lambda: task(1), number=1, repeat=REPEATS))
+            results = []
+            for n_jobs in N_JOBS:
+                sharded = min(timeit.repeat(lambda: task(n_jobs), number=1, repeat=REPEATS))
+                results.append(f'{n_jobs} processos {sharded:.3f}s ({serial / sharded:.2f}x)')
+            print(f'{name}, {rows * columns:,} células: 1 processo {serial:.3f}s, ' + ', '.join(results))
@@ -0,0 +1,44 @@
+'''
+Compara o tempo de `generate_correlation_matrix` com `df.corr`, chamado separadamente para cada método.
+
+Uso, a partir da raiz do repositório:
+
+    python benchmarks/benchmark_correlations.py
+'''
+import pandas as pd
+import numpy as np
+import time
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.superficial_analysis import generate_correlation_matrix
+
+SEED = 42
+SHAPES = {
+    'médio (50.000 x 30)': (50_000, 30),
+    'fraude (284.807 x 30)': (284_807, 30),
+}
+METHODS = ['pearson', 'kendall', 'spearman']
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    values = rng.normal(size=(rows, columns))
+    values[:, 1:] += 0.3 * values[:, :1]
+    return pd.DataFrame(values, columns=[f'V{i}' for i in range(columns)])
+
+def measure(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    for name, (rows, columns) in SHAPES.items():
+        df = make_dataset(rows, columns)
+        for method in METHODS:
+            before = measure(lambda: df.corr(method=method))
+            after = measure(lambda: generate_correlation_matrix(df, **{f'correlation_{method}': True}))
+            print(f'{name}, {method}: pandas {before:.3f}s, motor {after:.3f}s ({before / after:.1f}x)')
+
+        before = measure(lambda: [df.corr(method=method) for method in METHODS])
+        after = measure(lambda: generate_correlation_matrix(df, True, True, True))
+        print(f'{name}, todos: pandas {before:.3f}s, motor {after:.3f}s ({before / after:.1f}x)')
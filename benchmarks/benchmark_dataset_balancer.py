@@ -0,0 +1,43 @@
+'''
+Compara o tempo de `balance_df` com as funções `smote`, `bsmote` e `adasyn`, que passam o DataFrame ao `imblearn`
+e fazem a busca de vizinhos exaustiva em `float64` e em uma única thread, para cada algoritmo de busca de vizinhos.
+Com `kd_tree` e `ball_tree`, as árvores são construídas na primeira chamada e reaproveitadas nas seguintes.
+
+A entrada tem o formato do dataset de fraudes: 284.807 linhas, 30 atributos e 0,17% de linhas da classe minoritária.
+
+Uso, a partir da raiz do repositório:
+
+    python benchmarks/benchmark_dataset_balancer.py
+'''
+import pandas as pd
+import numpy as np
+import timeit
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.dataset_balancer import smote, bsmote, adasyn, balance_df, NEIGHBORS_ALGORITHMS
+
+SEED = 42
+REPEATS = 3
+ROWS = 284_807
+COLUMNS = 30
+MINORITY_FRACTION = 0.0017
+BALANCE_FUNCTIONS = {'smote': smote, 'bsmote': bsmote, 'adasyn': adasyn}
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame(rng.standard_normal((rows, columns)), columns=[f'V{i}' for i in range(columns)])
+    df['Class'] = (rng.random(rows) < MINORITY_FRACTION).astype(int)
+    df.loc[df['Class'] == 1, 'V0'] += 2
+    return df
+
+if __name__ == '__main__':
+    df = make_dataset(ROWS, COLUMNS)
+    for method, balance_function in BALANCE_FUNCTIONS.items():
+        before = min(timeit.repeat(lambda: balance_function(df), number=1, repeat=REPEATS))
+        results = []
+        for neighbors_algorithm in NEIGHBORS_ALGORITHMS:
+            after = min(timeit.repeat(lambda: balance_df(df, method, neighbors_algorithm=neighbors_algorithm),
+                                      number=1, repeat=REPEATS))
+            results.append(f'{neighbors_algorithm} {after:.3f}s ({before / after:.1f}x)')
+        print(f'{method}: DataFrame {before:.3f}s, ' + ', '.join(results))
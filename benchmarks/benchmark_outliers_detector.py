@@ -0,0 +1,61 @@
+'''
+Compara o tempo de `detect_outliers` com a implementação anterior, que percorria métodos e colunas um a um.
+
+Uso, a partir da raiz do repositório:
+
+    python benchmarks/benchmark_outliers_detector.py
+'''
+import pandas as pd
+import numpy as np
+from scipy.stats import zscore
+import timeit
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.outliers_detector import detect_outliers, detect_outlier_masks
+
+SEED = 42
+REPEATS = 3
+SHAPES = {
+    'alto (1.000.000 x 10)': (1_000_000, 10),
+    'largo (10.000 x 500)': (10_000, 500),
+    'fraude (284.807 x 30)': (284_807, 30),
+}
+
+def detect_outliers_per_column(df: pd.DataFrame) -> dict:
+    df_outliers = df.drop(columns=['Class'])
+    outliers_dict = {'z_score': {}, 'robust_z_score': {}, 'iqr': {}, 'winsorization': {}}
+    for column in df_outliers.columns:
+        z_scores = np.abs(zscore(df_outliers[column]))
+        outliers_dict['z_score'][column] = np.where(z_scores > 3)[0].tolist()
+
+        median = df_outliers[column].median()
+        mad = np.median(np.abs(df_outliers[column] - median))
+        modified_z_scores = 0.6745 * (df_outliers[column] - median) / mad
+        outliers_dict['robust_z_score'][column] = np.where(np.abs(modified_z_scores) > 3.5)[0].tolist()
+
+        Q1 = df_outliers[column].quantile(0.25)
+        Q3 = df_outliers[column].quantile(0.75)
+        IQR = Q3 - Q1
+        outliers = df_outliers[(df_outliers[column] < (Q1 - 1.5 * IQR)) | (df_outliers[column] > (Q3 + 1.5 * IQR))].index
+        outliers_dict['iqr'][column] = outliers.tolist()
+
+        q = df_outliers[column].quantile([0.01, 0.99])
+        outliers = df_outliers[(df_outliers[column] < q.iloc[0]) | (df_outliers[column] > q.iloc[1])].index
+        outliers_dict['winsorization'][column] = outliers.tolist()
+    return outliers_dict
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame(rng.standard_t(3, size=(rows, columns)), columns=[f'V{i}' for i in range(columns)])
+    df['Class'] = rng.integers(0, 2, rows)
+    return df
+
+if __name__ == '__main__':
+    for name, (rows, columns) in SHAPES.items():
+        df = make_dataset(rows, columns)
+        before = min(timeit.repeat(lambda: detect_outliers_per_column(df), number=1, repeat=REPEATS))
+        after = min(timeit.repeat(lambda: detect_outliers(df, True, True, True, True), number=1, repeat=REPEATS))
+        masks = min(timeit.repeat(lambda: detect_outlier_masks(df, True, True, True, True), number=1, repeat=REPEATS))
+        print(f'{name}: por coluna {before:.3f}s, vetorizado {after:.3f}s ({before / after:.1f}x), '
+              f'só máscaras {masks:.3f}s ({before / masks:.1f}x)')
@@ -0,0 +1,65 @@
+'''
+Compara o tempo de `transform_outliers` com a implementação anterior, que aplicava `.map` elemento a elemento
+e repetia o tratamento de cada atributo para cada método de detecção.
+
+A entrada é a do pipeline: um dataset com o formato do de fraudes, com os outliers detectados pelo Z-score e pelo IQR.
+
+Uso, a partir da raiz do repositório:
+
+    python benchmarks/benchmark_outliers_treater.py
+'''
+from sklearn.preprocessing import MinMaxScaler
+import pandas as pd
+import numpy as np
+import timeit
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.outliers_detector import detect_outliers, detect_outlier_masks
+from app.outliers_treater import transform_outliers
+
+SEED = 42
+REPEATS = 3
+ROWS = 284_807
+COLUMNS = 30
+TREATMENT_METHODS = ['log', 'sqrt', 'cbrt', 'scaling', 'constant', 'remove']
+
+def transform_outliers_per_method(df: pd.DataFrame, outliers_dict: dict, treatment_method=None, treatment_constant_value=0) -> pd.DataFrame:
+    df_transformed = df.copy()
+    scaler = MinMaxScaler()
+    for method in outliers_dict.keys():
+        for attribute in df_transformed.columns.drop('Class'):
+            valid_indices = df_transformed.index.intersection(outliers_dict[method][attribute])
+            if treatment_method == 'log':
+                df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.log(x) if x > 0 else 0)
+            elif treatment_method == 'sqrt':
+                df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.sqrt(x) if x > 0 else 0)
+            elif treatment_method == 'cbrt':
+                df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.cbrt(x) if x > 0 else 0)
+            elif treatment_method == 'scaling':
+                df_transformed[attribute] = scaler.fit_transform(df_transformed[attribute].values.reshape(-1, 1))
+            elif treatment_method == 'constant':
+                df_transformed.loc[valid_indices, attribute] = treatment_constant_value
+            elif treatment_method == 'remove':
+                df_transformed = df_transformed.drop(valid_indices)
+    return df_transformed
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame(rng.standard_t(3, size=(rows, columns)), columns=[f'V{i}' for i in range(columns)])
+    df['Class'] = rng.integers(0, 2, rows)
+    return df
+
+if __name__ == '__main__':
+    df = make_dataset(ROWS, COLUMNS)
+    outliers_dict = detect_outliers(df, z_score_method=True, iqr_method=True)
+    outliers_masks = detect_outlier_masks(df, z_score_method=True, iqr_method=True)
+    for treatment_method in TREATMENT_METHODS:
+        before = min(timeit.repeat(lambda: transform_outliers_per_method(df, outliers_dict, treatment_method),
+                                   number=1, repeat=REPEATS))
+        after = min(timeit.repeat(lambda: transform_outliers(df, outliers_dict, treatment_method),
+                                  number=1, repeat=REPEATS))
+        masks = min(timeit.repeat(lambda: transform_outliers(df, outliers_masks, treatment_method),
+                                  number=1, repeat=REPEATS))
+        print(f'{treatment_method}: por método {before:.3f}s, vetorizado {after:.3f}s ({before / after:.1f}x), '
+              f'com máscaras {masks:.3f}s ({before / masks:.1f}x)')
@@ -0,0 +1,57 @@
+'''
+Compara o tempo de `generate_statistics` com a implementação anterior, que percorria as colunas uma a uma.
+
+Uso, a partir da raiz do repositório:
+
+    python benchmarks/benchmark_superficial_analysis.py
+'''
+import pandas as pd
+import numpy as np
+from scipy.stats import mode
+import timeit
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.superficial_analysis import generate_statistics
+
+SEED = 42
+REPEATS = 3
+SHAPES = {
+    'alto (1.000.000 x 10)': (1_000_000, 10),
+    'largo (10.000 x 500)': (10_000, 500),
+    'fraude (284.807 x 30)': (284_807, 30),
+}
+
+def generate_statistics_per_column(df: pd.DataFrame) -> pd.DataFrame:
+    results = {}
+    for column in df.columns.drop('Class'):
+        column_data = df[column]
+        results[column] = {
+            'Média': column_data.mean(),
+            'Mediana': column_data.median(),
+            'Moda': mode(column_data, keepdims=True)[0][0],
+            'Campos vazios': column_data.isnull().sum(),
+            'Campos vazios (%)': (column_data.isnull().sum() / len(df)) * 100,
+            'Campos com valor zero': (column_data == 0).sum(),
+            'Valor máximo': column_data.max(),
+            'Valor mínimo': column_data.min(),
+            'Desvio padrão': column_data.std(),
+            'Intervalo de valores': np.ptp(column_data),
+            'IQR': np.percentile(column_data, 75) - np.percentile(column_data, 25),
+            'Assimetria': column_data.skew(),
+            'Curtose': column_data.kurtosis()
+        }
+    return pd.DataFrame.from_dict(results, orient='index').transpose()
+
+def make_dataset(rows: int, columns: int) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame(rng.normal(size=(rows, columns)), columns=[f'V{i}' for i in range(columns)])
+    df['Class'] = rng.integers(0, 2, rows)
+    return df
+
+if __name__ == '__main__':
+    for name, (rows, columns) in SHAPES.items():
+        df = make_dataset(rows, columns)
+        before = min(timeit.repeat(lambda: generate_statistics_per_column(df), number=1, repeat=REPEATS))
+        after = min(timeit.repeat(lambda: generate_statistics(df), number=1, repeat=REPEATS))
+        print(f'{name}: por coluna {before:.3f}s, vetorizado {after:.3f}s ({before / after:.1f}x)')
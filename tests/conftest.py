@@ -0,0 +1,83 @@
+import pytest
+import time
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import app.storage_manager as storage_manager
+
+class FakeBlob:
+    '''
+    Blob falso que guarda o conteúdo em um diretório local, com a mesma interface usada de `google.cloud.storage.Blob`.
+    '''
+    def __init__(self, bucket, name: str):
+        self.bucket = bucket
+        self.name = name
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.bucket.root, self.name)
+
+    @property
+    def generation(self) -> int:
+        return self.bucket.generations.get(self.name)
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def open(self, mode: str = 'rb', chunk_size: int = None, if_generation_match: int = None):
+        if mode != 'rb':
+            raise ValueError(f'Modo "{mode}" não suportado pelo blob falso')
+        if if_generation_match is not None and if_generation_match != self.generation:
+            raise ValueError(f'Geração {if_generation_match} não corresponde à geração atual do blob "{self.name}"')
+        self.bucket.streamed_reads += 1
+        return open(self.path, 'rb')
+
+    def download_as_bytes(self) -> bytes:
+        self.bucket.full_downloads += 1
+        with open(self.path, 'rb') as file:
+            return file.read()
+
+    def download_as_text(self, encoding: str = 'utf-8') -> str:
+        return self.download_as_bytes().decode(encoding)
+
+    def upload_from_string(self, data, content_type: str = 'text/plain') -> None:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'wb') as file:
+            file.write(data)
+        self.bucket.generations[self.name] = time.time_ns()
+
+    def upload_from_filename(self, filename: str, content_type: str = None) -> None:
+        with open(filename, 'rb') as file:
+            self.upload_from_string(file.read(), content_type)
+
+class FakeBucket:
+    '''
+    Bucket falso local, usado no lugar do bucket do Google Cloud Storage nos testes.
+    '''
+    def __init__(self, root: str):
+        self.root = root
+        self.name = 'fake-bucket'
+        self.generations = {}
+        self.streamed_reads = 0
+        self.full_downloads = 0
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str) -> FakeBlob:
+        blob = self.blob(name)
+        return blob if blob.exists() else None
+
+@pytest.fixture
+def fake_bucket(tmp_path):
+    bucket = FakeBucket(str(tmp_path / 'bucket'))
+    storage_manager.set_bucket(bucket)
+    storage_manager.reset_operation_stats()
+    yield bucket
+    storage_manager.set_bucket(None)
@@ -0,0 +1,78 @@
+import pandas as pd
+import threading
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.artifact_writer import ArtifactWriter
+from app.dataset_manager import save_df, load_csv_from_local
+
+def test_artifact_writer_writes_in_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    writer = ArtifactWriter(workers=2)
+    df = pd.DataFrame({'A': [1, 2, 3], 'Class': [0, 1, 0]})
+
+    for name in ['first', 'second', 'third']:
+        writer.submit(f'test/{name}', save_df, df, 'test', name)
+    assert writer.shutdown(timeout=10)
+
+    assert [status['status'] for status in writer.status('test/')] == ['finished'] * 3
+    pd.testing.assert_frame_equal(load_csv_from_local('test', 'second'), df)
+
+def test_artifact_writer_retries_and_reports_failures():
+    writer = ArtifactWriter(workers=1, max_retries=2, retry_delay=0)
+    calls = []
+
+    def flaky_write():
+        calls.append(1)
+        if len(calls) < 3:
+            raise OSError('Falha temporária')
+
+    def broken_write():
+        raise OSError('Falha permanente')
+
+    writer.submit('test/flaky', flaky_write)
+    writer.submit('test/broken', broken_write)
+    assert writer.flush(timeout=10)
+
+    statuses = {status['artifact_id']: status for status in writer.status()}
+    assert statuses['test/flaky']['status'] == 'finished'
+    assert statuses['test/flaky']['attempts'] == 3
+    assert statuses['test/broken']['status'] == 'failed'
+    assert statuses['test/broken']['error'] == 'Falha permanente'
+    writer.shutdown()
+
+def test_artifact_writer_bounded_queue_and_flush_timeout():
+    writer = ArtifactWriter(max_queue_size=1, workers=1)
+    release = threading.Event()
+
+    writer.submit('test/blocked', release.wait)
+    writer.submit('test/waiting', lambda: None)
+    assert writer.pending() == 2
+    assert not writer.flush(timeout=0.05)
+    assert {status['status'] for status in writer.status()} <= {'queued', 'writing'}
+
+    release.set()
+    assert writer.shutdown(timeout=10)
+    assert writer.pending() == 0
+
+def test_artifact_writer_keeps_writes_of_an_artifact_in_order():
+    writer = ArtifactWriter(workers=2)
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def slow_write(value):
+        started.set()
+        release.wait(10)
+        written.append(value)
+
+    writer.submit('d/a', slow_write, 'old')
+    assert started.wait(10)
+    writer.submit('d/a', written.append, 'skipped')
+    writer.submit('d/a', written.append, 'new')
+    assert writer.status('d/a')[0]['status'] == 'queued'
+
+    release.set()
+    assert writer.shutdown(timeout=10)
+    assert written == ['old', 'new']
+    assert writer.status('d/a')[0]['status'] == 'finished'
+    assert writer.status('d/a')[0]['generation'] == 3
@@ -0,0 +1,87 @@
+import pandas as pd
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import app.column_shards as column_shards
+from app.column_shards import SharedArray, FrameColumns, get_shard_bounds, map_column_shards
+from app.outliers_detector import detect_outlier_masks
+from app.outliers_treater import transform_outliers
+from app.missing_data_treater import handle_missing_data
+
+def double_columns(columns_values: np.ndarray) -> np.ndarray:
+    return columns_values * 2
+
+def fill_process_id(columns_values: np.ndarray) -> np.ndarray:
+    return np.full(columns_values.shape, os.getpid())
+
+def make_dataset(rows: int = 2000, columns: int = 8) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(rng.standard_t(3, (rows, columns)), columns=[f'V{i}' for i in range(columns)])
+    df.iloc[::97, 1] = np.nan
+    df['Class'] = rng.integers(0, 2, rows)
+    return df
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    monkeypatch.setattr(column_shards, 'SHARD_PARALLEL_MIN_CELLS', 0)
+
+def test_get_shard_bounds():
+    assert get_shard_bounds(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert get_shard_bounds(2, 4) == [(0, 1), (1, 2)]
+
+def test_shared_array_attach():
+    with SharedArray((2, 3), np.float64) as shared:
+        shared.array[:] = 1.5
+        attached = SharedArray.attach(shared.describe())
+        assert attached.array.sum() == 9.0
+        attached.close()
+
+def test_map_column_shards_matches_serial(small_shards):
+    values = np.arange(40, dtype=np.float64).reshape(8, 5)
+    np.testing.assert_array_equal(map_column_shards(double_columns, [values], n_jobs=3), values * 2)
+    np.testing.assert_array_equal(map_column_shards(double_columns, [values], n_jobs=1), values * 2)
+
+    process_ids = map_column_shards(fill_process_id, [values], output_dtype=np.int64, n_jobs=2)
+    assert os.getpid() not in process_ids
+
+def test_map_column_shards_is_opt_in(small_shards, monkeypatch):
+    monkeypatch.setattr(column_shards, 'SHARD_JOBS', 4)
+    values = np.arange(40, dtype=np.float64).reshape(8, 5)
+    assert (map_column_shards(fill_process_id, [values], output_dtype=np.int64) == os.getpid()).all()
+
+def test_sharded_stages_match_serial(small_shards):
+    df = make_dataset()
+    serial = detect_outlier_masks(df, True, True, True, True, n_jobs=1)
+    sharded = detect_outlier_masks(df, True, True, True, True, n_jobs=2)
+    assert set(sharded) == set(serial)
+    for method in serial:
+        np.testing.assert_array_equal(sharded[method], serial[method])
+
+    for treatment_method in ['log', 'scaling', 'constant']:
+        pd.testing.assert_frame_equal(transform_outliers(df, serial, treatment_method, -1.0, n_jobs=2),
+                                      transform_outliers(df, serial, treatment_method, -1.0, n_jobs=1))
+
+    df_missing = df.drop(columns=['Class'])
+    for method in ['mean', 'median', 'most_frequent']:
+        pd.testing.assert_frame_equal(handle_missing_data(df_missing, method, n_jobs=2),
+                                      handle_missing_data(df_missing, method, n_jobs=1))
+
+def test_map_column_shards_reuses_spawned_processes(small_shards):
+    values = np.arange(40.0).reshape(8, 5)
+    first = map_column_shards(fill_process_id, [values], output_dtype=np.int64, n_jobs=2)
+    second = map_column_shards(fill_process_id, [values], output_dtype=np.int64, n_jobs=2)
+    assert len(set(np.unique(first)) | set(np.unique(second))) <= 2
+    assert column_shards.get_process_executor(2)._mp_context.get_start_method() == 'spawn'
+
+def test_frame_columns_fill_shared_inputs_column_by_column(small_shards):
+    df = make_dataset(rows=50, columns=6)
+    df['V2'] = df['V2'].astype('Float64')
+    df.loc[3, 'V2'] = pd.NA
+    columns = df.columns.drop('Class')
+    frame_columns = FrameColumns(df, columns)
+    expected = df[columns].to_numpy(dtype=np.float64, na_value=np.nan).T
+    np.testing.assert_array_equal(frame_columns.to_numpy(), expected)
+    assert frame_columns.to_numpy().flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(map_column_shards(double_columns, [frame_columns], n_jobs=2), expected * 2)
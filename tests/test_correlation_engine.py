@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+import pytest
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.correlation_engine import compute_correlations
+from app.superficial_analysis import generate_correlation_matrix
+import app.correlation_engine as correlation_engine
+import app.column_shards as column_shards
+
+SEED = 42
+np.random.seed(SEED)
+df = pd.DataFrame({
+    'Feature 1': np.random.normal(0, 1, 500),
+    'Feature 2': np.random.normal(1000, 2, 500),
+    'Feature 3': np.random.randint(0, 5, 500).astype(float),
+    'Class': np.random.choice([0, 1], size=(500,)),
+})
+df['Feature 4'] = df['Feature 1'] * 2 + np.random.normal(0, 0.5, 500)
+df_missing = df.copy()
+df_missing.loc[::7, 'Feature 1'] = np.nan
+df_missing.loc[::11, 'Feature 3'] = np.nan
+df_constant = df.assign(**{'Feature 5': 3.0})
+
+@pytest.mark.parametrize('method', ['pearson', 'kendall', 'spearman'])
+def test_compute_correlations_matches_pandas(method):
+    for data in [df, df_missing, df_constant]:
+        correlation = compute_correlations(data, [method], n_jobs=1)[method]
+        pd.testing.assert_frame_equal(correlation, data.corr(method=method), rtol=1e-9)
+
+def test_kendall_in_process_pool_matches_pandas(monkeypatch):
+    monkeypatch.setattr(correlation_engine, 'KENDALL_PARALLEL_MIN_ROWS', 0)
+    correlation = compute_correlations(df_missing, ['kendall'], n_jobs=2)['kendall']
+    pd.testing.assert_frame_equal(correlation, df_missing.corr(method='kendall'), rtol=1e-9)
+
+def test_generate_correlation_matrix_returns_only_requested_methods():
+    pearson, kendall, spearman = generate_correlation_matrix(df, correlation_spearman=True)
+    assert pearson is None and kendall is None
+    pd.testing.assert_frame_equal(spearman, df.corr(method='spearman'), rtol=1e-9)
+
+def test_kendall_is_thread_safe():
+    matrices = [np.random.default_rng(seed).standard_normal((300, 4)) for seed in range(4)]
+    expected = [correlation_engine.kendall_matrix(values, n_jobs=1) for values in matrices]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for _ in range(3):
+            results = list(executor.map(lambda values: correlation_engine.kendall_matrix(values, n_jobs=1), matrices))
+            for result, correlation in zip(results, expected):
+                np.testing.assert_array_equal(result, correlation)
+
+def test_kendall_reuses_spawned_process_pool(monkeypatch):
+    monkeypatch.setattr(correlation_engine, 'KENDALL_PARALLEL_MIN_ROWS', 0)
+    compute_correlations(df, ['kendall'], n_jobs=2)
+    executor = column_shards.get_process_executor(2)
+    correlation = compute_correlations(df_missing, ['kendall'], n_jobs=2)['kendall']
+    assert column_shards.get_process_executor(2) is executor
+    assert executor._mp_context.get_start_method() == 'spawn'
+    pd.testing.assert_frame_equal(correlation, df_missing.corr(method='kendall'), rtol=1e-9)
@@ -1,10 +1,15 @@
 import pandas as pd
 import numpy as np
+import pytest
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.dataset_balancer import apply_resampler, random_under_sampling, random_over_sampling, smote, bsmote, adasyn
+from app.dataset_balancer import (apply_resampler, random_under_sampling, random_over_sampling, smote, bsmote, adasyn, balance_df, neighbors_indexes,
+                                  get_balance_weights, save_balance_weights, load_balance_weights)
+from app.machine_learning import fit_model
 from imblearn.under_sampling import RandomUnderSampler
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
 
 SEED = 42
 np.random.seed(SEED)
@@ -47,3 +52,59 @@ def test_adasyn():
     df_resampled = adasyn(df)
     assert df_resampled.shape[0] >= df.shape[0]
     assert abs(df_resampled['Class'].value_counts()[0] - df_resampled['Class'].value_counts()[1]) <= 5
+
+@pytest.mark.parametrize('method, balance_function', [('smote', smote), ('bsmote', bsmote), ('adasyn', adasyn)])
+def test_balance_df_matches_resamplers(method, balance_function):
+    expected = balance_function(df)
+    for neighbors_algorithm in ['brute', 'kd_tree']:
+        df_resampled = balance_df(df, method, n_jobs=2, neighbors_algorithm=neighbors_algorithm)
+        assert (df_resampled.dtypes.drop('Class') == np.float64).all()
+        assert df_resampled['Class'].tolist() == expected['Class'].tolist()
+        np.testing.assert_allclose(df_resampled.drop(columns='Class'), expected.drop(columns='Class'), rtol=1e-12)
+        pd.testing.assert_frame_equal(df_resampled.iloc[:len(df)], expected.iloc[:len(df)])
+
+@pytest.mark.parametrize('method, balance_function', [('random_over_sampling', random_over_sampling), ('random_under_sampling', random_under_sampling)])
+def test_balance_df_random_methods_keep_original_rows(method, balance_function):
+    df_mixed = df.assign(**{'Feature 6': np.where(df['Feature 1'] > 0, 'a', 'b'), 'Feature 7': np.arange(len(df))})
+    pd.testing.assert_frame_equal(balance_df(df_mixed, method), balance_function(df_mixed))
+
+def test_balance_df_reuses_neighbors_indexes():
+    neighbors_indexes.clear()
+    balance_df(df, 'bsmote', neighbors_algorithm='ball_tree')
+    indexes = list(neighbors_indexes.values())
+    balance_df(df, 'adasyn', neighbors_algorithm='ball_tree')
+    assert list(neighbors_indexes.values()) == indexes
+
+def test_balance_df_invalid_method():
+    with pytest.raises(ValueError):
+        balance_df(df, 'tomek_links')
+    with pytest.raises(ValueError):
+        balance_df(df, 'smote', neighbors_algorithm='annoy')
+
+@pytest.mark.parametrize('method, balance_function', [('random_over_sampling', random_over_sampling), ('random_under_sampling', random_under_sampling)])
+def test_balance_weights_match_resamplers(method, balance_function, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df_rows = df.assign(row=np.arange(len(df)))
+    expected = np.bincount(balance_function(df_rows)['row'], minlength=len(df))
+
+    weights = get_balance_weights(df['Class'], method)
+    np.testing.assert_array_equal(weights, expected)
+
+    save_balance_weights(weights, 'test', f'data_{method}_weights')
+    np.testing.assert_array_equal(load_balance_weights('test', f'data_{method}_weights'), weights)
+
+def test_balance_weights_invalid_method():
+    with pytest.raises(ValueError):
+        get_balance_weights(df['Class'], 'smote')
+
+def test_fit_model_with_weights_matches_duplicated_rows():
+    X, y = df.drop(columns='Class'), df['Class']
+    weights = get_balance_weights(y, 'random_over_sampling')
+    rows = np.repeat(np.arange(len(df)), weights)
+
+    weighted = fit_model(LogisticRegression(tol=1e-8, max_iter=1000), X, y, weights)
+    duplicated = LogisticRegression(tol=1e-8, max_iter=1000).fit(X.iloc[rows], y.iloc[rows])
+    np.testing.assert_allclose(weighted.coef_, duplicated.coef_, rtol=1e-4)
+
+    gathered = fit_model(MLPClassifier(hidden_layer_sizes=(4,), max_iter=5, random_state=SEED), X, y, weights)
+    assert gathered.n_features_in_ == X.shape[1]
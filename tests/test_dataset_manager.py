@@ -1,8 +1,13 @@
 import pandas as pd
+import numpy as np
+import pytest
+import hashlib
+from io import BytesIO
 import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.dataset_manager import get_credentials, load_csv_from_gcs, save_df_to_gcs
+from app.dataset_manager import get_credentials, load_csv_from_gcs, save_df_to_gcs, load_csv_from_local, get_columnar_cache_path, DataFrameCache, dataframe_cache, get_operation_stats, infer_compact_schema, get_schema_path, iter_csv_chunks, CsvIngest, save_manifest, load_manifest, build_columnar_cache, save_df_to_local, split_csv_file_name, read_csv_rows, update_statistics_state, load_statistics_state
+import app.dataset_manager as dataset_manager
 
 DATASET_ID = 'test'
 FILE_NAME = 'test'
@@ -14,4 +19,303 @@ def test_get_credentials():
 def test_load_csv_from_gcs():
     df = load_csv_from_gcs(DATASET_ID, FILE_NAME)
     assert isinstance(df, pd.DataFrame), "Failed to load CSV from GCS"
-    assert not df.empty, "DataFrame is empty"
\ No newline at end of file
+    assert not df.empty, "DataFrame is empty"
+
+def write_local_csv(dataset_id: str, file_name: str, df: pd.DataFrame, index: bool = False) -> str:
+    os.makedirs(f'app/datasets/{dataset_id}', exist_ok=True)
+    file_path = f'app/datasets/{dataset_id}/{file_name}.csv'
+    df.to_csv(file_path, index=index)
+    return file_path
+
+def test_load_csv_from_local_builds_columnar_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': [0.5, 1.5, 2.5], 'Class': [0, 1, 0]})
+    write_local_csv(DATASET_ID, FILE_NAME, df)
+
+    df_loaded = load_csv_from_local(DATASET_ID, FILE_NAME)
+    assert os.path.exists(get_columnar_cache_path(DATASET_ID, FILE_NAME))
+    pd.testing.assert_frame_equal(df_loaded, df)
+
+    df_cached = load_csv_from_local(DATASET_ID, FILE_NAME)
+    pd.testing.assert_frame_equal(df_cached, df)
+
+def test_load_csv_from_local_rebuilds_stale_columnar_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_local_csv(DATASET_ID, FILE_NAME, pd.DataFrame({'A': [1, 2], 'Class': [0, 1]}))
+    load_csv_from_local(DATASET_ID, FILE_NAME)
+
+    df_new = pd.DataFrame({'A': [10, 20, 30], 'Class': [1, 0, 1]})
+    file_path = write_local_csv(DATASET_ID, FILE_NAME, df_new)
+    os.utime(file_path, ns=(os.stat(file_path).st_atime_ns, os.stat(file_path).st_mtime_ns + 10**9))
+
+    pd.testing.assert_frame_equal(load_csv_from_local(DATASET_ID, FILE_NAME), df_new)
+
+def test_load_csv_from_local_projects_columns_and_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': [1, 2, 3], 'B': [4, 5, 6], 'Class': [0, 1, 0]}, index=[10, 11, 12])
+    write_local_csv(DATASET_ID, FILE_NAME, df, index=True)
+
+    for _ in range(2):
+        df_loaded = load_csv_from_local(DATASET_ID, FILE_NAME, index=True, columns=['B'])
+        assert df_loaded.columns.tolist() == ['B']
+        assert df_loaded.index.tolist() == [10, 11, 12]
+        assert df_loaded.index.name is None
+
+def test_dataframe_cache_returns_read_only_frames(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dataframe_cache.clear()
+    write_local_csv(DATASET_ID, FILE_NAME, pd.DataFrame({'A': [1.0, 2.0, 3.0], 'Class': [0, 1, 0]}))
+
+    df_first = load_csv_from_local(DATASET_ID, FILE_NAME)
+    df_second = load_csv_from_local(DATASET_ID, FILE_NAME)
+    assert dataframe_cache.stats()['misses'] == 1
+    assert dataframe_cache.stats()['hits'] == 1
+
+    with pytest.raises(ValueError):
+        df_first.loc[0, 'A'] = 100.0
+    df_first['A'] = df_first['A'] * 2
+    assert df_second['A'].tolist() == [1.0, 2.0, 3.0]
+    assert load_csv_from_local(DATASET_ID, FILE_NAME)['A'].tolist() == [1.0, 2.0, 3.0]
+
+def test_app_modules_share_one_dataframe_cache():
+    import app.main
+    import app.machine_learning as machine_learning
+    assert machine_learning.load_csv is dataset_manager.load_csv
+    assert not [name for name in ['dataset_manager', 'storage_manager', 'column_shards', 'outliers_store'] if name in sys.modules]
+
+def test_dataframe_cache_evicts_least_recently_used():
+    df = pd.DataFrame({'A': np.arange(100, dtype=np.float64)})
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    cache = DataFrameCache(max_bytes=2 * size)
+
+    cache.put('first', df.copy())
+    cache.put('second', df.copy())
+    cache.get('first')
+    cache.put('third', df.copy())
+
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.get('third') is not None
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['current_bytes'] <= cache.max_bytes
+
+def test_load_csv_from_gcs_uses_shared_bucket_and_generation(fake_bucket, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': [1, 2, 3], 'Class': [0, 1, 0]})
+    save_df_to_gcs(df, 'fake', FILE_NAME)
+
+    pd.testing.assert_frame_equal(load_csv_from_gcs('fake', FILE_NAME), df)
+    pd.testing.assert_frame_equal(load_csv_from_gcs('fake', FILE_NAME), df)
+    assert get_operation_stats()['download_stream']['count'] == 1
+
+    df_new = pd.DataFrame({'A': [4, 5], 'Class': [1, 1]})
+    save_df_to_gcs(df_new, 'fake', FILE_NAME)
+    pd.testing.assert_frame_equal(load_csv_from_gcs('fake', FILE_NAME), df_new)
+
+    stats = get_operation_stats()
+    assert stats['upload']['count'] == 2
+    assert stats['download_stream']['count'] == 2
+    assert stats['download_stream']['mean_seconds'] >= 0
+
+def test_load_csv_from_gcs_streams_blob_into_parser(fake_bucket, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': np.arange(1000), 'B': np.linspace(0, 1, 1000), 'Class': np.arange(1000) % 2})
+    save_df_to_gcs(df, 'fake', FILE_NAME)
+
+    pd.testing.assert_frame_equal(load_csv_from_gcs('fake', FILE_NAME), df)
+    assert fake_bucket.streamed_reads == 1
+    assert fake_bucket.full_downloads == 0
+
+def test_infer_compact_schema():
+    df = pd.DataFrame({
+        'Class': [0, 1, 0, 0] * 25,
+        'Amount': [1.5, 2.5, np.nan, 4.0] * 25,
+        'Counter': [0, 1000, 2000, 70000] * 25,
+        'Category': ['a', 'b', 'a', 'a'] * 25,
+        'Name': [f'name {i}' for i in range(100)],
+    })
+    schema = infer_compact_schema(df)
+    assert schema == {'Class': 'int8', 'Amount': 'float32', 'Counter': 'int32', 'Category': 'category', 'Name': 'object'}
+
+def test_load_csv_optimize_dtypes_persists_schema(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': np.linspace(0, 1, 50), 'Class': [0, 1] * 25})
+    write_local_csv(DATASET_ID, FILE_NAME, df)
+
+    df_compact = load_csv_from_local(DATASET_ID, FILE_NAME, optimize_dtypes=True)
+    assert df_compact['A'].dtype == np.float32
+    assert df_compact['Class'].dtype == np.int8
+    assert os.path.exists(get_schema_path(DATASET_ID, FILE_NAME))
+
+    def fail_inference(df):
+        raise AssertionError('O esquema salvo deveria ter sido reutilizado')
+
+    dataframe_cache.clear()
+    monkeypatch.setattr(dataset_manager, 'infer_compact_schema', fail_inference)
+    df_compact = load_csv_from_local(DATASET_ID, FILE_NAME, optimize_dtypes=True)
+    assert df_compact['Class'].dtype == np.int8
+    assert load_csv_from_local(DATASET_ID, FILE_NAME)['A'].dtype == np.float64
+
+def test_iter_csv_chunks_from_csv_and_columnar_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': np.arange(25), 'Class': np.arange(25) % 2})
+    write_local_csv(DATASET_ID, FILE_NAME, df)
+
+    chunks = list(iter_csv_chunks(DATASET_ID, FILE_NAME, chunksize=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+    load_csv_from_local(DATASET_ID, FILE_NAME)
+    chunks = list(iter_csv_chunks(DATASET_ID, FILE_NAME, chunksize=10))
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+def test_csv_ingest_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': np.arange(100), 'B': np.linspace(0, 1, 100), 'Class': np.arange(100) % 2})
+    content = df.to_csv(index=False).encode()
+
+    ingest = CsvIngest(sample_bytes=256)
+    for start in range(0, len(content), 100):
+        ingest.update(content[start:start + 100])
+    manifest = ingest.manifest()
+
+    assert manifest['sha256'] == hashlib.sha256(content).hexdigest()
+    assert manifest['size'] == len(content)
+    assert manifest['rows'] == 100
+    assert manifest['dtypes'] == {'A': 'int64', 'B': 'float64', 'Class': 'int64'}
+
+    write_local_csv(DATASET_ID, FILE_NAME, df)
+    save_manifest(DATASET_ID, FILE_NAME, manifest)
+    assert load_manifest(DATASET_ID, FILE_NAME)['sha256'] == manifest['sha256']
+
+def test_build_columnar_cache_completes_manifest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dataframe_cache.clear()
+    df = pd.DataFrame({'A': ['linha\nquebrada'] + ['x'] * 99, 'Class': np.arange(100) % 2})
+    content = df.to_csv(index=False).encode()
+    write_local_csv(DATASET_ID, FILE_NAME, df)
+
+    ingest = CsvIngest()
+    ingest.update(content)
+    manifest = ingest.manifest()
+    assert manifest['rows'] == 101
+
+    build_columnar_cache(DATASET_ID, FILE_NAME, manifest)
+    assert load_manifest(DATASET_ID, FILE_NAME)['rows'] == 100
+    pd.testing.assert_frame_equal(pd.read_parquet(get_columnar_cache_path(DATASET_ID, FILE_NAME)), df)
+    assert dataframe_cache.stats()['entries'] == 0
+
+def test_split_csv_file_name():
+    assert split_csv_file_name('transactions.csv') == ('transactions', None)
+    assert split_csv_file_name('transactions.csv.gz') == ('transactions', 'gzip')
+    assert split_csv_file_name('transactions.csv.zst') == ('transactions', 'zstd')
+    assert split_csv_file_name('transactions.csv.zip') == ('transactions', 'zip')
+    assert split_csv_file_name('image.png') == (None, None)
+
+@pytest.mark.parametrize('compression, extension', [('gzip', '.csv.gz'), ('zstd', '.csv.zst'), ('zip', '.csv.zip')])
+def test_compressed_csv_round_trip_local(compression, extension, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dataset_manager, 'CSV_COMPRESSION', compression)
+    df = pd.DataFrame({'A': np.arange(30), 'B': np.linspace(0, 1, 30), 'Class': np.arange(30) % 2})
+
+    save_df_to_local(df, DATASET_ID, FILE_NAME)
+    assert os.path.exists(f'app/datasets/{DATASET_ID}/{FILE_NAME}{extension}')
+    assert not os.path.exists(f'app/datasets/{DATASET_ID}/{FILE_NAME}.csv')
+
+    pd.testing.assert_frame_equal(load_csv_from_local(DATASET_ID, FILE_NAME), df)
+    chunks = list(iter_csv_chunks(DATASET_ID, FILE_NAME, chunksize=10))
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd', 'zip'])
+def test_compressed_csv_round_trip_gcs(compression, fake_bucket, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dataset_manager, 'CSV_COMPRESSION', compression)
+    df = pd.DataFrame({'A': np.arange(30), 'Class': np.arange(30) % 2})
+    save_df_to_gcs(df, 'fake', FILE_NAME)
+
+    monkeypatch.setattr(dataset_manager, 'CSV_COMPRESSION', None)
+    pd.testing.assert_frame_equal(load_csv_from_gcs('fake', FILE_NAME), df)
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_csv_ingest_manifest_decompresses_stream(compression):
+    df = pd.DataFrame({'A': np.arange(100), 'Class': np.arange(100) % 2})
+    buffer = BytesIO()
+    df.to_csv(buffer, index=False, compression=compression)
+    content = buffer.getvalue()
+
+    ingest = CsvIngest(compression=compression)
+    for start in range(0, len(content), 64):
+        ingest.update(content[start:start + 64])
+    manifest = ingest.manifest()
+
+    assert manifest['sha256'] == hashlib.sha256(content).hexdigest()
+    assert manifest['compression'] == compression
+    assert manifest['rows'] == 100
+    assert manifest['columns'] == ['A', 'Class']
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_csv_ingest_limits_decompressed_pieces(compression, monkeypatch):
+    monkeypatch.setattr(dataset_manager, 'INGEST_DECOMPRESS_BYTES', 1024)
+    buffer = BytesIO()
+    pd.DataFrame({'A': np.zeros(20_000, dtype=int), 'Class': 0}).to_csv(buffer, index=False, compression=compression)
+
+    ingest = CsvIngest(compression=compression)
+    pieces = []
+    write = ingest.write
+    monkeypatch.setattr(ingest, 'write', lambda chunk: pieces.append(len(chunk)) or write(chunk))
+    ingest.update(buffer.getvalue())
+
+    assert max(pieces) <= 1024
+    assert ingest.manifest()['rows'] == 20_000
+
+def test_read_csv_rows_from_columnar_cache_row_groups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dataset_manager, 'COLUMNAR_ROW_GROUP_SIZE', 10)
+    df = pd.DataFrame({'A': np.arange(45), 'B': np.arange(45) * 0.5, 'Class': np.arange(45) % 2})
+    write_local_csv(DATASET_ID, FILE_NAME, df)
+    load_csv_from_local(DATASET_ID, FILE_NAME)
+
+    page, total_rows = read_csv_rows(DATASET_ID, FILE_NAME, offset=8, limit=15, columns=['B'])
+    assert total_rows == 45
+    pd.testing.assert_frame_equal(page, df.loc[8:22, ['B']])
+
+    page, _ = read_csv_rows(DATASET_ID, FILE_NAME, offset=40, limit=10)
+    pd.testing.assert_frame_equal(page, df.loc[40:])
+
+    page, _ = read_csv_rows(DATASET_ID, FILE_NAME, offset=100, limit=10)
+    assert page.empty and page.columns.tolist() == ['A', 'B', 'Class']
+
+    with pytest.raises(ValueError):
+        read_csv_rows(DATASET_ID, FILE_NAME, columns=['Missing'])
+
+def test_read_csv_rows_without_columnar_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': np.arange(30), 'Class': np.arange(30) % 2}, index=np.arange(30) + 100)
+    write_local_csv(DATASET_ID, FILE_NAME, df, index=True)
+
+    page, total_rows = read_csv_rows(DATASET_ID, FILE_NAME, offset=5, limit=3, index=True, columns=['Class'])
+    assert total_rows is None
+    pd.testing.assert_frame_equal(page, df.iloc[5:8][['Class']])
+    assert not os.path.exists(get_columnar_cache_path(DATASET_ID, FILE_NAME))
+
+def test_update_statistics_state_reads_only_appended_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame({'A': np.arange(40) * 1.5, 'B': np.arange(40) % 7, 'Class': np.arange(40) % 2})
+    file_path = write_local_csv(DATASET_ID, FILE_NAME, df.iloc[:30])
+
+    state = update_statistics_state(DATASET_ID, FILE_NAME)
+    assert state.moments.rows == 30
+    assert load_statistics_state(DATASET_ID, FILE_NAME)[0].moments.rows == 30
+
+    df.iloc[30:].to_csv(file_path, mode='a', header=False, index=False)
+
+    def fail_full_read(*args, **kwargs):
+        raise AssertionError('Apenas as linhas acrescentadas deveriam ser lidas')
+
+    monkeypatch.setattr(dataset_manager, 'iter_csv_chunks', fail_full_read)
+    state = update_statistics_state(DATASET_ID, FILE_NAME)
+    assert state.moments.rows == 40
+    np.testing.assert_allclose(state.moments.mean, df[['A', 'B']].mean().to_numpy())
+    np.testing.assert_allclose(state.moments.std(), df[['A', 'B']].std().to_numpy())
+
+    assert update_statistics_state(DATASET_ID, FILE_NAME).moments.rows == 40
@@ -0,0 +1,99 @@
+from fastapi.testclient import TestClient
+import pandas as pd
+import numpy as np
+import pytest
+import hashlib
+import gzip
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.file_server import get_file_etag, etag_matches, parse_range_header, get_gzip_variant, accepts_gzip
+from app.main import app
+
+def write_file(dataset_id: str, file_name: str, content: bytes) -> str:
+    os.makedirs(f'app/datasets/{dataset_id}', exist_ok=True)
+    file_path = f'app/datasets/{dataset_id}/{file_name}'
+    with open(file_path, 'wb') as file:
+        file.write(content)
+    return file_path
+
+def test_parse_range_header():
+    assert parse_range_header('bytes=0-9', 100) == (0, 9)
+    assert parse_range_header('bytes=90-', 100) == (90, 99)
+    assert parse_range_header('bytes=-10', 100) == (90, 99)
+    assert parse_range_header('bytes=50-500', 100) == (50, 99)
+    assert parse_range_header('bytes=0-1,5-6', 100) is None
+    assert parse_range_header('items=0-1', 100) is None
+    with pytest.raises(ValueError):
+        parse_range_header('bytes=100-', 100)
+    with pytest.raises(ValueError):
+        parse_range_header('bytes=9-3', 100)
+
+def test_etag_and_encoding_negotiation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    file_path = write_file('test', 'result.json', b'{"a": 1}')
+
+    etag = get_file_etag(file_path)
+    assert etag.startswith('"') and etag == get_file_etag(file_path)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f'W/{etag}', etag)
+    assert not etag_matches('"other"', etag)
+
+    assert accepts_gzip('gzip, deflate, br')
+    assert not accepts_gzip('gzip;q=0, br')
+    assert not accepts_gzip(None)
+
+def test_get_gzip_variant_is_built_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = pd.DataFrame({'A': np.arange(500)}).to_csv(index=False).encode()
+    file_path = write_file('test', 'result.csv', content)
+
+    gzip_path = get_gzip_variant(file_path)
+    with gzip.open(gzip_path) as file:
+        assert file.read() == content
+    assert gzip_path.endswith(f'result.csv.{hashlib.sha256(content).hexdigest()}.gz')
+    mtime = os.stat(gzip_path).st_mtime_ns
+    assert get_gzip_variant(file_path) == gzip_path
+    assert os.stat(gzip_path).st_mtime_ns == mtime
+
+    new_content = content.replace(b'499', b'999')
+    stat = os.stat(file_path)
+    write_file('test', 'result.csv', new_content)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+    new_gzip_path = get_gzip_variant(file_path)
+    with gzip.open(new_gzip_path) as file:
+        assert file.read() == new_content
+    assert not os.path.exists(gzip_path)
+
+    assert get_gzip_variant(write_file('test', 'tree.png', content)) is None
+
+def test_serve_file_conditional_and_range_requests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = pd.DataFrame({'A': np.arange(500)}).to_csv(index=False).encode()
+    write_file('test', 'result.csv', content)
+    client = TestClient(app)
+
+    response = client.get('/datasets/test/result.csv', headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    assert response.content == content
+    etag = response.headers['etag']
+
+    response = client.get('/datasets/test/result.csv', headers={'Accept-Encoding': 'identity', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+
+    response = client.get('/datasets/test/result.csv', headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers['content-range'] == f'bytes 10-19/{len(content)}'
+
+    response = client.get('/datasets/test/result.csv', headers={'Range': f'bytes={len(content)}-'})
+    assert response.status_code == 416
+
+    response = client.get('/datasets/test/result.csv', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.content == content
+    assert response.headers['etag'] != etag
+
+    assert client.get('/datasets/test/missing.csv').status_code == 404
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
+import pytest
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.missing_data_treater import handle_missing_data
+from app.missing_data_treater import handle_missing_data, handle_missing_data_chunked, MissingDataImputer
 
 def test_handle_missing_data_remove():
     df = pd.DataFrame({'A': [1, 2, np.nan], 'B': [4, np.nan, 6]})
@@ -38,3 +39,58 @@ def test_handle_missing_data_constant():
     assert df_handled.isnull().sum().sum() == 0
     assert df_handled['A'][2] == 0
     assert df_handled['B'][1] == 0
+
+def test_handle_missing_data_chunked_mean():
+    df = pd.DataFrame({'A': [1, 2, np.nan, 3], 'B': [4, np.nan, 6, 8]})
+    read_chunks = lambda: (df.iloc[start:start + 2] for start in range(0, len(df), 2))
+    df_handled = pd.concat(handle_missing_data_chunked(read_chunks, 'mean'))
+    assert df_handled.isnull().sum().sum() == 0
+    assert df_handled['A'][2] == 2.0
+    assert df_handled['B'][1] == 6.0
+    assert df_handled.index.tolist() == [0, 1, 2, 3]
+
+def test_handle_missing_data_chunked_invalid_method():
+    df = pd.DataFrame({'A': [1, np.nan]})
+    with pytest.raises(ValueError):
+        list(handle_missing_data_chunked(lambda: iter([df]), 'median'))
+
+
+def test_handle_missing_data_preserves_dtypes_and_index():
+    df = pd.DataFrame({'A': np.array([1.5, np.nan, 2.5], dtype=np.float32),
+                       'B': pd.array([1, None, 1], dtype='Int64'),
+                       'C': pd.Categorical(['x', None, 'x']),
+                       'D': [7, 8, 9]}, index=[10, 20, 30])
+    df_handled = handle_missing_data(df, 'most_frequent')
+    assert df_handled.isnull().sum().sum() == 0
+    assert df_handled.dtypes.tolist() == df.dtypes.tolist()
+    assert df_handled.index.tolist() == [10, 20, 30]
+    assert df_handled['C'][20] == 'x'
+    assert np.shares_memory(df_handled['D'].to_numpy(), df['D'].to_numpy())
+    assert df['A'].isnull().sum() == 1
+
+def test_missing_data_imputer_replay():
+    df = pd.DataFrame({'A': [1.0, 2.0, np.nan], 'B': [4, 5, 6]})
+    imputer = MissingDataImputer('mean').fit(df)
+    assert imputer.fill_values == {'A': 1.5}
+
+    replayed = MissingDataImputer.from_dict(imputer.to_dict())
+    batch = pd.DataFrame({'A': [np.nan, 10.0], 'B': [np.nan, 1.0]})
+    df_handled = replayed.transform(batch)
+    assert df_handled['A'].tolist() == [1.5, 10.0]
+    assert df_handled['B'].isnull().sum() == 1
+
+    replayed.transform(batch, inplace=True)
+    assert batch['A'][0] == 1.5
+
+def test_missing_data_imputer_mean_on_text_column():
+    df = pd.DataFrame({'A': ['x', None]})
+    with pytest.raises(ValueError):
+        MissingDataImputer('mean').fit(df)
+
+def test_handle_missing_data_chunked_imputer():
+    df = pd.DataFrame({'A': [1, 2, np.nan, 3], 'B': [4, np.nan, 6, 8]})
+    read_chunks = lambda: (df.iloc[start:start + 2] for start in range(0, len(df), 2))
+    imputer = MissingDataImputer('constant', -1).fit(df)
+    df_handled = pd.concat(handle_missing_data_chunked(read_chunks, None, imputer=imputer))
+    assert df_handled['A'][2] == -1
+    assert df_handled['B'][1] == -1
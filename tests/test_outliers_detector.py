@@ -1,8 +1,10 @@
 import pandas as pd
+import numpy as np
+from scipy.stats import zscore
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.outliers_detector import detect_outliers
+from app.outliers_detector import detect_outliers, detect_outliers_chunked, detect_outlier_masks
 
 def test_detect_outliers_z_score():
     df = pd.DataFrame({'A': [1, 2, 3, 4, 5, 100], 'B': [6, 7, 8, 9, 10, 200], 'Class': [0, 0, 0, 0, 0, 1]})
@@ -27,3 +29,53 @@ def test_detect_outliers_winsorization():
     outliers_dict = detect_outliers(df, winsorization_method=True)
     assert outliers_dict['winsorization']['A'] == [0, 5]
     assert outliers_dict['winsorization']['B'] == [0, 5]
+
+def test_detect_outliers_chunked_matches_detect_outliers():
+    df = pd.DataFrame({'A': [1, 2, 3, 4, 5, 100] * 5, 'B': [6, 7, 8, 9, 10, 200] * 5, 'Class': [0, 0, 0, 0, 0, 1] * 5})
+    read_chunks = lambda: (df.iloc[start:start + 7] for start in range(0, len(df), 7))
+    outliers_dict = detect_outliers(df, True, True, True, True)
+    outliers_dict_chunked = detect_outliers_chunked(read_chunks, True, True, True, True)
+    assert outliers_dict_chunked == outliers_dict
+
+def detect_outliers_reference(df: pd.DataFrame) -> dict:
+    df_outliers = df.drop(columns=['Class'])
+    outliers_dict = {'z_score': {}, 'robust_z_score': {}, 'iqr': {}, 'winsorization': {}}
+    for column in df_outliers.columns:
+        z_scores = np.abs(zscore(df_outliers[column]))
+        outliers_dict['z_score'][column] = np.where(z_scores > 3)[0].tolist()
+
+        median = df_outliers[column].median()
+        mad = np.median(np.abs(df_outliers[column] - median))
+        modified_z_scores = 0.6745 * (df_outliers[column] - median) / mad
+        outliers_dict['robust_z_score'][column] = np.where(np.abs(modified_z_scores) > 3.5)[0].tolist()
+
+        Q1 = df_outliers[column].quantile(0.25)
+        Q3 = df_outliers[column].quantile(0.75)
+        IQR = Q3 - Q1
+        outliers = df_outliers[(df_outliers[column] < (Q1 - 1.5 * IQR)) | (df_outliers[column] > (Q3 + 1.5 * IQR))].index
+        outliers_dict['iqr'][column] = outliers.tolist()
+
+        q = df_outliers[column].quantile([0.01, 0.99])
+        outliers = df_outliers[(df_outliers[column] < q.iloc[0]) | (df_outliers[column] > q.iloc[1])].index
+        outliers_dict['winsorization'][column] = outliers.tolist()
+    return outliers_dict
+
+def test_detect_outliers_matches_reference():
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'A': rng.standard_t(3, 2000),
+        'B': rng.exponential(1, 2000),
+        'C': rng.integers(0, 3, 2000).astype(float),
+        'D': np.ones(2000),
+        'Class': rng.integers(0, 2, 2000),
+    }, index=np.arange(2000) * 3 + 7)
+    df.loc[df.index[::50], 'B'] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        assert detect_outliers(df, True, True, True, True) == detect_outliers_reference(df)
+
+def test_detect_outlier_masks():
+    df = pd.DataFrame({'A': [1, 2, 3, 4, 5, 100], 'B': [6, 7, 8, 9, 10, 200], 'Class': [0, 0, 0, 0, 0, 1]})
+    masks = detect_outlier_masks(df, iqr_method=True, winsorization_method=True)
+    assert set(masks) == {'iqr', 'winsorization'}
+    assert masks['iqr'].shape == (6, 2) and masks['iqr'].dtype == bool
+    assert masks['iqr'][:, 0].tolist() == [False] * 5 + [True]
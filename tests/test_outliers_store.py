@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+import pandas as pd
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.outliers_detector import detect_outliers, detect_outlier_masks
+from app.outliers_store import OutlierMasks, save_outliers, load_outliers, load_column_outliers
+from app.artifact_writer import artifact_writer
+from app.result_cache import result_cache
+import app.main as main
+
+SEED = 42
+
+def make_dataset(rows: int = 1000, index=None) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    return pd.DataFrame({'A': rng.standard_t(3, rows), 'B': rng.exponential(1, rows),
+                         'Class': rng.integers(0, 2, rows)}, index=index)
+
+def test_outlier_masks_match_detect_outliers(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = make_dataset(index=np.arange(1000) * 2 + 5)
+    masks = OutlierMasks(detect_outlier_masks(df, True, True, True, True), df.columns.drop('Class'), df.index)
+    expected = detect_outliers(df, True, True, True, True)
+    assert masks.to_lists() == expected
+
+    save_outliers(masks, 'test', 'data_outliers')
+    assert load_outliers('test', 'data_outliers').to_lists() == expected
+    assert load_column_outliers('test', 'data_outliers', 'B', 'iqr') == {'iqr': expected['iqr']['B']}
+    assert load_column_outliers('test', 'data_outliers', 'A') == {method: expected[method]['A'] for method in expected}
+
+    summary = masks.summary()
+    assert summary['rows'] == 1000
+    assert summary['methods']['winsorization']['counts']['A'] == len(expected['winsorization']['A'])
+
+def test_outlier_masks_are_compact():
+    df = make_dataset(rows=100_000)
+    masks = OutlierMasks(detect_outlier_masks(df, True, True, True, True), df.columns.drop('Class'), df.index)
+    assert masks.index is None
+    assert len(masks.to_bytes()) < 100_000 * 2 * 4 / 8
+
+def test_column_outliers_endpoint(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result_cache.clear()
+    df = make_dataset()
+    os.makedirs('app/datasets/test', exist_ok=True)
+    df.to_csv('app/datasets/test/data.csv', index=False)
+    client = TestClient(main.app)
+
+    response = client.get('/outliers_detect_and_transform/test/data/', params={'iqr': True, 'use_cache': False})
+    assert response.status_code == 200
+    artifact_writer.flush()
+    expected = detect_outliers(df, iqr_method=True)['iqr']
+    assert response.json()['outliers_summary']['methods']['iqr']['counts'] == {column: len(expected[column]) for column in expected}
+
+    response = client.get('/outliers/test/data/B', params={'method': 'iqr'})
+    assert response.json() == {'column': 'B', 'outliers': {'iqr': expected['B']}}
+    assert client.get('/outliers/test/data/Z').status_code == 404
+    assert client.get('/outliers/test/data/A', params={'method': 'z_score'}).status_code == 404
+    assert client.get('/outliers/test/data/A', params={'method': 'zscore'}).status_code == 400
+    assert client.get('/outliers/test/other/A').status_code == 404
+    result_cache.clear()
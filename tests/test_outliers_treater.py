@@ -0,0 +1,57 @@
+from sklearn.preprocessing import MinMaxScaler
+import pandas as pd
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.outliers_treater import transform_outliers
+from app.outliers_detector import detect_outliers, detect_outlier_masks
+
+def transform_outliers_reference(df: pd.DataFrame, outliers_dict: dict, treatment_method=None, treatment_constant_value=0) -> pd.DataFrame:
+    df_transformed = df.copy()
+    scaler = MinMaxScaler()
+    for method in outliers_dict.keys():
+        for attribute in df_transformed.columns.drop('Class'):
+            valid_indices = df_transformed.index.intersection(outliers_dict[method][attribute])
+            if treatment_method == 'log':
+                df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.log(x) if x > 0 else 0)
+            elif treatment_method == 'sqrt':
+                df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.sqrt(x) if x > 0 else 0)
+            elif treatment_method == 'cbrt':
+                df_transformed[attribute] = df_transformed[attribute].map(lambda x: np.cbrt(x) if x > 0 else 0)
+            elif treatment_method == 'scaling':
+                df_transformed[attribute] = scaler.fit_transform(df_transformed[attribute].values.reshape(-1, 1))
+            elif treatment_method == 'constant':
+                df_transformed.loc[valid_indices, attribute] = treatment_constant_value
+            elif treatment_method == 'remove':
+                df_transformed = df_transformed.drop(valid_indices)
+    return df_transformed
+
+def make_dataset() -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({'A': rng.standard_t(3, 500), 'B': rng.exponential(1, 500), 'C': np.ones(500),
+                       'Class': rng.integers(0, 2, 500)})
+    df.loc[::40, 'B'] = np.nan
+    return df
+
+@pytest.mark.parametrize('treatment_method', ['log', 'sqrt', 'cbrt', 'scaling'])
+def test_transforms_match_reference_once_per_attribute(treatment_method):
+    df = make_dataset()
+    outliers_dict = detect_outliers(df, iqr_method=True, winsorization_method=True)
+    expected = transform_outliers_reference(df, {'iqr': outliers_dict['iqr']}, treatment_method)
+    pd.testing.assert_frame_equal(transform_outliers(df, outliers_dict, treatment_method), expected)
+
+@pytest.mark.parametrize('treatment_method', ['constant', 'remove'])
+def test_union_treatments_match_reference(treatment_method):
+    df = make_dataset()
+    outliers_dict = detect_outliers(df, True, True, True, True)
+    expected = transform_outliers_reference(df, outliers_dict, treatment_method, -1.0)
+    pd.testing.assert_frame_equal(transform_outliers(df, outliers_dict, treatment_method, -1.0), expected)
+
+    masks = detect_outlier_masks(df, True, True, True, True)
+    pd.testing.assert_frame_equal(transform_outliers(df, masks, treatment_method, -1.0), expected)
+
+def test_transform_outliers_without_treatment():
+    df = make_dataset()
+    pd.testing.assert_frame_equal(transform_outliers(df, detect_outliers(df, iqr_method=True)), df)
@@ -0,0 +1,123 @@
+from fastapi.testclient import TestClient
+import pandas as pd
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.result_cache import ResultCache, get_result_key, get_dataset_digest, get_artifact_location, result_cache
+from app.artifact_writer import artifact_writer
+import app.main as main
+import app.result_cache as result_cache_module
+import app.dataset_manager as dataset_manager
+
+SEED = 42
+
+def write_dataset(dataset_id: str, file_name: str, rows: int = 200) -> pd.DataFrame:
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame({'A': rng.normal(size=rows), 'B': rng.normal(size=rows), 'Class': rng.integers(0, 2, rows)})
+    os.makedirs(f'app/datasets/{dataset_id}', exist_ok=True)
+    df.to_csv(f'app/datasets/{dataset_id}/{file_name}.csv', index=False)
+    return df
+
+def test_result_key_normalizes_parameters():
+    key = get_result_key('correlations', 'sha256-abc', {'correlations': ['spearman', 'pearson'], 'value': 1.0})
+    assert key == get_result_key('correlations', 'sha256-abc', {'value': 1, 'correlations': ['pearson', 'spearman']})
+    assert key != get_result_key('correlations', 'sha256-abd', {'value': 1, 'correlations': ['pearson', 'spearman']})
+    assert key != get_result_key('superficial_analysis', 'sha256-abc', {'value': 1, 'correlations': ['pearson', 'spearman']})
+
+def test_dataset_digest_follows_content(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dataset('test', 'data')
+    digest = get_dataset_digest('test', 'data')
+    assert digest.startswith('sha256-') and digest == get_dataset_digest('test', 'data')
+
+    write_dataset('test', 'data', rows=201)
+    assert get_dataset_digest('test', 'data') != digest
+
+def test_result_cache_round_trip_and_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results'), max_bytes=10 ** 9)
+    df = pd.DataFrame({'A': [1.0, 2.0]}, index=['x', 'y'])
+    cache.put('first', {'message': 'ok'}, {'result': (df, 'df', {'index': True}), 'outliers': ({'A': [1]}, 'json', {})})
+
+    entry = cache.get('first')
+    assert entry['response'] == {'message': 'ok'}
+    pd.testing.assert_frame_equal(cache.load_artifact('first', entry['artifacts']['result']), df)
+    assert cache.load_artifact('first', entry['artifacts']['outliers']) == {'A': [1]}
+    assert cache.get('missing') is None
+    assert cache.stats()['hit_rate'] == 0.5
+
+    size = cache.stats()['current_bytes']
+    cache.max_bytes = 2 * size
+    cache.put('second', {}, {'result': (df, 'df', {})})
+    cache.get('first')
+    cache.put('third', {}, {'result': (df, 'df', {})})
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert cache.stats()['evictions'] == 1
+
+    reopened = ResultCache(str(tmp_path / 'results'), max_bytes=2 * size)
+    assert reopened.stats()['entries'] == 2
+
+def test_endpoint_hit_skips_loading_and_restores_artifacts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    result_cache.clear()
+    write_dataset('test', 'data')
+    client = TestClient(main.app)
+
+    response = client.get('/superficial_analysis/test/data/')
+    assert response.status_code == 200 and 'cached' not in response.json()
+    artifact_writer.flush()
+    expected = pd.read_csv('app/datasets/test/data_superficial_analysis.csv', index_col=0)
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError('o dataset não deveria ser carregado')
+    monkeypatch.setattr(main, 'load_csv', fail_load)
+
+    response = client.get('/superficial_analysis/test/data/')
+    assert response.json()['cached'] is True
+    assert response.json()['artifacts'] == []
+
+    os.remove('app/datasets/test/data_superficial_analysis.csv')
+    response = client.get('/superficial_analysis/test/data/')
+    assert response.json()['artifacts'] == ['test/data_superficial_analysis']
+    artifact_writer.flush()
+    pd.testing.assert_frame_equal(pd.read_csv('app/datasets/test/data_superficial_analysis.csv', index_col=0), expected)
+
+    assert client.get('/result_cache_stats').json()['hits'] == 2
+    result_cache.clear()
+
+def test_outliers_endpoint_is_cached_and_restored(tmp_path, monkeypatch):
+    assert result_cache_module.OutlierMasks is main.OutlierMasks
+    monkeypatch.chdir(tmp_path)
+    result_cache.clear()
+    write_dataset('test', 'data')
+    client = TestClient(main.app)
+
+    url = '/outliers_detect_and_transform/test/data/?z_score=true&iqr=true&treatment_method=constant'
+    response = client.get(url)
+    assert response.status_code == 200 and 'cached' not in response.json()
+    artifact_writer.flush()
+    key = next(status['artifact_id'] for status in artifact_writer.status('test/result_cache/'))
+    assert artifact_writer.status(key)[0]['status'] == 'finished'
+    expected = client.get('/outliers/test/data/A').json()
+
+    monkeypatch.setattr(main, 'load_csv', lambda *args, **kwargs: None)
+    os.remove('app/datasets/test/data_outliers.npz')
+    response = client.get(url)
+    assert response.json()['cached'] is True
+    assert response.json()['artifacts'] == ['test/data_outliers']
+    artifact_writer.flush()
+    assert client.get('/outliers/test/data/A').json() == expected
+    result_cache.clear()
+
+def test_published_csv_follows_configured_compression(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dataset_manager, 'CSV_COMPRESSION', 'gzip')
+    cache = ResultCache(str(tmp_path / 'results'))
+    df = pd.DataFrame({'A': [1.0, 2.0]})
+    cache.put('key', {}, {'result': (df, 'df', {})})
+
+    cache.publish('key', 'test', 'result', None, 'df')
+    location = get_artifact_location('test', 'result', 'df')
+    assert location == 'app/datasets/test/result.csv.gz'
+    assert os.path.exists(location) and cache.is_published('key', location)
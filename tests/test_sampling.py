@@ -0,0 +1,45 @@
+import pandas as pd
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.sampling import stratified_sample, choose_sample_size, SAMPLE_PILOT_SIZE
+
+SEED = 42
+rng = np.random.default_rng(SEED)
+df = pd.DataFrame({
+    'Class': (rng.random(50_000) < 0.002).astype(int),
+    'Feature 1': rng.normal(0, 1, 50_000),
+})
+
+def test_stratified_sample_keeps_class_proportions():
+    sample = stratified_sample(df, 5_000)
+    assert len(sample) == 5_000
+    assert sample.index.is_unique and sample.index.is_monotonic_increasing
+    expected = df['Class'].sum() / len(df) * 5_000
+    assert abs(sample['Class'].sum() - expected) <= 1
+
+def test_stratified_sample_keeps_rare_classes():
+    sample = stratified_sample(df, 10)
+    assert len(sample) == 10
+    assert set(sample['Class']) == {0, 1}
+    assert stratified_sample(df, len(df) + 1) is df
+
+def test_stratified_sample_takes_rare_rows_from_largest_strata():
+    rare = pd.DataFrame({'Class': [0] * 998 + [1, 2], 'Feature 1': np.arange(1_000)})
+    sample = stratified_sample(rare, 10)
+    assert len(sample) == 10
+    assert sample['Class'].value_counts().to_dict() == {0: 8, 1: 1, 2: 1}
+
+    many_strata = pd.DataFrame({'Class': np.repeat(np.arange(6), [995, 1, 1, 1, 1, 1])})
+    assert len(stratified_sample(many_strata, 6)) == 6
+
+def test_choose_sample_size():
+    assert choose_sample_size(df, None, sample_size=1_000) == 1_000
+    assert choose_sample_size(df, None) == len(df)
+
+    calls = []
+    size = choose_sample_size(df, lambda sample: calls.append(len(sample)), time_budget=1e-9)
+    assert calls == [SAMPLE_PILOT_SIZE]
+    assert size == SAMPLE_PILOT_SIZE
+    assert choose_sample_size(df, lambda sample: None, sample_size=3_000, time_budget=60) == 3_000
@@ -0,0 +1,105 @@
+import pandas as pd
+import numpy as np
+from scipy.stats import mode
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.superficial_analysis import generate_statistics, generate_statistics_chunked, generate_pearson_correlation_chunked, generate_statistics_from_state
+from app.streaming_statistics import StatisticsState
+
+SEED = 42
+np.random.seed(SEED)
+df = pd.DataFrame({
+    'Class': np.random.choice([0, 1], size=(1000,), p=[2./3, 1./3]),
+    'Feature 1': np.random.normal(0, 1, 1000),
+    'Feature 2': np.random.normal(1000, 2, 1000),
+    'Feature 3': np.random.randint(0, 5, 1000).astype(float),
+})
+df_missing = df.copy()
+df_missing.loc[::10, 'Feature 1'] = np.nan
+
+def generate_statistics_reference(df: pd.DataFrame) -> pd.DataFrame:
+    results = {}
+    for column in df.columns.drop('Class'):
+        column_data = df[column]
+        results[column] = {
+            'Média': column_data.mean(),
+            'Mediana': column_data.median(),
+            'Moda': mode(column_data, keepdims=True)[0][0],
+            'Campos vazios': column_data.isnull().sum(),
+            'Campos vazios (%)': (column_data.isnull().sum() / len(df)) * 100,
+            'Campos com valor zero': (column_data == 0).sum(),
+            'Valor máximo': column_data.max(),
+            'Valor mínimo': column_data.min(),
+            'Desvio padrão': column_data.std(),
+            'Intervalo de valores': np.ptp(column_data),
+            'IQR': np.percentile(column_data, 75) - np.percentile(column_data, 25),
+            'Assimetria': column_data.skew(),
+            'Curtose': column_data.kurtosis()
+        }
+    return pd.DataFrame.from_dict(results, orient='index').transpose()
+
+def test_generate_statistics_matches_reference():
+    data = df_missing.assign(**{
+        'Feature 4': np.repeat([3, 1, 2, 1, 3], 200),
+        'Feature 5': 7.0,
+        'Feature 6': np.random.randint(-3, 3, 1000),
+    })
+    for frame in [df, data, data.iloc[:1]]:
+        statistics = generate_statistics(frame).astype(float)
+        pd.testing.assert_frame_equal(statistics, generate_statistics_reference(frame).astype(float), rtol=1e-9)
+
+def read_chunks(df: pd.DataFrame, chunksize: int = 128):
+    return lambda: (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+def test_generate_statistics_chunked():
+    for data in [df, df_missing]:
+        statistics = generate_statistics(data).astype(float)
+        statistics_chunked = generate_statistics_chunked(read_chunks(data)).astype(float)
+        pd.testing.assert_frame_equal(statistics_chunked, statistics, rtol=1e-9)
+
+def test_generate_pearson_correlation_chunked():
+    for data in [df, df_missing]:
+        correlation = generate_pearson_correlation_chunked(read_chunks(data))
+        pd.testing.assert_frame_equal(correlation, data.corr(method='pearson'), rtol=1e-9)
+
+def test_statistics_state_merge_and_round_trip():
+    first = StatisticsState.from_chunks(read_chunks(df_missing.iloc[:600])())
+    second = StatisticsState.from_chunks(read_chunks(df_missing.iloc[600:])())
+    first.merge(second)
+
+    restored = StatisticsState.from_arrays(first.to_arrays())
+    statistics = generate_statistics_from_state(restored).astype(float)
+    pd.testing.assert_frame_equal(statistics, generate_statistics(df_missing).astype(float), rtol=1e-9)
+
+def test_generate_statistics_sampled_intervals_cover_population():
+    from app.superficial_analysis import generate_statistics_sampled
+    statistics, info = generate_statistics_sampled(df_missing, sample_size=400)
+    exact = generate_statistics(df_missing)
+
+    assert info == {'rows': 400, 'population_rows': len(df_missing), 'confidence': 0.95}
+    covered = []
+    for name in ['Média', 'Mediana', 'Desvio padrão', 'Campos vazios', 'IQR']:
+        lower, upper = statistics.loc[f'{name} (IC inferior)'], statistics.loc[f'{name} (IC superior)']
+        covered.extend(((lower <= exact.loc[name]) & (exact.loc[name] <= upper))[exact.loc[name].notna()])
+    assert np.mean(covered) >= 0.75
+
+    statistics, info = generate_statistics_sampled(df)
+    assert info['rows'] == len(df)
+    pd.testing.assert_frame_equal(statistics.loc[exact.index], generate_statistics(df), check_dtype=False)
+
+def test_generate_correlation_matrix_sampled():
+    from app.superficial_analysis import generate_correlation_matrix_sampled
+    correlated = df.copy()
+    correlated['Feature 3'] = correlated['Feature 1'] + np.random.normal(0, 1, len(df))
+    matrixes, intervals, info = generate_correlation_matrix_sampled(correlated, True, False, True, sample_size=500)
+
+    assert matrixes[1] is None and intervals[1] is None
+    assert info['rows'] == 500
+    exact = correlated.corr()
+    pearson = intervals[0].set_index(['Atributo 1', 'Atributo 2'])
+    assert len(pearson) == 6
+    row = pearson.loc[('Feature 1', 'Feature 3')]
+    assert row['IC inferior'] <= exact.loc['Feature 1', 'Feature 3'] <= row['IC superior']
+    assert row['IC inferior'] <= row['Estimativa'] <= row['IC superior']
+    assert row['Linhas'] == 500
@@ -0,0 +1,116 @@
+import pandas as pd
+import numpy as np
+import pytest
+import json
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.training_processes import SharedDataset, TrainingProcessPool
+from app.machine_learning import train_and_evaluate_model, evaluate_model, training_tasks
+from app.dataset_manager import dataframe_cache
+
+def get_process_id() -> int:
+    return os.getpid()
+
+def crash_process() -> None:
+    os._exit(1)
+
+def allocate_bytes(size: int) -> int:
+    return len(bytearray(size))
+
+def sum_shared_dataset(description: dict) -> tuple:
+    shared, X, y, sample_weight = SharedDataset.attach(description)
+    try:
+        return float(X.to_numpy().sum()), int(y.sum()), int(sample_weight.sum())
+    finally:
+        del X, y, sample_weight
+        for shared_array in shared:
+            shared_array.close()
+
+def get_dataframe_cache_stats() -> dict:
+    return dataframe_cache.stats()
+
+def make_dataset(rows: int = 600) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(rng.standard_normal((rows, 4)), columns=['V1', 'V2', 'V3', 'V4'])
+    df['Class'] = (df['V1'] + rng.standard_normal(rows) * 0.5 > 1).astype(int)
+    return df
+
+@pytest.fixture
+def process_pool():
+    pool = TrainingProcessPool(processes=1)
+    yield pool
+    pool.shutdown()
+
+def test_shared_dataset_is_read_by_another_process(process_pool):
+    df = make_dataset()
+    sample_weight = np.arange(len(df), dtype=np.uint32) % 3
+    shared_dataset = SharedDataset(df, sample_weight).acquire()
+
+    shared, X, y, _ = SharedDataset.attach(shared_dataset.describe())
+    pd.testing.assert_frame_equal(X, df.drop(columns='Class'))
+    del X, y
+    for shared_array in shared:
+        shared_array.close()
+
+    X_sum, y_sum, weights_sum = process_pool.run(sum_shared_dataset, shared_dataset.describe())
+    assert X_sum == pytest.approx(df.drop(columns='Class').to_numpy().sum())
+    assert (y_sum, weights_sum) == (df['Class'].sum(), sample_weight.sum())
+
+    shared_dataset.release()
+    assert all(shared_array.array is None for shared_array in shared_dataset.arrays.values())
+
+def test_shared_dataset_rejects_non_numeric_columns():
+    df = make_dataset()
+    df['V1'] = df['V1'].astype(str)
+    with pytest.raises(ValueError):
+        SharedDataset(df)
+
+def test_process_pool_restarts_crashed_process(process_pool):
+    process_id = process_pool.run(get_process_id)
+    assert process_id != os.getpid()
+    assert process_pool.run(get_process_id) == process_id
+
+    with pytest.raises(RuntimeError):
+        process_pool.run(crash_process)
+    assert process_pool.restarts == 1
+    assert process_pool.run(get_process_id) not in [process_id, os.getpid()]
+
+def test_process_pool_limits_memory():
+    pool = TrainingProcessPool(processes=1, memory_limit=2 * 1024 ** 3)
+    try:
+        with pytest.raises(MemoryError):
+            pool.run(allocate_bytes, 8 * 1024 ** 3)
+        assert pool.run(allocate_bytes, 1024) == 1024
+    finally:
+        pool.shutdown()
+
+def test_train_and_evaluate_model_in_process(process_pool, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = make_dataset()
+    shared_dataset = SharedDataset(df).acquire()
+
+    train_and_evaluate_model('dataset', 'file', 'logistic_regression', shared_dataset=shared_dataset, process_pool=process_pool)
+
+    assert training_tasks['dataset_logistic_regression']['status'] == 'finished'
+    assert all(shared_array.array is None for shared_array in shared_dataset.arrays.values())
+    with open(tmp_path / 'app' / 'datasets' / 'dataset' / 'file_logistic_regression.json') as file:
+        result = json.load(file)
+    expected, _ = evaluate_model(df.drop(columns='Class'), df['Class'], 'logistic_regression', return_model=False)
+    assert result['confusion_matrix'] == expected['confusion_matrix']
+
+def test_train_and_evaluate_stored_dataset_in_process(process_pool, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = make_dataset()
+    os.makedirs('app/datasets/dataset', exist_ok=True)
+    df.to_csv('app/datasets/dataset/file.csv', index=True)
+
+    train_and_evaluate_model('dataset', 'file', 'logistic_regression', index=True, process_pool=process_pool)
+
+    assert training_tasks['dataset_logistic_regression']['status'] == 'finished'
+    with open(tmp_path / 'app' / 'datasets' / 'dataset' / 'file_logistic_regression.json') as file:
+        result = json.load(file)
+    expected, _ = evaluate_model(df.drop(columns='Class'), df['Class'], 'logistic_regression', return_model=False)
+    assert result['confusion_matrix'] == expected['confusion_matrix']
+    stats = process_pool.run(get_dataframe_cache_stats)
+    assert (stats['entries'], stats['max_bytes']) == (0, 0)
@@ -0,0 +1,95 @@
+from threadpoolctl import threadpool_info
+import threading
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.training_scheduler import TrainingScheduler
+from app.training_processes import TrainingProcessPool
+from app.machine_learning import get_model_cpu_slots, training_scheduler
+import app.main as main
+
+def test_training_scheduler_runs_by_priority_and_order():
+    scheduler = TrainingScheduler(workers=1, cpu_slots=2)
+    started, release = threading.Event(), threading.Event()
+    order = []
+
+    def train(name, n_jobs):
+        order.append((name, n_jobs))
+        if name == 'blocker':
+            started.set()
+            release.wait()
+
+    scheduler.submit('blocker', train, 'blocker', cpu_slots=4)
+    assert started.wait(10)
+    scheduler.submit('low', train, 'low', priority=20)
+    scheduler.submit('first', train, 'first')
+    scheduler.submit('second', train, 'second')
+    scheduler.submit('urgent', train, 'urgent', priority=0)
+
+    statuses = {status['job_id']: status['status'] for status in scheduler.status()}
+    assert statuses['low'] == 'queued'
+    assert scheduler.pending() == 5
+
+    release.set()
+    assert scheduler.shutdown(timeout=10)
+    assert order == [('blocker', 2), ('urgent', 1), ('first', 1), ('second', 1), ('low', 1)]
+
+def test_training_scheduler_limits_cpu_slots():
+    scheduler = TrainingScheduler(workers=4, cpu_slots=3)
+    lock = threading.Lock()
+    used = {'current': 0, 'max': 0}
+
+    def train(n_jobs):
+        with lock:
+            used['current'] += n_jobs
+            used['max'] = max(used['max'], used['current'])
+        threading.Event().wait(0.05)
+        with lock:
+            used['current'] -= n_jobs
+
+    for job_index in range(6):
+        scheduler.submit(f'job_{job_index}', train, cpu_slots=2 if job_index % 2 else 1)
+    assert scheduler.shutdown(timeout=10)
+    assert used['max'] <= 3
+
+def test_training_scheduler_limits_native_threads():
+    scheduler = TrainingScheduler(workers=1, cpu_slots=3)
+    threads = []
+
+    def train(n_jobs):
+        threads.append({info['num_threads'] for info in threadpool_info()})
+
+    scheduler.submit('job', train, cpu_slots=3)
+    assert scheduler.shutdown(timeout=10)
+    assert threads == [{3}]
+
+def test_training_scheduler_reports_failures():
+    scheduler = TrainingScheduler(workers=1, cpu_slots=1)
+
+    def broken_train(n_jobs):
+        raise ValueError('Falha no modelo')
+
+    scheduler.submit('broken', broken_train)
+    assert scheduler.shutdown(timeout=10)
+    assert scheduler.status('broken')[0]['status'] == 'failed'
+    assert scheduler.status('broken')[0]['error'] == 'Falha no modelo'
+
+def test_model_cpu_slots():
+    assert get_model_cpu_slots('xgboost', 8) == 4
+    assert get_model_cpu_slots('mlp', 8) == 1
+    assert get_model_cpu_slots('random_forest', 1) == 1
+
+def test_main_reports_the_scheduler_used_for_training():
+    assert main.training_scheduler is training_scheduler
+
+def test_main_shutdown_finishes_trainings_and_stops_processes(monkeypatch):
+    scheduler = TrainingScheduler(workers=1, cpu_slots=1)
+    process_pool = TrainingProcessPool(processes=1)
+    monkeypatch.setattr(main, 'training_scheduler', scheduler)
+    monkeypatch.setattr(main, 'training_process_pool', process_pool)
+
+    scheduler.submit('job', lambda n_jobs: process_pool.run(os.getpid))
+    main.flush_artifacts()
+
+    assert scheduler.status('job')[0]['status'] == 'finished'
+    assert process_pool._idle.empty() and process_pool._created == 0